@@ -1,176 +1,25 @@
-import pygame
-import random
+import argparse
 import os
+import pygame
 import sys
-import math
-from collections import defaultdict
-
-# -------- CONFIG ----------
-WIDTH, HEIGHT = 640, 800
-FPS = 60
-
-PLAYER_SPEED = 5
-BULLET_SPEED = -10
-SCROLL_SPEED = 2
-ENEMY_SPAWN_INTERVAL = 150  # using world_y units like original
-
-MAX_LEVEL = 5
-MAX_LIVES = 5
-
-# Item/power config
-ITEM_DROP_CHANCE = 0.30  # 30% chance to drop an item on enemy death
-POWER_DURATION_MIN = 8000  # ms
-POWER_DURATION_MAX = 10000  # ms
-
-# -------- INIT ----------
-pygame.mixer.pre_init(44100, -16, 2, 512)
-pygame.init()
-try:
-    pygame.mixer.init()
-except Exception:
-    pass
-
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Space Invaders - Fixed & Upgraded")
-clock = pygame.time.Clock()
-
-# -------- LOAD ASSETS ----------
-ASSET_DIR = os.path.join(os.path.dirname(__file__), "assets")
-
-def safe_load_image(path, convert_alpha=True):
-    try:
-        img = pygame.image.load(path)
-        return img.convert_alpha() if convert_alpha else img.convert()
-    except Exception:
-        return None
-
-# background - try to load, fallback to fill
-bg_img = safe_load_image(os.path.join(ASSET_DIR, "background.png"), convert_alpha=False)
-if bg_img:
-    background = pygame.transform.scale(bg_img, (WIDTH, HEIGHT))
-else:
-    # create simple background
-    background = pygame.Surface((WIDTH, HEIGHT))
-    background.fill((12, 12, 30))
-
-# player image - keep size exactly as original code did (100x100)
-player_img_raw = safe_load_image(os.path.join(ASSET_DIR, "player.png"))
-if player_img_raw:
-    try:
-        player_img = pygame.transform.smoothscale(player_img_raw, (100, 100))
-    except Exception:
-        player_img = player_img_raw
-else:
-    # fallback: simple triangle ship
-    player_img = pygame.Surface((100,100), pygame.SRCALPHA)
-    pygame.draw.polygon(player_img, (200,200,255), [(50,0),(90,90),(10,90)])
-
-enemy_img_raw = safe_load_image(os.path.join(ASSET_DIR, "enemy.png"))
-if enemy_img_raw:
-    try:
-        enemy_img = pygame.transform.scale(enemy_img_raw, (50, 50))
-    except Exception:
-        enemy_img = enemy_img_raw
-else:
-    enemy_img = pygame.Surface((50,50), pygame.SRCALPHA)
-    pygame.draw.circle(enemy_img, (220,180,80), (25,25), 22)
-
-explosion_img_raw = safe_load_image(os.path.join(ASSET_DIR, "explosion.png"))
-if explosion_img_raw:
-    try:
-        explosion_img = pygame.transform.scale(explosion_img_raw, (50,50))
-    except Exception:
-        explosion_img = explosion_img_raw
-else:
-    explosion_img = pygame.Surface((50,50), pygame.SRCALPHA)
-    pygame.draw.circle(explosion_img, (255,120,10), (25,25), 24)
-
-# Sounds: use safe loader, fallback to dummy
-def safe_load_sound(path):
-    try:
-        return pygame.mixer.Sound(path)
-    except Exception:
-        class Dummy:
-            def play(self): pass
-        return Dummy()
-
-shoot_sound = safe_load_sound(os.path.join(ASSET_DIR, "shoot.wav"))
-explosion_sound = safe_load_sound(os.path.join(ASSET_DIR, "explosion.wav"))
-fireworks_sound = safe_load_sound(os.path.join(ASSET_DIR, "fireworks.wav"))
-pickup_sound = safe_load_sound(os.path.join(ASSET_DIR, "fireworks.wav"))
-
-# background music: use music channel for mp3 if present
-bg_music_path = os.path.join(ASSET_DIR, "background_music.mp3")
-if os.path.exists(bg_music_path):
-    try:
-        pygame.mixer.music.load(bg_music_path)
-        pygame.mixer.music.set_volume(0.5)
-    except Exception:
-        pass
-# --- Item / Power-up images ---
-
-energy_img = safe_load_image(os.path.join(ASSET_DIR, "a glowing blue energ.png"))   # Power-up: tăng sát thương đạn
-shield_img = safe_load_image(os.path.join(ASSET_DIR, "a glowing blue shiel.png"))   # Power-up: khiên bảo vệ
-mystery_img = safe_load_image(os.path.join(ASSET_DIR, "a mysterious purple .png"))  # Power-up: hiệu ứng ngẫu nhiên
-speed_img = safe_load_image(os.path.join(ASSET_DIR, "a yellow lightning b.png"))    # Power-up: tăng tốc hoặc tốc độ bắn
-heart_img = safe_load_image(os.path.join(ASSET_DIR, "heart.png"))                   # Hồi máu / thêm mạng
-
-# (Tuỳ chọn) nếu bạn có hệ thống rơi vật phẩm:
-item_images = {
-    "energy": energy_img,
-    "shield": shield_img,
-    "mystery": mystery_img,
-    "speed": speed_img,
-    "heart": heart_img,
-}
+import time
+
+import resources
+import surface_cache
+from audio import VoiceManager
+from memory import AllocationTracker, GCControl
+from netplay import TRANSPORTS, Client, Host
+from pacing import FramePacer
+from profiling import FrameProfiler
+from quality import TIERS, TIER_NAMES, QualityGovernor, apply_tier
+from render import RENDERERS
+from replay import Recording
+from rewind import REWIND_SPEED, RETRY_SECONDS, RewindBuffer
+from settings import WIDTH, HEIGHT, FPS, FRAME_MS
+from simulation import ENGINES, Inputs, SimClock, make_simulation
+from sprites import Bullet, Item, Player
 
 # -------- FUNCTIONS ----------
-def reset_game():
-    global level, lives, enemies_destroyed, enemies_required
-    global game_over, game_win, bg_y, world_y, last_enemy_spawn
-    global all_sprites, enemies, bullets, player, items, restart_btn, wave, spawn_interval
-
-    level = 1
-    lives = MAX_LIVES
-    enemies_destroyed = 0
-    enemies_required = 5 + level * 3
-    game_over = False
-    game_win = False
-    bg_y = 0
-    world_y = 0
-    last_enemy_spawn = 0
-
-    all_sprites.empty()
-    enemies.empty()
-    bullets.empty()
-    items.empty()
-
-    player = Player()
-    all_sprites.add(player)
-
-    wave = 1
-    spawn_interval = 900  # ms base spawn timer (used in wave logic)
-
-    # restart button rect placeholder
-    restart_btn = pygame.Rect(0,0,0,0)
-
-def draw_restart_icon():
-    center = (WIDTH // 2, HEIGHT // 2 + 60)
-    radius = 25
-    pygame.draw.circle(screen, (100, 100, 100), center, radius)
-
-    arrow_w, arrow_h = 10, 12
-    arrow_x = center[0] - arrow_w // 2
-    arrow_y = center[1] - arrow_h // 2
-
-    pygame.draw.polygon(screen, (255, 255, 255), [
-        (arrow_x, arrow_y),
-        (arrow_x + arrow_w, center[1]),
-        (arrow_x, arrow_y + arrow_h),
-    ])
-
-    return pygame.Rect(center[0] - radius, center[1] - radius, radius*2, radius*2)
-
 def click_on_restart(pos):
     center = (WIDTH // 2, HEIGHT // 2 + 60)
     radius = 25
@@ -178,428 +27,324 @@ def click_on_restart(pos):
     dy = pos[1] - center[1]
     return dx*dx + dy*dy <= radius*radius
 
-# -------- GAME STATE ----------
-level = 1
-lives = MAX_LIVES
-enemies_destroyed = 0
-enemies_required = 5 + level * 3
-game_over = False
-game_win = False
-show_menu = True
-level_transition = False
-level_transition_start = 0
-transition_duration = 2000 
-# -------- CLASSES ----------
-class Player(pygame.sprite.Sprite):
-    def __init__(self):
-        super().__init__()
-        self.image = player_img
-        self.rect = self.image.get_rect(midbottom=(WIDTH // 2, HEIGHT - 50))
-        self.show_flame = False
-        self.last_shot_time = 0
-        self.shoot_cooldown = 180  # ms default
-        self.powers = {}  # name -> expire_time_ms
-        self.invulnerable_until = 0
-
-    def update(self):
-        keys = pygame.key.get_pressed()
-        self.show_flame = False
-        if keys[pygame.K_LEFT] and self.rect.left > 0:
-            self.rect.x -= PLAYER_SPEED
-        if keys[pygame.K_RIGHT] and self.rect.right < WIDTH:
-            self.rect.x += PLAYER_SPEED
-        if keys[pygame.K_UP] and self.rect.top > HEIGHT//2:
-            self.rect.y -= PLAYER_SPEED
-        if keys[pygame.K_DOWN] and self.rect.bottom < HEIGHT:
-            self.rect.y += PLAYER_SPEED
-        if keys[pygame.K_UP]:
-            self.show_flame = True
-
-        # Shooting while holding space (continuous shooting)
-        now = pygame.time.get_ticks()
-        cooldown = self.shoot_cooldown
-        if 'fast_fire' in self.powers:
-            cooldown = max(20, int(self.shoot_cooldown * 0.6))
-
-        if keys[pygame.K_SPACE]:
-            if now - self.last_shot_time >= cooldown:
-                self.shoot()
-                self.last_shot_time = now
-
-        # expire powers
-        expired = [k for k,v in self.powers.items() if pygame.time.get_ticks() >= v]
-        for k in expired:
-            del self.powers[k]
-
-        # invul flicker
-        if pygame.time.get_ticks() < self.invulnerable_until:
-            alpha = 120 if (pygame.time.get_ticks() // 100) % 2 == 0 else 255
-            try:
-                self.image = player_img.copy()
-                self.image.set_alpha(alpha)
-            except Exception:
-                pass
-        else:
-            self.image = player_img.copy()
-
-    def shoot(self):
-        # shoot method: respects multi_shot
-        if 'multi_shot' in self.powers:
-            offsets = [-28, 0, 28]
-            for off in offsets:
-                bullet = Bullet(self.rect.centerx + off, self.rect.top)
-                all_sprites.add(bullet); bullets.add(bullet)
-            shoot_sound.play()
-        else:
-            bullet = Bullet(self.rect.centerx, self.rect.top)
-            all_sprites.add(bullet); bullets.add(bullet)
-            shoot_sound.play()
-
-    def draw(self, surface):
-        surface.blit(self.image, self.rect)
-        if self.show_flame:
-            flame = pygame.Surface((20, 30), pygame.SRCALPHA)
-            pygame.draw.polygon(flame, (255, 100, 0), [(10, 0), (0, 30), (20, 30)])
-            surface.blit(flame, (self.rect.centerx - 10, self.rect.bottom))
-
-class Enemy(pygame.sprite.Sprite):
-    def __init__(self, x, y):
-        super().__init__()
-        self.image = enemy_img
-        self.rect = self.image.get_rect(topleft=(x, y))
-        self.hp = 1
-        # give variety
-        self.type = random.choice(['straight', 'zigzag', 'fast'])
-        self.spawn_time = pygame.time.get_ticks()
-        if self.type == 'fast':
-            self.speed = SCROLL_SPEED + 2
-        else:
-            self.speed = SCROLL_SPEED
-
-    def update(self):
-        global lives, game_over
-        # pattern
-        if self.type == 'zigzag':
-            t = (pygame.time.get_ticks() - self.spawn_time) / 200.0
-            self.rect.x += int(math.sin(t) * 2)
-        self.rect.y += self.speed
-        if self.rect.top > HEIGHT:
-            self.kill()
-            lives -= 1
-            if lives <= 0:
-                game_over = True
-
-class Bullet(pygame.sprite.Sprite):
-    def __init__(self, x, y):
-        super().__init__()
-        self.image = pygame.Surface((12, 28), pygame.SRCALPHA)
-        # Vẽ viên đạn hình elip với gradient
-        for i in range(28):
-            r = max(0, 255 - i * 8)
-            g = max(0, 200 - i * 6)
-            color = (255, g, 0)
-            pygame.draw.ellipse(self.image, color, (1, i, 10, 10))
-        # Glow effect
-        glow = pygame.Surface((24, 48), pygame.SRCALPHA)
-        pygame.draw.ellipse(glow, (255, 255, 0, 60), glow.get_rect())
-        self.image.blit(glow, (-6, -10))
-        self.rect = self.image.get_rect(midbottom=(x, y))
-
-    def update(self):
-        self.rect.y += BULLET_SPEED
-        if self.rect.bottom < 0:
-            self.kill()
-
-class Explosion(pygame.sprite.Sprite):
-    def __init__(self, center):
-        super().__init__()
-        self.image = explosion_img
-        self.rect = self.image.get_rect(center=center)
-        self.timer = 12
-
-    def update(self):
-        self.timer -= 1
-        if self.timer <= 0:
-            self.kill()
-
-class Item(pygame.sprite.Sprite):
-    # types: health, fast_fire, multi_shot
-    def __init__(self, x, y, typ):
-        super().__init__()
-        self.type = typ
-        # Prefer specific asset images for items (from item_images dict).
-        # Fall back to tinted bullet-shaped sprite when asset missing.
-        img = None
-        # map our internal types to keys in item_images
-        key_map = {
-            'health': 'heart',
-            'fast_fire': 'speed',
-            'multi_shot': 'energy',
-        }
-        use_key = key_map.get(typ, 'mystery')
-        asset_img = item_images.get(use_key)
-        if asset_img:
-            try:
-                img = pygame.transform.smoothscale(asset_img, (32, 32))
-            except Exception:
-                img = asset_img.copy()
-
-        if img is None:
-            # fallback: use bullet image tinted by type
-            img_b = safe_load_image(os.path.join(ASSET_DIR, "bullet.png"))
-            if img_b:
-                try:
-                    img = pygame.transform.smoothscale(img_b, (28, 28))
-                except Exception:
-                    img = img_b.copy()
-            else:
-                img = pygame.Surface((28,28), pygame.SRCALPHA)
-                pygame.draw.circle(img, (200,200,200), (14,14), 12)
-
-            img = img.copy()
-            if typ == 'health':
-                tint = (220,40,60)
-            elif typ == 'fast_fire':
-                tint = (60,200,220)
-            else:
-                tint = (220,200,60)
-            tint_surf = pygame.Surface(img.get_size(), pygame.SRCALPHA)
-            tint_surf.fill(tint + (0,))
-            img.blit(tint_surf, (0,0), special_flags=pygame.BLEND_RGB_ADD)
-
-        self.image = img
-        self.rect = self.image.get_rect(center=(x,y))
-        self.vy = 2.4
-        self.spawn_time = pygame.time.get_ticks()
+def attach_profiler(profiler, sim, renderer):
+    """Point the simulation and renderer at the profiler's timer, or detach both."""
+    timer = profiler.timer if profiler.enabled else None
+    sim.phase_timer = timer
+    renderer.timer = timer
+    renderer.overlay = profiler.draw_overlay if profiler.enabled else None
 
-    def update(self):
-        self.rect.y += self.vy
-        if pygame.time.get_ticks() - self.spawn_time > 10000:
-            self.kill()
-        if self.rect.top > HEIGHT + 20:
-            self.kill()
-
-# -------- GROUPS ----------
-all_sprites = pygame.sprite.Group()
-enemies = pygame.sprite.Group()
-bullets = pygame.sprite.Group()
-items = pygame.sprite.Group()
-
-player = Player()
-all_sprites.add(player)
-
-# -------- BACKGROUND SCROLL ----------
-bg_y = 0
-world_y = 0
-last_enemy_spawn = 0
+def export_trace(profiler, path=None):
+    if path is None:
+        path = time.strftime("profile_trace_%Y%m%d_%H%M%S.json")
+    try:
+        profiler.export_chrome_trace(path)
+        print(f"profile trace written to {path}")
+    except OSError as e:
+        print(f"could not write profile trace: {e}")
+
+def watch_allocations(allocs, renderer):
+    """Start the allocation counter on the per-frame hot spots."""
+    allocs.start()
+    allocs.watch(Player, 'update')
+    allocs.watch(Bullet, '__init__')
+    allocs.watch(Item, '__init__')
+    allocs.watch(type(renderer), 'game', 'draw')
+
+def finish_loading(loader, menu_images):
+    """Wait for the rest of the assets (first click on Start)."""
+    images = dict(menu_images, **loader.finish())
+    surface_cache.prebake()
+    if resources.bake_status != 'hit':
+        # next launch maps these instead of decoding the PNGs again
+        try:
+            resources.save_bake(images)
+        except OSError as e:
+            print(f"could not write asset bake: {e}")
 
-# -------- OTHER STATE ----------
-restart_btn = pygame.Rect(0,0,0,0)
-wave = 1
-spawn_interval = 900  # ms base spawn interval used for wave difficulty
+def start_game(loader, menu_images, engine, seed, players=1):
+    """Finish asset loading and build the simulation."""
+    finish_loading(loader, menu_images)
+    # the simulation clock starts at wall-clock ms; the loop decides how it steps
+    return make_simulation(engine, seed=seed, clock=SimClock(pygame.time.get_ticks()), players=players)
 
 # -------- GAME LOOP ----------
-running = True
-
-# Start screen music only when starting
-while running:
-    clock.tick(FPS)
-
-    if show_menu:
-        screen.blit(background, (0, 0))
-        font = pygame.font.SysFont(None, 72)
-        title = font.render("SPACE INVADERS", True, (255, 255, 255))
-        screen.blit(title, (WIDTH//2 - title.get_width()//2, HEIGHT//2 - 100))
-
-        start_btn = pygame.Rect(WIDTH//2 - 75, HEIGHT//2, 150, 50)
-        pygame.draw.rect(screen, (100, 100, 100), start_btn)
-        font = pygame.font.SysFont(None, 36)
-        txt = font.render("Start", True, (255, 255, 255))
-        screen.blit(txt, (start_btn.centerx - txt.get_width()//2, start_btn.centery - txt.get_height()//2))
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Space Invaders")
+    parser.add_argument("--engine", choices=ENGINES, default='sprites',
+                        help="entity backend for bullets/enemies ('numpy' needs numpy)")
+    parser.add_argument("--render", choices=sorted(RENDERERS), default='full',
+                        help="'dirty' repaints only changed regions")
+    parser.add_argument("--profile", action="store_true",
+                        help="start with the frame profiler overlay on (F3 toggles, F4 exports a trace)")
+    parser.add_argument("--trace-out", metavar="PATH",
+                        help="write a Chrome trace of the last profiled frames on exit")
+    parser.add_argument("--seed", type=int,
+                        help="RNG seed for the session (random if omitted)")
+    parser.add_argument("--record", metavar="PATH",
+                        help="record the session's inputs for replay.py")
+    parser.add_argument("--quality", choices=('auto',) + TIER_NAMES, default='auto',
+                        help="'auto' steps quality down (and back up) with the frame budget")
+    parser.add_argument("--quality-log", metavar="PATH",
+                        help="append quality tier changes and a session summary here (JSON lines)")
+    parser.add_argument("--host", type=int, metavar="PORT",
+                        help="co-op: play player 1 and let one client join on this port")
+    parser.add_argument("--join", metavar="HOST:PORT",
+                        help="co-op: join a host as player 2 (the host runs the game)")
+    parser.add_argument("--transport", choices=TRANSPORTS, default='udp',
+                        help="co-op transport")
+    parser.add_argument("--pacing", choices=('fixed', 'frame'), default='fixed',
+                        help="'fixed': simulation at a fixed %d Hz, drawn interpolated at the display rate; "
+                             "'frame': one step per drawn frame" % FPS)
+    parser.add_argument("--max-fps", type=int, default=FPS,
+                        help="fixed pacing: frame rate cap, e.g. 144 (0 = none, let --vsync pace it)")
+    parser.add_argument("--gc", choices=('windows', 'auto'), default='windows',
+                        help="windows: no automatic garbage collection during play, full passes in "
+                             "the menu, level fades and end screen; auto: Python's default")
+    parser.add_argument("--alloc-trace", action="store_true",
+                        help="count allocations per frame with tracemalloc (slow) and print the top "
+                             "call sites on exit")
+    parser.add_argument("--vsync", action="store_true",
+                        help="wait for the display's refresh on every flip (scaled window)")
+    args = parser.parse_args(argv)
+    if args.max_fps < 0:
+        parser.error("--max-fps can't be negative")
+    if args.host is not None and args.join:
+        parser.error("--host and --join are exclusive")
+    coop = args.host is not None or bool(args.join)
+    if coop and args.record:
+        parser.error("--record replays a single-player game; it can't be combined with --host/--join")
+    seed = args.seed if args.seed is not None else int.from_bytes(os.urandom(4), 'little')
+
+    # -------- INIT ----------
+    started = time.perf_counter()
+    pygame.mixer.pre_init(*resources.MIXER_FORMAT)
+    pygame.init()
+    try:
+        pygame.mixer.init()
+    except Exception:
+        pass
 
-        pygame.display.flip()
+    try:
+        screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.SCALED if args.vsync else 0,
+                                         vsync=int(args.vsync))
+    except pygame.error as e:
+        print(f"vsync unavailable ({e}), continuing without")
+        screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Space Invaders - Fixed & Upgraded")
+    clock = pygame.time.Clock()
+    pacer = FramePacer(args.max_fps) if args.pacing == 'fixed' else None
+
+    # only the menu's images block the first frame; the rest decode meanwhile
+    menu_images = resources.load_menu_images()
+    loader = resources.start_loading()
+
+    sim = None  # created once the remaining assets are in
+    recording = None
+    rewind = None
+    host = None  # netplay.Host when --host
+    renderer = RENDERERS[args.render](screen)
+    voices = VoiceManager()
+    governor = None
+    if args.quality == 'auto':
+        governor = QualityGovernor(budget_ms=pacer.period_ms if pacer is not None else FRAME_MS,
+                                   log_path=args.quality_log)
+        apply_tier(governor.tier, renderer, voices)
+    else:
+        apply_tier(TIERS[TIER_NAMES.index(args.quality)], renderer, voices)
+    profiler = FrameProfiler()
+    if args.profile:
+        profiler.toggle()
+    timer = profiler.timer
+    gc_control = GCControl(enabled=args.gc == 'windows')
+    allocs = AllocationTracker() if args.alloc_trace else None
+    first_frame = True
+    show_menu = True
+    running = True
+    # a SPACE press or restart click waits for the next tick that runs
+    fire_pressed = False
+    restart = False
+
+    # Start screen music only when starting
+    while running:
+        if pacer is None:
+            dt = clock.tick(FPS)
+        else:
+            pacer.wait()  # the frame's input is read right after: as late as possible
+            dt = FRAME_MS
+        frame_start = time.perf_counter()
+        if profiler.enabled:
+            timer.lap('idle')
+
+        if show_menu:
+            start_btn = renderer.menu()
+            if first_frame:
+                first_frame = False
+                print(f"first menu frame after {(time.perf_counter() - started) * 1000:.1f} ms "
+                      f"(asset bake: {resources.bake_status})")
+
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                elif show_menu and event.type == pygame.MOUSEBUTTONDOWN:
+                    if start_btn.collidepoint(event.pos):
+                        show_menu = False
+                        if args.join:
+                            finish_loading(loader, menu_images)
+                            try:
+                                # the Client stands in for the simulation
+                                sim = Client(args.join, args.transport)
+                            except (ConnectionError, OSError) as e:
+                                print(f"could not join {args.join}: {e}")
+                                running = False
+                                break
+                            print(f"joined {args.join} as player {sim.index + 1}")
+                        else:
+                            sim = start_game(loader, menu_images, args.engine, seed,
+                                             players=2 if coop else 1)
+                            sim.interpolation = pacer is not None
+                        if pacer is not None:
+                            pacer.resync()
+                        # the assets are in: out of every collection from here on
+                        gc_control.freeze()
+                        gc_control.play()
+                        if allocs is not None:
+                            watch_allocations(allocs, renderer)
+                        if args.host is not None:
+                            host = Host(args.host, args.transport, sim=sim)
+                            print(f"hosting co-op on port {host.port} ({args.transport})")
+                        if coop:
+                            # rewinding would pull the world out from under the partner
+                            print("rewind is off in co-op")
+                        elif args.record:
+                            recording = Recording(seed, args.engine, sim.now)
+                            # a replay is one run of inputs; it can't follow a rewind
+                            print("rewind is off while recording")
+                        else:
+                            rewind = RewindBuffer()
+                            renderer.end_hint = f"R: retry from {RETRY_SECONDS}s before the end"
+                        attach_profiler(profiler, sim, renderer)
+                        # play background music if available
+                        try:
+                            pygame.mixer.music.play(loops=-1)
+                        except Exception:
+                            pass
+            if profiler.enabled:
+                timer.mark()  # the menu isn't profiled
+            continue
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                if start_btn.collidepoint(event.pos):
-                    show_menu = False
-                    # play background music if available
-                    try:
-                        pygame.mixer.music.play(loops=-1)
-                    except Exception:
-                        pass
-        continue
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                profiler.toggle()
+                attach_profiler(profiler, sim, renderer)
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                export_trace(profiler)
+            elif sim.game_over and event.type == pygame.MOUSEBUTTONDOWN:
+                if click_on_restart(event.pos):
+                    restart = True
+                    sim.reset()
+                    voices.reset()
+                    gc_control.safe_window('restart')  # the old world's cycles
+                    if rewind is not None:
+                        rewind.clear()
+            elif sim.finished and rewind is not None and event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_r:
+                    # instant retry: back to a few seconds before the end
+                    rewind.restore(sim, RETRY_SECONDS * FPS)
+                    voices.reset()
+            elif not sim.finished and event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    fire_pressed = True
+        if profiler.enabled:
+            timer.lap('events')
 
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        elif game_over and event.type == pygame.MOUSEBUTTONDOWN:
-            if click_on_restart(event.pos):
-                reset_game()
-        elif not game_over and not game_win and event.type == pygame.KEYDOWN:
-            # For compatibility: still allow single-shot on press
-            if event.key == pygame.K_SPACE:
-                player.shoot()
-
-    if game_over or game_win:
-        screen.blit(background, (0, bg_y % HEIGHT))
-        screen.blit(background, (0, (bg_y % HEIGHT) - HEIGHT))
-        font = pygame.font.SysFont(None, 72)
-        if game_win:
-            msg = font.render("YOU WIN!", True, (255, 255, 0))
-            try:
-                fireworks_sound.play()
-            except Exception:
-                pass
-        else:
-            msg = font.render("GAME OVER", True, (255, 0, 0))
-        screen.blit(msg, (WIDTH//2 - msg.get_width()//2, HEIGHT//2))
-
-        if game_over:
-            restart_btn = draw_restart_icon()
-
-        pygame.display.flip()
-        continue
-
-    # --- UPDATE & SPAWN ---
-    all_sprites.update()
-    items.update()
-    bullets.update()
-    enemies.update()
-
-    bg_y += SCROLL_SPEED
-    world_y += SCROLL_SPEED
-
-    if world_y - last_enemy_spawn > ENEMY_SPAWN_INTERVAL:
-        last_enemy_spawn = world_y
-        enemy_count = 1 if level < 3 else 2
-        for _ in range(enemy_count):
-            x = random.randint(20, WIDTH - 70)
-            y = random.randint(-300, -30)
-            enemy = Enemy(x, y)
-            all_sprites.add(enemy)
-            enemies.add(enemy)
-
-    # --- COLLISIONS & LEVEL UP ---
-    hits = pygame.sprite.groupcollide(enemies, bullets, True, True)
-    for hit in hits:
-        try:
-            explosion_sound.play()
-        except Exception:
-            pass
-        explosion = Explosion(hit.rect.center)
-        all_sprites.add(explosion)
-        enemies_destroyed += 1
-
-        # item drop chance
-        if random.random() < ITEM_DROP_CHANCE:
-            typ = random.choice(["health", "fast_fire", "multi_shot"])
-            it = Item(hit.rect.centerx, hit.rect.centery, typ)
-            items.add(it); all_sprites.add(it)
-
-        if enemies_destroyed >= enemies_required:
-            if level < MAX_LEVEL:
-                level += 1
-                enemies_destroyed = 0
-                enemies_required = 5 + level * 3
-                level_transition = True
-                level_transition_start = pygame.time.get_ticks()
+        keys = pygame.key.get_pressed()
+        # fixed pacing runs as many ticks as wall time owes (0 on a fast display)
+        ticks = 1 if pacer is None else pacer.ticks()
+        effects = []  # every tick's, for the particles
+        for _ in range(ticks):
+            if rewind is not None and keys[pygame.K_BACKSPACE] and not sim.finished:
+                # held BACKSPACE plays the buffer backwards instead of stepping
+                rewind.restore(sim, REWIND_SPEED)
+                fire_pressed = False
+                continue
+            inputs = Inputs.from_keys(keys, fire_pressed)
+            fire_pressed = False
+            was_finished = sim.finished
+            if host is not None:
+                host.poll()
+                partner_inputs, partner_restart = host.partner_inputs()
+                if partner_restart and sim.game_over:
+                    sim.reset()
+                    voices.reset()
+                events = sim.step(dt, inputs, partner_inputs)
+                host.send_snapshots()
             else:
-                game_win = True
-
-
-    # --- PLAYER HIT ---
-    if pygame.time.get_ticks() > player.invulnerable_until:
-        hits_p = pygame.sprite.spritecollide(player, enemies, True, pygame.sprite.collide_rect)
-        if hits_p:
-            lives -= len(hits_p)
-            player.invulnerable_until = pygame.time.get_ticks() + 1200
-            if lives <= 0:
-                lives = 0; game_over = True
-
-    # --- PLAYER PICKUPS ---
-    pickups = pygame.sprite.spritecollide(player, items, True, pygame.sprite.collide_rect)
-    for it in pickups:
-        try:
-            pickup_sound.play()
-        except Exception:
-            pass
-        if it.type == "health":
-            if lives < MAX_LIVES:
-                lives += 1
-        elif it.type == "fast_fire":
-            dur = random.randint(POWER_DURATION_MIN, POWER_DURATION_MAX)
-            player.powers['fast_fire'] = pygame.time.get_ticks() + dur
-        elif it.type == "multi_shot":
-            dur = random.randint(POWER_DURATION_MIN, POWER_DURATION_MAX)
-            player.powers['multi_shot'] = pygame.time.get_ticks() + dur
-       
-
-    # --- DRAWING ---
-    screen.blit(background, (0, bg_y % HEIGHT))
-    screen.blit(background, (0, (bg_y % HEIGHT) - HEIGHT))
-
-    for sprite in all_sprites:
-        if sprite != player:
-            screen.blit(sprite.image, sprite.rect)
-    player.draw(screen)
-
-    # draw items and bullets on top
-    for it in items:
-        screen.blit(it.image, it.rect)
-    for b in bullets:
-        screen.blit(b.image, b.rect)
-
-    font = pygame.font.SysFont(None, 28)
-    hud = font.render(f"Level: {level}   Lives: {lives}", True, (255, 255, 255))
-    screen.blit(hud, (10, 10))
-    enemy_info = font.render(f"Enemies: {enemies_destroyed}/{enemies_required}", True, (255, 255, 255))
-    screen.blit(enemy_info, (10, 40))
+                events = sim.step(dt, inputs)
+            effects += sim.effects
+            if recording is not None:
+                recording.record(dt, inputs, restart)
+                recording.checkpoint(sim)
+            restart = False
+            if rewind is not None and not was_finished:
+                rewind.push(sim)
+            voices.play_events(events, sim.now, occasion=sim.level)
+            # the fade and the end screen hide a full collection
+            if 'level_up' in events:
+                gc_control.safe_window('level')
+            elif sim.finished and not was_finished:
+                gc_control.safe_window('end')
+            if args.join and sim.lost:
+                print("lost the connection to the host")
+                running = False
+                break
 
-    # show active powers timers
-    now = pygame.time.get_ticks()
-    x = WIDTH - 8; y = 8
-    for name, expire in list(player.powers.items()):
-        rem = max(0, (expire - now) // 1000)
-        if name == 'fast_fire':
-            txt = f"FastFire: {rem}s"
-        elif name == 'multi_shot':
-            txt = f"MultiShot: {rem}s"
+        if sim.finished:
+            renderer.end(sim)
         else:
-            txt = f"{name}: {rem}s"
-        surf = font.render(txt, True, (230,230,230))
-        r = surf.get_rect(topright=(x,y))
-        screen.blit(surf, r)
-        y += surf.get_height() + 6
-
-
-    # --- LEVEL TRANSITION EFFECT (fade in/out, non-blocking) ---
-        if level_transition:
-            elapsed = pygame.time.get_ticks() - level_transition_start
-            if elapsed < transition_duration:
-                # Tính alpha (độ trong suốt) từ 0→255→0
-                half = transition_duration / 2
-                if elapsed < half:
-                    alpha = int((elapsed / half) * 255)
-                else:
-                    alpha = int(((transition_duration - elapsed) / half) * 255)
-
-                # Tạo surface mờ dần
-                overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-                text = pygame.font.SysFont(None, 72).render(f"LEVEL {level} START!", True, (255, 255, 0))
-                text.set_alpha(alpha)
-                overlay.blit(text, (WIDTH//2 - text.get_width()//2, HEIGHT//2 - text.get_height()//2))
-                screen.blit(overlay, (0, 0))
-            else:
-                level_transition = False
-                try:
-                        fireworks_sound.play()
-                except Exception:
-                        pass
-                # Kết thúc hiệu ứng chuyển cấp
-    pygame.display.flip()
-
-pygame.quit()
-sys.exit()
\ No newline at end of file
+            renderer.game(sim, pacer.alpha if pacer is not None else 1.0, effects)
+            if governor is not None:
+                # busy time only: the limiter's sleep isn't load
+                tier = governor.observe((time.perf_counter() - frame_start) * 1000)
+                if tier is not None:
+                    apply_tier(tier, renderer, voices)
+        if pacer is not None:
+            pacer.presented()
+        gc_control.frame()
+        if allocs is not None:
+            allocs.end_frame()
+        if profiler.enabled:
+            profiler.end_frame()
+
+    print("voices:", voices.stats())
+    if pacer is not None:
+        print("pacing:", pacer.stats())
+    print("gc:", gc_control.stats())
+    gc_control.close()
+    if allocs is not None:
+        print(allocs.report())
+        allocs.stop()
+    if host is not None:
+        print("netplay:", host.stats())
+        host.close()
+    elif args.join and sim is not None:
+        print("netplay:", sim.stats())
+        sim.close()
+    if rewind is not None:
+        print("rewind:", rewind.stats())
+    if governor is not None:
+        print("quality:", governor.stats())
+        governor.close()
+    if recording is not None:
+        recording.save(args.record)
+        print(f"recorded {len(recording)} frames (seed {seed}) to {args.record}")
+    if args.trace_out:
+        export_trace(profiler, args.trace_out)
+    pygame.quit()
+    sys.exit()
+
+
+if __name__ == "__main__":
+    main()
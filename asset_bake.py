@@ -0,0 +1,161 @@
+"""Baked asset cache: pre-scaled pixels and pre-decoded audio in one file.
+
+Decoding the PNGs (several are 1024x1536) and scaling them dominates startup.
+The bake stores every image at its final size as raw RGB/RGBA bytes and every
+sound as raw samples in the mixer's format, behind a small JSON index:
+
+    MAGIC | index length (uint32) | index JSON | padding | blobs...
+
+``AssetBake`` memory-maps the file and hands out Surfaces and Sounds that
+read straight from the mapping, so a warm start does no decoding or scaling
+at all, only the convert() into the display format. The index records the
+size and mtime of every source file, the image specs and the mixer format;
+anything that no longer matches is simply not served from the bake.
+
+    python asset_bake.py            # (re)bake assets/ into assets.bake
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+
+import pygame
+
+BAKE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets.bake")
+BAKE_VERSION = 1
+MAGIC = b"SIBAKE01"
+ALIGN = 16
+_HEADER = struct.Struct("<8sI")
+
+
+def source_stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _pad(offset):
+    return -offset % ALIGN
+
+
+def write_bake(path, images, sounds, sources, specs, mixer_format):
+    """Write ``images`` {name: Surface} and ``sounds`` {name: raw bytes}.
+
+    ``sources`` maps every source file name to its source_stamp(); ``specs``
+    is anything JSON-able describing how images were scaled. Written to a temp
+    file and renamed into place, so a running game never maps a half file.
+    """
+    blobs = []
+    index = {
+        'version': BAKE_VERSION,
+        'sources': sources,
+        'specs': specs,
+        'mixer': list(mixer_format) if mixer_format else None,
+        'images': {},
+        'sounds': {},
+    }
+    offset = 0
+    for name, surf in images.items():
+        fmt = 'RGBA' if surf.get_flags() & pygame.SRCALPHA else 'RGB'
+        data = pygame.image.tobytes(surf, fmt)
+        index['images'][name] = {'offset': offset, 'length': len(data),
+                                 'size': list(surf.get_size()), 'format': fmt}
+        blobs.append(data)
+        offset += len(data) + _pad(len(data))
+    for name, data in sounds.items():
+        index['sounds'][name] = {'offset': offset, 'length': len(data)}
+        blobs.append(data)
+        offset += len(data) + _pad(len(data))
+
+    head = json.dumps(index, separators=(',', ':')).encode()
+    start = _HEADER.size + len(head)
+    start += _pad(start)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(head)))
+        f.write(head)
+        f.write(bytes(start - f.tell()))
+        for data in blobs:
+            f.write(data)
+            f.write(bytes(_pad(len(data))))
+    os.replace(tmp, path)
+    return path
+
+
+class AssetBake:
+    def __init__(self, path=BAKE_PATH):
+        self.path = path
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, head_len = _HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not an asset bake")
+        self.index = json.loads(self.map[_HEADER.size:_HEADER.size + head_len])
+        start = _HEADER.size + head_len
+        self.base = start + _pad(start)
+        self.view = memoryview(self.map)
+
+    @classmethod
+    def open(cls, path=BAKE_PATH):
+        """The bake at ``path``, or None if it is missing or unreadable."""
+        try:
+            return cls(path)
+        except (OSError, ValueError, struct.error):
+            return None
+
+    def close(self):
+        # surfaces/sounds built on the mapping keep it alive; drop refs first
+        self.view = None
+        try:
+            self.map.close()
+        except BufferError:
+            pass
+
+    def is_fresh(self, sources, specs):
+        index = self.index
+        return (index.get('version') == BAKE_VERSION
+                and index.get('sources') == sources
+                and index.get('specs') == specs)
+
+    def _blob(self, entry):
+        start = self.base + entry['offset']
+        return self.view[start:start + entry['length']]
+
+    def image(self, name):
+        """Unconverted Surface reading from the mapping, or None if not baked."""
+        entry = self.index['images'].get(name)
+        if entry is None:
+            return None
+        return pygame.image.frombuffer(self._blob(entry), tuple(entry['size']), entry['format'])
+
+    def sound(self, name, mixer_format):
+        """Sound from the baked samples if they match ``mixer_format``, else None."""
+        entry = self.index['sounds'].get(name)
+        if entry is None or self.index.get('mixer') != list(mixer_format or ()):
+            return None
+        return pygame.mixer.Sound(buffer=self._blob(entry))
+
+
+def main(argv=None):
+    import resources
+
+    path = argv[0] if argv else BAKE_PATH
+    try:
+        pygame.mixer.pre_init(*resources.MIXER_FORMAT)
+        pygame.mixer.init()
+    except pygame.error:
+        print("no audio device: baking images only")
+    resources.bake = None  # decode from the source files
+    images = resources.decode_images(resources.IMAGE_SPECS)
+    resources.load_sounds()
+    resources.save_bake(images, path)
+    print(f"baked {len(images)} images, {len(resources.baked_sounds())} sounds "
+          f"into {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,204 @@
+"""Voice management for sound effects.
+
+Simulation events used to map straight to ``Sound.play()``: fast_fire shots,
+every explosion of a multi-kill frame and the win fanfare (once per frame on
+the win screen) all took mixer channels and mixing time, stacking identical
+voices. VoiceManager sits in between:
+
+- each category gets its own reserved mixer channels, so a wall of
+  explosions can't starve the player's shots or the fanfare;
+- identical triggers inside a sound's merge window fold into the voice already
+  playing (it gets a little louder instead of doubling up);
+- after that, a sound won't start again before its minimum interval;
+- when a category's channels are all busy the lowest-priority (then oldest)
+  voice is stolen, if the new sound's priority is at least as high;
+- one-shot sounds (level start, win) play once per occasion until reset();
+- set_limit() caps the voices each category may use (the quality governor
+  lowers it on slow machines).
+
+Times are simulation ms, so behaviour is the same at any frame rate. Without a
+mixer every decision and counter still runs; only the playback is skipped.
+"""
+from collections import namedtuple
+
+import pygame
+
+import resources
+
+# category -> reserved channels
+CHANNELS = {
+    'player': 2,
+    'impact': 4,
+    'pickup': 1,
+    'fanfare': 1,
+}
+
+SoundSpec = namedtuple('SoundSpec', 'sound category priority merge_ms min_interval_ms one_shot volume')
+# event name -> how it sounds; ``sound`` is an attribute of resources
+SOUNDS = {
+    'shoot': SoundSpec('shoot_sound', 'player', 1, 20, 60, False, 1.0),
+    'explosion': SoundSpec('explosion_sound', 'impact', 2, 40, 0, False, 1.0),
+    'pickup': SoundSpec('pickup_sound', 'pickup', 3, 50, 0, False, 1.0),
+    'level_start': SoundSpec('fireworks_sound', 'fanfare', 5, 0, 0, True, 1.0),
+    'win': SoundSpec('fireworks_sound', 'fanfare', 6, 0, 0, True, 1.0),
+}
+MERGE_GAIN = 0.15  # extra volume per trigger merged into a voice
+MAX_VOLUME = 1.0
+
+
+class Voice:
+    __slots__ = ('channel', 'name', 'priority', 'start', 'until', 'volume')
+
+    def __init__(self, channel):
+        self.channel = channel  # pygame Channel, or None without a mixer
+        self.name = None
+        self.priority = 0
+        self.start = 0.0
+        self.until = 0.0  # sim ms when the sound ends
+        self.volume = 0.0
+
+    def busy(self, now):
+        return self.name is not None and now < self.until
+
+
+class VoiceManager:
+    def __init__(self, channels=None, sounds=None):
+        self.sounds = SOUNDS if sounds is None else sounds
+        channels = CHANNELS if channels is None else channels
+        mixer_channels = self._reserve(sum(channels.values()))
+        self.voices = {}  # category -> [Voice]
+        first = 0
+        for category, count in channels.items():
+            self.voices[category] = [
+                Voice(mixer_channels[i] if mixer_channels else None)
+                for i in range(first, first + count)
+            ]
+            first += count
+        self.last = {}  # sound name -> (start ms, Voice) of its latest voice
+        self.occasions = set()  # (name, occasion) one-shots already played
+        self.counts = {}  # sound name -> {'played', 'merged', 'dropped', ...}
+        self.limit = None  # max voices used per category (quality governor), None = all
+        self.played = 0
+        self.merged = 0
+        self.dropped = 0
+        self.stolen = 0
+
+    def set_limit(self, limit):
+        """Use at most ``limit`` voices per category from now on; None lifts it.
+
+        Voices past the limit finish what they're playing but aren't reused.
+        """
+        self.limit = limit
+
+    @staticmethod
+    def _reserve(total):
+        if not pygame.mixer.get_init():
+            return None
+        if pygame.mixer.get_num_channels() < total:
+            pygame.mixer.set_num_channels(total)
+        # reserved channels are never handed out by Sound.play()/find_channel()
+        pygame.mixer.set_reserved(total)
+        return [pygame.mixer.Channel(i) for i in range(total)]
+
+    def reset(self):
+        """New game: re-arm one-shots and silence everything."""
+        self.occasions.clear()
+        self.last.clear()
+        for voices in self.voices.values():
+            for voice in voices:
+                if voice.channel is not None:
+                    voice.channel.stop()
+                voice.name = None
+
+    def _count(self, name, outcome):
+        counts = self.counts.get(name)
+        if counts is None:
+            counts = self.counts[name] = {'played': 0, 'merged': 0, 'dropped': 0, 'stolen': 0}
+        counts[outcome] += 1
+
+    def _drop(self, name):
+        self.dropped += 1
+        self._count(name, 'dropped')
+        return False
+
+    def play(self, name, now, occasion=None):
+        """Trigger the sound for event ``name``; True if a voice started.
+
+        ``occasion`` tells one-shots apart (e.g. the level that started); a
+        one-shot plays once per (name, occasion) until reset().
+        """
+        spec = self.sounds.get(name)
+        if spec is None:
+            return False
+
+        if spec.one_shot:
+            key = (name, occasion)
+            if key in self.occasions:
+                return self._drop(name)
+            self.occasions.add(key)
+
+        last = self.last.get(name)
+        if last is not None:
+            started, voice = last
+            since = now - started
+            if since < spec.merge_ms and voice.name == name and voice.busy(now):
+                voice.volume = min(MAX_VOLUME, voice.volume + MERGE_GAIN)
+                if voice.channel is not None:
+                    voice.channel.set_volume(voice.volume)
+                self.merged += 1
+                self._count(name, 'merged')
+                return False
+            if since < spec.min_interval_ms:
+                return self._drop(name)
+
+        voice = self._pick_voice(spec, now)
+        if voice is None:
+            return self._drop(name)
+        if voice.busy(now):
+            self.stolen += 1
+            self._count(voice.name, 'stolen')
+
+        sound = getattr(resources, spec.sound)
+        voice.name = name
+        voice.priority = spec.priority
+        voice.start = now
+        voice.until = now + sound.get_length() * 1000
+        voice.volume = spec.volume
+        if voice.channel is not None:
+            try:
+                voice.channel.play(sound)
+                voice.channel.set_volume(spec.volume)
+            except Exception:
+                pass
+        self.last[name] = (now, voice)
+        self.played += 1
+        self._count(name, 'played')
+        return True
+
+    def _pick_voice(self, spec, now):
+        """A free voice in the category, else the one to steal, else None."""
+        victim = None
+        voices = self.voices[spec.category]
+        if self.limit is not None:
+            voices = voices[:self.limit]
+        for voice in voices:
+            if not voice.busy(now):
+                return voice
+            if victim is None or (voice.priority, voice.start) < (victim.priority, victim.start):
+                victim = voice
+        if victim is not None and victim.priority <= spec.priority:
+            return victim
+        return None
+
+    def play_events(self, events, now, occasion=None):
+        for name in events:
+            self.play(name, now, occasion)
+
+    def stats(self):
+        return {
+            'played': self.played,
+            'merged': self.merged,
+            'dropped': self.dropped,
+            'stolen': self.stolen,
+            'sounds': {name: dict(c) for name, c in self.counts.items()},
+        }
@@ -0,0 +1,96 @@
+"""Spatial-hash broad phase vs pygame.sprite.groupcollide.
+
+Half the entities are 50x50 enemies, half 12x28 bullets, scattered over a
+field that grows with the count so density stays near a busy level (about
+``--per-screen`` entities per 640x800 screen). Both implementations run on
+identical copies of the scene and their hit sets are checked for equality.
+
+    python -m benchmarks.bench_collision
+    python -m benchmarks.bench_collision --counts 100 1000 10000 --repeat 5
+"""
+import argparse
+import math
+import random
+import time
+
+import pygame
+
+import collision
+from settings import WIDTH, HEIGHT
+
+
+def make_scene(count, per_screen, seed):
+    rng = random.Random(seed)
+    screens = max(1.0, count / per_screen)
+    scale = math.sqrt(screens)
+    field_w, field_h = int(WIDTH * scale), int(HEIGHT * scale)
+    enemies, bullets = [], []
+    for i in range(count):
+        w, h = (50, 50) if i % 2 == 0 else (12, 28)
+        rect = (rng.randint(0, field_w - w), rng.randint(0, field_h - h), w, h)
+        (enemies if i % 2 == 0 else bullets).append(rect)
+    return enemies, bullets
+
+
+def build_groups(enemy_rects, bullet_rects):
+    groups = []
+    for rects in (enemy_rects, bullet_rects):
+        group = pygame.sprite.Group()
+        for i, r in enumerate(rects):
+            sprite = pygame.sprite.Sprite(group)
+            sprite.rect = pygame.Rect(r)
+            sprite.index = i
+        groups.append(group)
+    return groups
+
+
+def as_indices(crashed):
+    return [(a.index, [b.index for b in bs]) for a, bs in crashed.items()]
+
+
+def time_call(fn, scene, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        enemies, bullets = build_groups(*scene)
+        start = time.perf_counter()
+        result = fn(enemies, bullets)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, as_indices(result)
+
+
+def pygame_collide(enemies, bullets):
+    return pygame.sprite.groupcollide(enemies, bullets, True, True)
+
+
+def hashed_collide(enemies, bullets):
+    # includes the per-step rebuild, as the game pays it every frame
+    grid = collision.SpatialHash()
+    grid.rebuild(enemies)
+    return collision.groupcollide(enemies, bullets, True, True, grid)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--counts", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--per-screen", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    print(f"{'entities':>9} {'groupcollide ms':>16} {'spatial hash ms':>16} {'speedup':>8} {'hits':>6}")
+    for count in args.counts:
+        scene = make_scene(count, args.per_screen, args.seed)
+        # the O(n*m) baseline gets slow at 10k; one run is plenty there
+        repeat = args.repeat if count <= 2000 else 1
+        t_pg, hits_pg = time_call(pygame_collide, scene, repeat)
+        t_sh, hits_sh = time_call(hashed_collide, scene, args.repeat)
+        if hits_pg != hits_sh:
+            raise SystemExit(f"hit sets differ at {count} entities")
+        print(f"{count:>9} {t_pg * 1000:>16.3f} {t_sh * 1000:>16.3f} "
+              f"{t_pg / t_sh:>7.1f}x {len(hits_sh):>6}")
+
+
+if __name__ == "__main__":
+    main()
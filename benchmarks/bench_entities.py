@@ -0,0 +1,84 @@
+"""Per-tick cost of bullet/enemy movement: Sprite groups vs NumPy arrays.
+
+Each row times one tick's worth of updates (two passes, as the game does) for
+N bullets plus N/10 enemies, then drawing the same number of entities when
+all of them are on screen. Nothing leaves the field during the update run:
+bullets start far below the screen and enemies far above it. The array
+engine runs with ``array_min=0`` so even the small counts stay in the arrays.
+
+    python -m benchmarks.bench_entities
+    python -m benchmarks.bench_entities --counts 1000 10000 --ticks 120
+"""
+import argparse
+import functools
+import random
+import time
+
+import pygame
+
+import simulation
+from settings import WIDTH, HEIGHT, FRAME_MS
+from entity_engine import ArraySimulation
+from sprites import ENEMY_TYPES
+
+FRAME_BUDGET_MS = FRAME_MS
+
+
+def populate(sim, bullets, enemies, seed, on_screen=False):
+    rng = random.Random(seed)
+    if on_screen:
+        bullet_y, enemy_y = (30, HEIGHT), (0, HEIGHT - 50)
+    else:
+        bullet_y, enemy_y = (HEIGHT, HEIGHT * 40), (-HEIGHT * 40, -HEIGHT)
+    for _ in range(bullets):
+        sim.spawn_bullet(rng.randint(0, WIDTH), rng.randint(*bullet_y))
+    for _ in range(enemies):
+        sim.spawn_enemy(rng.randint(0, WIDTH - 50), rng.randint(*enemy_y),
+                        rng.choice(ENEMY_TYPES))
+
+
+def time_updates(sim, ticks):
+    start = time.perf_counter()
+    for _ in range(ticks):
+        sim.clock.advance(FRAME_MS)
+        sim.update_entities(sim.now, simulation.NO_INPUT)
+    return (time.perf_counter() - start) * 1000 / ticks
+
+
+def time_render(sim, surface, ticks):
+    start = time.perf_counter()
+    for _ in range(ticks):
+        for layer in ('enemies', 'bullets'):
+            surface.blits(sim.layer_blits(layer), doreturn=False)
+    return (time.perf_counter() - start) * 1000 / ticks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--counts", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--ticks", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    simulation.init_headless()
+    surface = pygame.Surface((WIDTH, HEIGHT))
+    print(f"{'bullets':>8} {'enemies':>8} {'sprite upd ms':>14} {'array upd ms':>13} "
+          f"{'sprite draw ms':>15} {'array draw ms':>14}")
+    for count in args.counts:
+        row = []
+        for cls in (simulation.GameSimulation, functools.partial(ArraySimulation, array_min=0)):
+            caps = {'bullet': count, 'enemy': count}
+            sim = cls(seed=args.seed, pool_caps=caps)
+            populate(sim, count, count // 10, args.seed)
+            update_ms = time_updates(sim, args.ticks)
+            sim = cls(seed=args.seed, pool_caps=caps)
+            populate(sim, count, count // 10, args.seed, on_screen=True)
+            row.append((update_ms, time_render(sim, surface, args.ticks)))
+        (s_upd, s_draw), (a_upd, a_draw) = row
+        print(f"{count:>8} {count // 10:>8} {s_upd:>14.3f} {a_upd:>13.3f} "
+              f"{s_draw:>15.3f} {a_draw:>14.3f}")
+    print(f"frame budget at 60 FPS: {FRAME_BUDGET_MS:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Environment throughput: env steps per second, single and vectorized.
+
+Every env holds fire (a fixed action) so the measurement is the game plus the
+observation, not a policy. SubprocVecEnv should scale with ``--workers`` up to
+the core count; give several counts for a scaling table (speedup against
+SyncVecEnv with the same envs).
+
+    python -m benchmarks.bench_env --envs 64 --workers 8
+    python -m benchmarks.bench_env --envs 64 --workers 1 2 4 8
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+import env
+import simulation
+from simulation import Inputs
+
+FIRE = env.inputs_action(Inputs(fire=True))
+
+
+def bench_single(steps, obs_type, frame_skip):
+    e = env.GameEnv(obs_type=obs_type, frame_skip=frame_skip)
+    e.reset(seed=0)
+    start = time.perf_counter()
+    for i in range(steps):
+        _, _, term, trunc, _ = e.step(FIRE)
+        if term or trunc:
+            e.reset(seed=i)
+    return steps / (time.perf_counter() - start)
+
+
+def bench_vec(vec, steps):
+    actions = np.full(vec.num_envs, FIRE)
+    vec.reset()
+    start = time.perf_counter()
+    for _ in range(steps):
+        vec.step(actions)
+    elapsed = time.perf_counter() - start
+    vec.close()
+    return steps * vec.num_envs / elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--steps", type=int, default=2000, help="steps per env")
+    parser.add_argument("--envs", type=int, default=16)
+    parser.add_argument("--workers", type=int, nargs="+", default=[os.cpu_count()])
+    parser.add_argument("--obs", choices=('vector', 'frame'), default='vector')
+    parser.add_argument("--frame-skip", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    simulation.init_headless()
+    kwargs = {'obs_type': args.obs, 'frame_skip': args.frame_skip}
+    print(f"obs={args.obs} frame_skip={args.frame_skip}, {os.cpu_count()} cores")
+    sync = bench_vec(env.SyncVecEnv(args.envs, **kwargs), args.steps // 4)
+    rates = [
+        ("GameEnv", bench_single(args.steps, args.obs, args.frame_skip)),
+        (f"SyncVecEnv({args.envs})", sync),
+    ]
+    for workers in args.workers:
+        rates.append((f"SubprocVecEnv({args.envs}, {workers}w)",
+                      bench_vec(env.SubprocVecEnv(args.envs, workers=workers, **kwargs), args.steps // 4)))
+    for label, rate in rates:
+        print(f"{label:<24} {rate:>10.0f} steps/s {rate / sync:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
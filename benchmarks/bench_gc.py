@@ -0,0 +1,109 @@
+"""Garbage collection: frame times with Python's collector against GCControl.
+
+Runs each stress scenario twice, first with automatic collection as Python
+does it, then the way the game runs it (memory.GCControl: assets frozen, no
+automatic passes during play, full passes at level-ups and the end screen).
+A frame is the simulation step plus a full render. Prints frame p50/p99/max,
+the automatic collections per generation that ran during play and the longest
+of their pauses, the young passes the backstop forced, and the longest
+safe-window collection. ``--alloc`` adds a third, 'traced' run: windows
+with the allocation counter on, its report printed (its times include
+tracemalloc's overhead).
+
+    python -m benchmarks.bench_gc
+    python -m benchmarks.bench_gc --scenario bullet_hell --shots 8000 --alloc
+"""
+import argparse
+import gc
+import time
+
+import pygame
+
+import render
+import simulation
+from benchmarks import stress
+from memory import AllocationTracker, GCControl
+from profiling import percentile
+from settings import WIDTH, HEIGHT, FRAME_MS
+from sprites import Bullet, Item, Player
+
+
+def run(scenario, mode, opts):
+    sim = simulation.make_simulation(opts.engine, seed=opts.seed)
+    hook = stress.SCENARIOS[scenario](sim, opts)
+    renderer = render.RENDERERS['full'](pygame.display.get_surface())
+    control = GCControl(enabled=mode != 'auto')
+    control.freeze()
+    control.play()
+    allocs = None
+    if mode == 'traced':
+        allocs = AllocationTracker()
+        allocs.start()
+        allocs.watch(Player, 'update')
+        allocs.watch(Bullet, '__init__')
+        allocs.watch(Item, '__init__')
+        allocs.watch(type(renderer), 'game', 'draw')
+    frames = []
+    try:
+        for frame in range(opts.warmup + opts.frames):
+            if frame == opts.warmup:
+                # count play from here: the warmup fills the pools and the screen
+                control.play_collections = [0, 0, 0]
+                control.play_pauses.clear()
+            if sim.finished:
+                sim.reset()
+                control.safe_window('restart')
+            if hook is not None:
+                hook(sim)
+            start = time.perf_counter()
+            events = sim.step(FRAME_MS, simulation.autopilot(sim))
+            if 'level_up' in events:
+                control.safe_window('level')
+            elif sim.finished:
+                control.safe_window('end')
+            renderer.game(sim)
+            control.frame()
+            if frame >= opts.warmup:
+                frames.append((time.perf_counter() - start) * 1000)
+            if allocs is not None:
+                allocs.end_frame()
+    finally:
+        control.close()
+        if allocs is not None:
+            print(allocs.report())
+            allocs.stop()
+    frames.sort()
+    stats = control.stats()
+    stats.update(p50=percentile(frames, 50), p99=percentile(frames, 99), max=frames[-1])
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", choices=sorted(stress.SCENARIOS), nargs="+",
+                        default=['bullet_hell', 'crowd', 'item_storm'])
+    parser.add_argument("--frames", type=int, default=1200)
+    parser.add_argument("--warmup", type=int, default=120)
+    parser.add_argument("--enemies", type=int, default=200, help="on-screen enemies for 'crowd'")
+    parser.add_argument("--shots", type=int, default=5000, help="live enemy shots for 'bullet_hell'")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engine", choices=simulation.ENGINES, default='sprites')
+    parser.add_argument("--alloc", action="store_true", help="add a run with the allocation counter and its report")
+    opts = parser.parse_args(argv)
+
+    simulation.init_headless()
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    print(f"{opts.engine} engine, full renderer, {opts.frames} frames, times in ms; "
+          f"collector thresholds {gc.get_threshold()}")
+    print(f"{'scenario':<12}{'gc':>8}{'p50':>8}{'p99':>8}{'max':>8}{'play gen0/1/2':>15}"
+          f"{'pause max':>10}{'forced':>7}{'window max':>11}")
+    for scenario in opts.scenario:
+        for mode in ('auto', 'windows') + (('traced',) if opts.alloc else ()):
+            s = run(scenario, mode, opts)
+            gens = '/'.join(str(n) for n in s['play_collections'])
+            print(f"{scenario:<12}{mode:>8}{s['p50']:>8.2f}{s['p99']:>8.2f}{s['max']:>8.2f}{gens:>15}"
+                  f"{s['play_pause_max_ms']:>10.2f}{s['forced']:>7}{s['window_max_ms']:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
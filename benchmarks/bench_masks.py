@@ -0,0 +1,88 @@
+"""Pixel-accurate collisions: what the mask narrow phase adds to a frame.
+
+Runs two copies of each stress scenario in lockstep, one colliding on rects
+only and one with the mask test after the rect test (the game's default),
+alternating frame by frame so machine noise hits both alike. A frame is the
+simulation step plus a full render. Prints the collision time (bullet/enemy
+hits, then player hits and pickups) and the whole frame for each, and the
+extra collision time as a share of the rect-only frame; exits non-zero if
+that goes over ``--budget`` percent in any scenario.
+
+    python -m benchmarks.bench_masks
+    python -m benchmarks.bench_masks --engine numpy --enemies 400
+"""
+import argparse
+import statistics
+import time
+
+import pygame
+
+import render
+import simulation
+from benchmarks import stress
+from profiling import PhaseTimer
+from settings import WIDTH, HEIGHT, FRAME_MS
+
+COLLISION_PHASES = ('collision', 'pickups')
+
+
+def bench(scenario, opts):
+    runs = []
+    for pixel in (False, True):
+        sim = simulation.make_simulation(opts.engine, seed=opts.seed)
+        sim.pixel_collisions = pixel
+        sim.phase_timer = PhaseTimer()
+        hook = stress.SCENARIOS[scenario](sim, opts)
+        renderer = render.RENDERERS['full'](pygame.display.get_surface())
+        runs.append({'sim': sim, 'hook': hook, 'renderer': renderer, 'collide': [], 'frame': [], 'entities': 0})
+    for frame in range(opts.warmup + opts.frames):
+        for run in runs:
+            sim, hook = run['sim'], run['hook']
+            if sim.finished:
+                sim.reset()
+            if hook is not None:
+                hook(sim)
+            start = time.perf_counter()
+            sim.phase_timer.mark()
+            sim.step(FRAME_MS, simulation.autopilot(sim))
+            phases = sim.phase_timer.end_frame()
+            run['renderer'].game(sim)
+            if frame >= opts.warmup:
+                run['frame'].append((time.perf_counter() - start) * 1000)
+                run['collide'].append(sum(phases.get(p, 0.0) for p in COLLISION_PHASES) * 1000)
+                run['entities'] += sum(sim.entity_counts().values())
+    rects, masks = ({'collide_ms': statistics.fmean(r['collide']), 'frame_ms': statistics.fmean(r['frame']),
+                     'entities': r['entities'] / opts.frames} for r in runs)
+    return rects, masks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", choices=sorted(stress.SCENARIOS), nargs="+",
+                        default=['crowd', 'multi_fast', 'item_storm'])
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--warmup", type=int, default=120)
+    parser.add_argument("--enemies", type=int, default=200, help="on-screen enemies for 'crowd'")
+    parser.add_argument("--shots", type=int, default=5000, help="live enemy shots for 'bullet_hell'")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engine", choices=simulation.ENGINES, default='sprites')
+    parser.add_argument("--budget", type=float, default=5.0, help="max extra collision time, %% of the frame")
+    opts = parser.parse_args(argv)
+
+    simulation.init_headless()
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    print(f"{opts.engine} engine, full renderer, {opts.frames} frames")
+    print(f"{'scenario':<12}{'entities':>9}{'rect coll ms':>13}{'mask coll ms':>13}"
+          f"{'rect frame':>11}{'mask frame':>11}{'added %':>9}")
+    failed = False
+    for scenario in opts.scenario:
+        rects, masks = bench(scenario, opts)
+        added = (masks['collide_ms'] - rects['collide_ms']) / rects['frame_ms'] * 100
+        failed |= added > opts.budget
+        print(f"{scenario:<12}{masks['entities']:>9.0f}{rects['collide_ms']:>13.3f}{masks['collide_ms']:>13.3f}"
+              f"{rects['frame_ms']:>11.3f}{masks['frame_ms']:>11.3f}{added:>9.2f}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,106 @@
+"""Netplay: how many co-op sessions one host process can carry, and what each costs on the wire.
+
+A dedicated Host runs in a child process (a bot flies player 1 of every
+game, as in ``netplay.py host``); this process connects ``--clients`` bot
+clients to it over localhost and steps them all at FPS for ``--seconds``.
+For every client count it prints the host's CPU per tick and per session,
+the sessions one core could hold at that rate, late host ticks, snapshot
+size, bandwidth per client and the input round trip (send -> host applies
+it -> snapshot back). Both processes share the machine's cores, so on a
+small box the clients' own work inflates the round trip at high counts.
+
+    python -m benchmarks.bench_netplay
+    python -m benchmarks.bench_netplay --clients 1 16 --transport tcp
+"""
+import argparse
+import multiprocessing
+import statistics
+import time
+
+import netplay
+import simulation
+from profiling import percentile
+from settings import FRAME_MS
+
+
+def host_main(transport, engine, seconds, queue):
+    simulation.init_headless()
+    games = iter(range(1 << 30))
+    host = netplay.Host(0, transport,
+                        sim_factory=lambda: simulation.make_simulation(engine, seed=next(games), players=2))
+    queue.put(host.port)
+    cpu = time.process_time()
+    host.serve(seconds, until_empty=True)
+    stats = host.stats()
+    stats['cpu_s'] = time.process_time() - cpu
+    host.close()
+    queue.put(stats)
+
+
+def run(count, opts):
+    queue = multiprocessing.Queue()
+    # the host gives up on its own a bit after the clients should have left
+    child = multiprocessing.Process(target=host_main,
+                                    args=(opts.transport, opts.engine, opts.seconds + 15, queue))
+    child.start()
+    port = queue.get()
+    clients = [netplay.Client(('127.0.0.1', port), opts.transport) for _ in range(count)]
+    period = FRAME_MS / 1000
+    frames = late = 0
+    start = next_tick = time.perf_counter()
+    while time.perf_counter() - start < opts.seconds:
+        wait = next_tick - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+        elif wait < -period:
+            late += 1
+        next_tick += period
+        for client in clients:
+            if client.finished:
+                client.reset()
+            client.step(FRAME_MS, netplay.bot_inputs(client))
+        frames += 1
+    client_stats = [c.stats() for c in clients]
+    rtts = sorted(ms for c in clients for ms in c.rtt_ms)
+    for client in clients:
+        client.close()
+    host = queue.get()
+    child.join()
+    return {
+        'host': host,
+        'client_frames': frames,
+        'client_late': late,
+        'rtt_ms': statistics.fmean(rtts) if rtts else float('nan'),
+        'rtt_p95_ms': percentile(rtts, 95) if rtts else float('nan'),
+        'down_kbps': statistics.fmean(s['down_kbps'] for s in client_stats),
+        'up_kbps': statistics.fmean(s['up_kbps'] for s in client_stats),
+        'missed': sum(s['missed'] for s in client_stats),
+        'corrections': sum(s['corrections'] for s in client_stats),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--transport", choices=netplay.TRANSPORTS, default='udp')
+    parser.add_argument("--engine", choices=simulation.ENGINES, default='sprites')
+    opts = parser.parse_args(argv)
+
+    simulation.init_headless()
+    print(f"{opts.transport}, {opts.engine} engine, {opts.seconds:g}s per run")
+    print(f"{'clients':>7}{'host ms/tick':>13}{'us/session':>11}{'per core':>9}{'late':>6}"
+          f"{'snap B':>8}{'full':>6}{'down kbps':>10}{'up kbps':>8}{'rtt ms':>8}{'p95':>7}{'missed':>7}{'fixes':>6}")
+    for count in opts.clients:
+        r = run(count, opts)
+        host = r['host']
+        cpu_ms = host['cpu_s'] * 1000 / max(1, host['ticks'])
+        per_session = cpu_ms / count
+        print(f"{count:>7}{cpu_ms:>13.3f}{per_session * 1000:>11.0f}{FRAME_MS / per_session:>9.0f}"
+              f"{host['late_ticks']:>6}{host['snapshot_bytes']:>8.0f}{host['full_snapshots']:>6}"
+              f"{r['down_kbps']:>10.1f}{r['up_kbps']:>8.1f}{r['rtt_ms']:>8.1f}{r['rtt_p95_ms']:>7.1f}"
+              f"{r['missed']:>7}{r['corrections']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Frame pacing: game speed, frame-time jitter and input latency per loop.
+
+Runs the game loop both ways for ``--seconds`` at each display rate: 'frame'
+is the old loop (clock.tick(rate), one step per drawn frame, dt = whatever
+tick returned), 'fixed' is pacing.FramePacer (sleep + spin limiter, fixed
+ticks, interpolated drawing). The autopilot plays; input is read after the
+wait as the game does. Prints ticks per wall second against the FPS the
+speed constants assume (1.00 = the game runs at the right speed), the
+frame rate, the spread of the intervals between frames (std and p99 off the
+target) with the frames that ran late, the input latency (input read to the
+end of the flip plus the delay interpolation adds) and that delay on its own.
+At a rate equal to FPS the fixed loop runs in lockstep, so the delay is 0.
+
+    python -m benchmarks.bench_pacing
+    python -m benchmarks.bench_pacing --rates 60 120 144 --scenario crowd --seconds 10
+"""
+import argparse
+import time
+
+import pygame
+
+import render
+import simulation
+from benchmarks import stress
+from pacing import FramePacer
+from settings import WIDTH, HEIGHT, FPS, FRAME_MS
+
+
+def run(mode, rate, opts):
+    sim = simulation.make_simulation(opts.engine, seed=opts.seed)
+    sim.interpolation = mode == 'fixed'
+    sim.lives = stress.UNKILLABLE_LIVES
+    hook = stress.SCENARIOS[opts.scenario](sim, opts) if opts.scenario else None
+    renderer = render.RENDERERS[opts.render](pygame.display.get_surface())
+    if mode == 'fixed':
+        pacer = FramePacer(rate)
+    else:
+        pacer = FramePacer(rate, limit=False)  # measures only; clock.tick paces
+        clock = pygame.time.Clock()
+    start = time.perf_counter()
+    while time.perf_counter() - start < opts.seconds:
+        if mode == 'fixed':
+            pacer.wait()
+            ticks, dt = pacer.ticks(), FRAME_MS
+        else:
+            dt = clock.tick(rate)
+            pacer.wait()
+            ticks = 1
+        pygame.event.pump()
+        effects = []
+        for _ in range(ticks):
+            if sim.finished:
+                sim.reset()
+                sim.lives = stress.UNKILLABLE_LIVES
+            if hook is not None:
+                hook(sim)
+            sim.step(dt, simulation.autopilot(sim))
+            effects += sim.effects
+        renderer.game(sim, pacer.alpha, effects)
+        pacer.presented()
+    stats = pacer.stats()
+    stats['speed'] = stats['ticks'] / (time.perf_counter() - start) / FPS if mode == 'fixed' \
+        else stats['frames'] / (time.perf_counter() - start) / FPS
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rates", type=int, nargs="+", default=[60, 144])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--scenario", choices=sorted(stress.SCENARIOS), help="load to run under (default: plain play)")
+    parser.add_argument("--enemies", type=int, default=200, help="on-screen enemies for 'crowd'")
+    parser.add_argument("--shots", type=int, default=5000, help="live enemy shots for 'bullet_hell'")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engine", choices=simulation.ENGINES, default='sprites')
+    parser.add_argument("--render", choices=sorted(render.RENDERERS), default='full')
+    opts = parser.parse_args(argv)
+
+    simulation.init_headless()
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    print(f"{opts.engine} engine, {opts.render} renderer, {opts.scenario or 'play'}, {opts.seconds:g}s per run")
+    print(f"{'loop':<7}{'rate':>5}{'speed':>7}{'fps':>7}{'frame ms':>9}{'jitter':>8}{'p99 off':>8}{'late':>6}"
+          f"{'input ms':>9}{'p99':>7}{'interp':>7}{'spin ms':>8}")
+    for rate in opts.rates:
+        for mode in ('frame', 'fixed'):
+            s = run(mode, rate, opts)
+            print(f"{mode:<7}{rate:>5}{s['speed']:>7.2f}{s['fps']:>7.1f}{s['frame_ms']:>9.3f}{s['jitter_ms']:>8.3f}"
+                  f"{s['jitter_p99_ms']:>8.3f}{s['late_frames']:>6}{s['input_ms']:>9.2f}{s['input_p99_ms']:>7.2f}"
+                  f"{s['interp_delay_ms']:>7.2f}{s['spin_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
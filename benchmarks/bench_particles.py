@@ -0,0 +1,119 @@
+"""Particle effects vs the old sprite-per-explosion, per frame.
+
+Replays the same stream of explosions (``--rate`` per second at random spots,
+plus an occasional pickup and the engine trail) through:
+
+- sprites: what the game did before - one 50x50 explosion sprite per kill,
+  shown for 6 ticks, updated and drawn through a sprite Group;
+- particles: ParticleSystem at each ``--density``, 16 particles per
+  explosion at 1.0.
+
+Prints mean/p99 ms per frame for update + draw and the peak particle count.
+
+    python -m benchmarks.bench_particles
+    python -m benchmarks.bench_particles --rate 4 30 120 --density 1 0.5 0.25
+"""
+import argparse
+import random
+import statistics
+import time
+
+import pygame
+
+import particles
+import resources
+import simulation
+from settings import WIDTH, HEIGHT, FRAME_MS
+
+OLD_EXPLOSION_TICKS = 6
+
+
+class OldExplosion(pygame.sprite.Sprite):
+    def __init__(self, center):
+        super().__init__()
+        self.image = resources.explosion_img
+        self.rect = self.image.get_rect(center=center)
+        self.ticks = OLD_EXPLOSION_TICKS
+
+    def update(self):
+        self.ticks -= 1
+        if self.ticks <= 0:
+            self.kill()
+
+
+def effect_stream(rate, frames, seed):
+    """Per frame, the sim.effects list a session with ``rate`` kills/s would produce."""
+    rng = random.Random(seed)
+    per_frame = rate * FRAME_MS / 1000
+    owed = 0.0
+    stream = []
+    for _ in range(frames):
+        owed += per_frame
+        effects = []
+        while owed >= 1:
+            owed -= 1
+            effects.append(('explosion', rng.randint(40, WIDTH - 40), rng.randint(40, HEIGHT - 200), None))
+            if rng.random() < 0.1:
+                effects.append(('pickup', rng.randint(40, WIDTH - 40), HEIGHT - 120, 'health'))
+        stream.append(effects)
+    return stream
+
+
+def run_sprites(surface, stream):
+    group = pygame.sprite.Group()
+    samples = []
+    for effects in stream:
+        start = time.perf_counter()
+        group.update()
+        for name, x, y, _ in effects:
+            if name == 'explosion':
+                group.add(OldExplosion((x, y)))
+        group.draw(surface)
+        samples.append(time.perf_counter() - start)
+    return samples, None
+
+
+def run_particles(surface, stream, density):
+    system = particles.ParticleSystem(density=density, seed=0)
+    samples = []
+    peak = 0
+    for effects in stream:
+        start = time.perf_counter()
+        system.update(FRAME_MS)
+        system.emit_effects(effects)
+        system.flame(WIDTH // 2, HEIGHT - 56, FRAME_MS, 40)
+        system.draw(surface)
+        samples.append(time.perf_counter() - start)
+        peak = max(peak, len(system))
+    return samples, peak
+
+
+def summarize(samples, warmup):
+    ms = sorted(s * 1000 for s in samples[warmup:])
+    return statistics.fmean(ms), ms[int(len(ms) * 0.99)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=float, nargs="+", default=[4, 30, 120], help="explosions per second")
+    parser.add_argument("--density", type=float, nargs="+", default=[1.0, 0.5])
+    parser.add_argument("--frames", type=int, default=1200)
+    parser.add_argument("--warmup", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    simulation.init_headless()
+    surface = pygame.Surface((WIDTH, HEIGHT)).convert()
+    print(f"{'expl/s':>7} {'variant':<16} {'mean ms':>8} {'p99 ms':>7} {'peak':>6}")
+    for rate in args.rate:
+        stream = effect_stream(rate, args.frames, args.seed)
+        runs = [("sprites", lambda: run_sprites(surface, stream))]
+        runs += [(f"particles x{d:g}", lambda d=d: run_particles(surface, stream, d)) for d in args.density]
+        for label, run in runs:
+            samples, peak = run()
+            mean, p99 = summarize(samples, args.warmup)
+            print(f"{rate:>7g} {label:<16} {mean:>8.3f} {p99:>7.3f} {'-' if peak is None else peak:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Enemy fire: what a screen full of shots costs per frame, and per volley.
+
+Runs stress.py's ``bullet_hell`` scenario (at least ``--shots`` live shots,
+the ship tested against them every tick) for each shot count, engine and
+renderer, and prints the simulation share of a frame (move, emit, cull and
+the ship test), the draw and the whole frame at p50/p99, with whether p99
+stays inside the 60 FPS budget. Then times the array paths on their own:
+one volley per ring size and the shot/ship test against a full screen.
+
+    python -m benchmarks.bench_patterns
+    python -m benchmarks.bench_patterns --shots 5000 --engine numpy --render dirty
+"""
+import argparse
+import time
+
+import pygame
+
+import render
+import simulation
+import surface_cache
+from benchmarks import stress
+from patterns import FireControl, PatternFile, default_patterns
+from settings import WIDTH, HEIGHT, FRAME_MS
+
+SIM_PHASES = ('update', 'spawn', 'collision', 'pickups')
+RING_SIZES = (12, 72, 360, 1440)
+
+
+def frame_costs(opts):
+    print(f"{'shots':>6}{'engine':>8}{'render':>7}{'sim p50':>9}{'sim p99':>9}"
+          f"{'draw p50':>10}{'draw p99':>10}{'frame p50':>11}{'frame p99':>11}{'60fps':>7}")
+    for shots in opts.shots:
+        for engine in opts.engine:
+            for renderer in opts.render:
+                run = argparse.Namespace(shots=shots, engine=engine, render=renderer, seed=opts.seed,
+                                         frames=opts.frames, warmup=opts.warmup)
+                phases = stress.run_scenario('bullet_hell', run)['phases']
+                sim = {p: sum(phases[phase][p] for phase in SIM_PHASES) for p in ('p50', 'p99')}
+                draw, total = phases['draw'], phases['total']
+                print(f"{shots:>6}{engine:>8}{renderer:>7}{sim['p50']:>9.3f}{sim['p99']:>9.3f}"
+                      f"{draw['p50']:>10.3f}{draw['p99']:>10.3f}{total['p50']:>11.3f}{total['p99']:>11.3f}"
+                      f"{'yes' if total['p99'] <= FRAME_MS else 'no':>7}")
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def array_costs(opts):
+    sim = simulation.make_simulation('sprites', seed=opts.seed)
+    print(f"\n{'ring':>6}{'us/volley':>11}{'ns/shot':>9}")
+    for count in RING_SIZES:
+        ring = PatternFile({'ring': {'shape': 'radial', 'count': count}}, []).patterns['ring']
+        fire = FireControl(default_patterns(), limit=count * opts.repeat + 1)
+        us = timed(lambda: fire.fire(sim, ring, 0, WIDTH // 2, HEIGHT // 3), opts.repeat)
+        print(f"{count:>6}{us:>11.2f}{us * 1000 / count:>9.1f}")
+
+    # 5000 shots spreading slowly from the centre, none of them reaching the ship
+    fire = FireControl(default_patterns())
+    ring = PatternFile({'ring': {'shape': 'radial', 'count': 100, 'layers': 50,
+                                 'speed': 0.2, 'speed_step': 0.02}}, []).patterns['ring']
+    fire.fire(sim, ring, 0, WIDTH // 2, HEIGHT // 2)
+    for _ in range(40):
+        fire.shots.update()
+    player = sim.player
+    player.rect.center = (WIDTH // 4, HEIGHT - 80)
+    mask = surface_cache.mask(player.image)
+    us = timed(lambda: fire.shots.hit(player.rect, mask), opts.repeat)
+    print(f"\nship test, {len(fire.shots)} shots: {us:.1f} us")
+    us = timed(fire.shots.update, opts.repeat)
+    print(f"move + cull, {len(fire.shots)} shots: {us:.1f} us")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shots", type=int, nargs="+", default=[1000, 5000, 8000])
+    parser.add_argument("--engine", choices=simulation.ENGINES, nargs="+", default=list(simulation.ENGINES))
+    parser.add_argument("--render", choices=sorted(render.RENDERERS), nargs="+", default=sorted(render.RENDERERS))
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--warmup", type=int, default=120)
+    parser.add_argument("--repeat", type=int, default=200, help="calls per array timing")
+    parser.add_argument("--seed", type=int, default=0)
+    opts = parser.parse_args(argv)
+
+    simulation.init_headless()
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    print(f"bullet_hell, {opts.frames} frames, times in ms (budget {FRAME_MS:.1f})")
+    frame_costs(opts)
+    array_costs(opts)
+
+
+if __name__ == "__main__":
+    main()
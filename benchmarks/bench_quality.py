@@ -0,0 +1,108 @@
+"""Quality tiers: what each one costs to render, and how the governor reacts.
+
+Part one renders the same busy workload (a stress scenario, default
+``multi_fast`` - bullets and explosions everywhere) at every tier and prints
+the mean/p95 render ms per frame. Part two feeds QualityGovernor a synthetic
+load trace (a slow machine: game work plus that tier's measured render cost)
+and prints each tier change. The game work is set so the full tier takes 75%
+of the budget, then 100% through a heavy stretch, then 70% - above
+RECOVER_AT, so getting back to full shows the governor trusting the tier
+costs it measured on the way down.
+
+    python -m benchmarks.bench_quality
+    python -m benchmarks.bench_quality --scenario crowd --render dirty
+"""
+import argparse
+import statistics
+import time
+
+import pygame
+
+import quality
+import render
+import simulation
+from benchmarks import stress
+from profiling import percentile
+from settings import WIDTH, HEIGHT, FRAME_MS
+
+
+def tier_costs(opts):
+    """{tier name: sorted render ms per frame} on the scenario's workload."""
+    costs = {}
+    for tier in quality.TIERS:
+        sim = simulation.make_simulation(opts.engine, seed=opts.seed)
+        hook = stress.SCENARIOS[opts.scenario](sim, opts)
+        renderer = render.RENDERERS[opts.render](pygame.display.get_surface())
+        renderer.set_quality(tier)
+        samples = []
+        for frame in range(opts.warmup + opts.frames):
+            if hook is not None:
+                hook(sim)
+            sim.step(FRAME_MS, simulation.autopilot(sim))
+            start = time.perf_counter()
+            renderer.game(sim)
+            if frame >= opts.warmup:
+                samples.append((time.perf_counter() - start) * 1000)
+        costs[tier.name] = sorted(samples)
+    return costs
+
+
+PHASES = ((0.2, 0.75), (0.6, 1.0), (1.0, 0.7))  # (until this share of the trace, full tier's busy share)
+
+
+def load_trace(seconds, full_ms):
+    """Game work (ms) per frame, render excluded: steady, a heavy stretch, then light;
+    ``full_ms`` is the full tier's render cost."""
+    frames = int(seconds * 1000 / FRAME_MS)
+    for i in range(frames):
+        share = next(share for until, share in PHASES if i / frames < until)
+        yield i, FRAME_MS * share - full_ms
+
+
+def replay_governor(costs, seconds, slowdown):
+    clock = [0.0]
+    governor = quality.QualityGovernor(clock=lambda: clock[0], log=None)
+    # a slow machine renders ``slowdown`` times slower than this one
+    render_ms = {name: statistics.fmean(ms) * slowdown for name, ms in costs.items()}
+    over = 0
+    for i, work in load_trace(seconds, render_ms['full']):
+        clock[0] = i * FRAME_MS / 1000
+        busy = work + render_ms[governor.tier.name]
+        over += busy > FRAME_MS
+        governor.observe(busy)
+    return governor, over
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", choices=sorted(stress.SCENARIOS), default='multi_fast')
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--warmup", type=int, default=120)
+    parser.add_argument("--enemies", type=int, default=200, help="on-screen enemies for 'crowd'")
+    parser.add_argument("--shots", type=int, default=5000, help="live enemy shots for 'bullet_hell'")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engine", choices=simulation.ENGINES, default='sprites')
+    parser.add_argument("--render", choices=sorted(render.RENDERERS), default='full')
+    parser.add_argument("--slowdown", type=float, default=8.0,
+                        help="how many times slower the simulated low-spec machine renders")
+    parser.add_argument("--seconds", type=float, default=90.0, help="length of the load trace")
+    opts = parser.parse_args(argv)
+
+    simulation.init_headless()
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    costs = tier_costs(opts)
+    print(f"{opts.scenario} scenario, {opts.render} renderer, {opts.engine} engine")
+    print(f"  {'tier':<14}{'mean ms':>9}{'p95 ms':>9}")
+    for name, ms in costs.items():
+        print(f"  {name:<14}{statistics.fmean(ms):>9.3f}{percentile(ms, 95):>9.3f}")
+
+    governor, over = replay_governor(costs, opts.seconds, opts.slowdown)
+    print(f"\ngovernor on a {opts.slowdown:g}x slower machine, {opts.seconds:g}s load trace:")
+    for seconds, frame, old, new, load in governor.changes:
+        print(f"  {seconds:6.1f}s  {quality.TIERS[old].name:>12} -> {quality.TIERS[new].name:<12}"
+              f" p90 {load:.1f} ms")
+    print(f"  frames over budget: {over}/{governor.frame}; {governor.stats()}")
+
+
+if __name__ == "__main__":
+    main()
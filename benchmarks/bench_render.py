@@ -0,0 +1,60 @@
+"""Full-repaint vs dirty-rect rendering cost for a seeded autopilot session.
+
+Both renderers draw the same headless session into off-screen surfaces on the
+SDL dummy driver, so the numbers are pure software drawing cost; display
+upload is reported as the average share of the screen each mode pushes per
+frame (the rects handed to display.update, clipped to the screen) and the
+share of frames that pushed all of it.
+
+    python -m benchmarks.bench_render --frames 3000
+"""
+import argparse
+import time
+
+import pygame
+
+import render
+import simulation
+from settings import WIDTH, HEIGHT
+
+
+def run(renderer_cls, frames, seed, engine):
+    sim = simulation.make_simulation(engine, seed=seed)
+    surface = pygame.Surface((WIDTH, HEIGHT)).convert()
+    renderer = renderer_cls(surface)
+    draw_time = 0.0
+    area = 0
+    full = 0
+    for _ in range(frames):
+        if sim.finished:
+            sim.reset()
+        sim.step(inputs=simulation.autopilot(sim))
+        start = time.perf_counter()
+        if sim.finished:
+            renderer.end(sim)
+        else:
+            renderer.game(sim)
+        draw_time += time.perf_counter() - start
+        pushed = getattr(renderer, 'updated_area', WIDTH * HEIGHT)
+        area += pushed
+        full += pushed == WIDTH * HEIGHT
+    return draw_time * 1000 / frames, area / frames / (WIDTH * HEIGHT), full / frames
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engine", choices=simulation.ENGINES, default='sprites')
+    args = parser.parse_args(argv)
+
+    simulation.init_headless()
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    print(f"{'mode':>6} {'draw ms/frame':>14} {'screen updated':>15} {'full pushes':>12}")
+    for name, cls in sorted(render.RENDERERS.items()):
+        ms, share, full = run(cls, args.frames, args.seed, args.engine)
+        print(f"{name:>6} {ms:>14.3f} {share:>15.1%} {full:>12.1%}")
+
+
+if __name__ == "__main__":
+    main()
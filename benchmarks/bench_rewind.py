@@ -0,0 +1,127 @@
+"""Rewind buffer: snapshot cost per frame, memory for the window, restore time.
+
+Plays each scenario headless with a RewindBuffer pushed every frame until the
+buffer holds ``--seconds`` of play, then restores ``--restores`` times to a
+random depth (anywhere in the window) and plays forward again to refill it.
+Every restore is checked against the state digest recorded at that frame; in
+the 'play' scenario (nothing outside the simulation's RNG feeds it) the
+frames replayed after a restore must also match the original run. Automatic
+garbage collection is off as it is in the game (memory.GCControl), so the
+times don't include collector pauses the game never takes there. A median
+restore over ``--max-restore-ms`` (rewinding runs one restore per frame)
+fails the run like a mismatch does; the test suite checks restores are
+exact but leaves the timing to this.
+
+    python -m benchmarks.bench_rewind
+    python -m benchmarks.bench_rewind --scenario crowd --engine numpy
+"""
+import argparse
+import random
+import statistics
+import time
+
+import rewind
+import simulation
+from benchmarks import stress
+from memory import GCControl
+from profiling import percentile
+from replay import state_digest
+from settings import FPS, FRAME_MS, REWIND_SECONDS
+
+SCENARIOS = ('play',) + tuple(sorted(stress.SCENARIOS))
+
+
+def advance(sim, hook, buf, frames, digests, push_us):
+    for _ in range(frames):
+        if sim.finished:
+            sim.reset()
+        if hook is not None:
+            hook(sim)
+        sim.step(FRAME_MS, simulation.autopilot(sim))
+        start = time.perf_counter()
+        buf.push(sim)
+        push_us.append((time.perf_counter() - start) * 1e6)
+        digests.append(state_digest(sim))
+
+
+def bench(scenario, opts):
+    sim = simulation.make_simulation(opts.engine, seed=opts.seed)
+    hook = None if scenario == 'play' else stress.SCENARIOS[scenario](sim, opts)
+    buf = rewind.RewindBuffer(seconds=opts.seconds)
+    digests, push_us = [], []
+    advance(sim, hook, buf, int(opts.seconds * FPS), digests, push_us)
+    full_kb = buf.bytes / 1024
+    keyframes = len(buf.segments)
+    key_bytes = sum(len(s.blob(0)) for s in buf.segments)
+    deltas = [len(s.blob(i)) for s in buf.segments for i in range(1, len(s))]
+
+    rng = random.Random(opts.seed)
+    restore_ms = []
+    mismatches = diverged = 0
+    for _ in range(opts.restores):
+        back = rng.randrange(1, len(buf))
+        start = time.perf_counter()
+        buf.restore(sim, back)
+        restore_ms.append((time.perf_counter() - start) * 1000)
+        original = digests[len(digests) - back:]
+        del digests[len(digests) - back:]
+        mismatches += state_digest(sim) != digests[-1]
+        advance(sim, hook, buf, back, digests, push_us)
+        if hook is None:
+            diverged += digests[len(digests) - back:] != original
+    restore_ms.sort()
+    push_us.sort()
+    return {
+        'push_us': statistics.fmean(push_us),
+        'push_p99_us': percentile(push_us, 99),
+        'kb': full_kb,
+        'key_b': key_bytes / keyframes,
+        'delta_b': statistics.fmean(deltas) if deltas else 0,
+        'restore_ms': statistics.fmean(restore_ms),
+        'restore_p50_ms': statistics.median(restore_ms),
+        'restore_p99_ms': percentile(restore_ms, 99),
+        'restore_max_ms': restore_ms[-1],
+        'mismatches': mismatches,
+        'diverged': '-' if hook is not None else diverged,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", choices=SCENARIOS, nargs="+", default=['play', 'crowd', 'item_storm'])
+    parser.add_argument("--seconds", type=float, default=REWIND_SECONDS, help="rewind window")
+    parser.add_argument("--restores", type=int, default=50)
+    parser.add_argument("--max-restore-ms", type=float, default=1.0,
+                        help="fail if the median restore takes longer")
+    parser.add_argument("--enemies", type=int, default=80, help="on-screen enemies for 'crowd'")
+    parser.add_argument("--shots", type=int, default=5000, help="live enemy shots for 'bullet_hell'")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engine", choices=simulation.ENGINES, default='sprites')
+    opts = parser.parse_args(argv)
+
+    simulation.init_headless()
+    control = GCControl()
+    control.freeze()
+    control.play()
+    print(f"{opts.seconds:g}s window, {opts.engine} engine, keyframe every {rewind.KEYFRAME_EVERY} frames")
+    print(f"{'scenario':<12}{'push us':>8}{'p99':>7}{'KB':>8}{'key B':>7}{'delta B':>8}"
+          f"{'restore ms':>11}{'p99':>7}{'max':>7}{'bad':>5}{'diverged':>9}")
+    failed = False
+    try:
+        for scenario in opts.scenario:
+            r = bench(scenario, opts)
+            control.safe_window('scenario')
+            slow = r['restore_p50_ms'] > opts.max_restore_ms
+            failed |= bool(r['mismatches']) or r['diverged'] not in ('-', 0) or slow
+            print(f"{scenario:<12}{r['push_us']:>8.1f}{r['push_p99_us']:>7.1f}{r['kb']:>8.1f}{r['key_b']:>7.0f}"
+                  f"{r['delta_b']:>8.0f}{r['restore_ms']:>11.3f}{r['restore_p99_ms']:>7.3f}"
+                  f"{r['restore_max_ms']:>7.3f}{r['mismatches']:>5}{r['diverged']:>9}")
+            if slow:
+                print(f"  median restore {r['restore_p50_ms']:.3f} ms is over {opts.max_restore_ms:g} ms")
+    finally:
+        control.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
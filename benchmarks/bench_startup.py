@@ -0,0 +1,71 @@
+"""Startup cost: decoding the PNGs vs mapping the asset bake.
+
+Every sample runs in a fresh interpreter on the SDL dummy driver and times,
+from before ``import pygame``, the first menu frame (menu images only) and
+the point where every asset is loaded and the game could start.
+
+    python -m benchmarks.bench_startup --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = '''
+import time
+started = time.perf_counter()
+import os, sys, json
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+import pygame
+import resources, surface_cache, render
+pygame.mixer.pre_init(*resources.MIXER_FORMAT)
+pygame.init()
+screen = pygame.display.set_mode((640, 800))
+resources.open_bake(sys.argv[1])
+menu = resources.load_menu_images()
+loader = resources.start_loading()
+render.draw_menu(screen)
+pygame.display.flip()
+first_menu = time.perf_counter() - started
+loader.finish()
+surface_cache.prebake()
+ready = time.perf_counter() - started
+print(json.dumps({"first_menu_ms": first_menu * 1000, "ready_ms": ready * 1000,
+                  "bake": resources.bake_status}))
+'''
+
+
+def sample(bake_path):
+    out = subprocess.run([sys.executable, "-c", CHILD, bake_path], cwd=ROOT, check=True,
+                         capture_output=True, text=True,
+                         env=dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT="1")).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bake_path = os.path.join(tmp, "assets.bake")
+        subprocess.run([sys.executable, "asset_bake.py", bake_path], cwd=ROOT, check=True,
+                       env=dict(os.environ, SDL_AUDIODRIVER="dummy", PYGAME_HIDE_SUPPORT_PROMPT="1"))
+        modes = {'source': os.path.join(tmp, "missing.bake"), 'bake': bake_path}
+        print(f"{'mode':<8} {'first menu ms':>14} {'all assets ms':>14}")
+        for mode, path in modes.items():
+            runs = [sample(path) for _ in range(args.repeat)]
+            assert all(r['bake'] == ('hit' if mode == 'bake' else 'missing') for r in runs)
+            first = statistics.median(r['first_menu_ms'] for r in runs)
+            ready = statistics.median(r['ready_ms'] for r in runs)
+            print(f"{mode:<8} {first:>14.1f} {ready:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Wave timelines: compile time and per-frame lookup cost for huge levels.
+
+Builds a one-level wave file with about ``--spawns`` enemies (repeating
+scatter waves plus line/column/v formations), then times parsing, compiling
+and playing the level back frame by frame through WaveCursor at the default
+scroll speed. The per-frame cost should stay flat as the level grows.
+
+    python -m benchmarks.bench_waves
+    python -m benchmarks.bench_waves --spawns 1000 10000 100000
+"""
+import argparse
+import json
+import statistics
+import time
+
+import waves
+from settings import SCROLL_SPEED, WIDTH
+
+
+def make_wave_data(spawns, length):
+    # a quarter each: scatter singles, lines, columns and vs of 5
+    per_kind = spawns // 4
+    every_single = length / per_kind
+    every_formation = length * 5 / per_kind
+    level = {'length': length, 'loop': False, 'waves': [
+        {'at': 0, 'every': every_single, 'x': [20, WIDTH - 70], 'y': [-300, -30], 'type': 'random'},
+        {'at': 7, 'every': every_formation, 'formation': 'line', 'count': 5, 'spacing': 60,
+         'x': [150, WIDTH - 200], 'y': -60, 'type': 'straight'},
+        {'at': 13, 'every': every_formation, 'formation': 'column', 'count': 5, 'spacing': 60,
+         'x': [20, WIDTH - 70], 'y': -60, 'type': ['zigzag', 'fast']},
+        {'at': 19, 'every': every_formation, 'formation': 'v', 'count': 5, 'spacing': 40,
+         'x': [100, WIDTH - 150], 'y': -60, 'type': 'fast'},
+    ]}
+    return {'version': waves.WAVES_VERSION, 'levels': [level]}
+
+
+def bench(spawns, length, seed):
+    text = json.dumps(make_wave_data(spawns, length))
+    start = time.perf_counter()
+    wave_file = waves.WaveFile.from_dict(json.loads(text))
+    parsed = time.perf_counter()
+    timeline = wave_file.compile(seed)
+    compiled = time.perf_counter()
+
+    cursor = waves.WaveCursor(timeline)
+    cursor.start_level(1, 0)
+    frames = int(length / SCROLL_SPEED) + 1
+    samples = []
+    spawned = 0
+    clock = time.perf_counter
+    for frame in range(1, frames + 1):
+        t0 = clock()
+        spawned += len(cursor.due(frame * SCROLL_SPEED))
+        samples.append(clock() - t0)
+    return {
+        'spawns': len(timeline),
+        'spawned': spawned,
+        'parse_ms': (parsed - start) * 1000,
+        'compile_ms': (compiled - parsed) * 1000,
+        'frames': frames,
+        'mean_us': statistics.fmean(samples) * 1e6,
+        'max_us': max(samples) * 1e6,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--spawns", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--length", type=float, default=36000.0,
+                        help="level length in world_y units (5 minutes at the default speed)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    print(f"{'spawns':>8} {'parse ms':>9} {'compile ms':>11} {'frames':>7} "
+          f"{'us/frame':>9} {'max us':>8}")
+    for count in args.spawns:
+        r = bench(count, args.length, args.seed)
+        assert r['spawned'] == r['spawns'], r
+        print(f"{r['spawns']:>8} {r['parse_ms']:>9.2f} {r['compile_ms']:>11.2f} {r['frames']:>7} "
+              f"{r['mean_us']:>9.2f} {r['max_us']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
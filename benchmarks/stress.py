@@ -0,0 +1,288 @@
+"""Scripted stress scenarios with per-phase frame-time percentiles.
+
+Each scenario drives the real game code headless (GameSimulation.step with
+its Player/Enemy/Bullet/Item sprites and spawn logic, plus a
+renderer drawing off-screen) under an autopilot that holds fire, and records
+p50/p95/p99 per frame for the update, spawn (enemy fire included),
+collision (bullets vs enemies and the boss), pickups (player hits, shots and
+pickups) and draw phases.
+
+    python -m benchmarks.stress --out baseline.json
+    python -m benchmarks.stress --compare baseline.json     # exit 1 on regression
+
+--compare refuses (exit 2) a baseline recorded with other run parameters
+(engine, renderer, seed, frame counts, scenario sizes): its percentiles
+measure a different workload. ``--allow-mismatch`` compares anyway. A
+different Python, pygame or machine only gets a warning.
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+import pygame
+
+import render
+import simulation
+from profiling import PhaseTimer, percentile
+from settings import WIDTH, HEIGHT, FRAME_MS, MAX_LEVEL
+
+PHASES = ('update', 'spawn', 'collision', 'pickups', 'draw', 'total')
+# results meta: what a baseline must share to be compared, and what only warns
+RUN_PARAMS = ('engine', 'render', 'seed', 'frames', 'warmup', 'enemies', 'shots')
+HOST_PARAMS = ('python', 'pygame', 'machine')
+PERCENTILES = (50, 95, 99)
+UNKILLABLE_LIVES = 10**6
+# bullet_hell's volleys: slow double rings, so each one stays on screen a while
+HELL_RING = {'shape': 'radial', 'count': 72, 'layers': 2, 'speed': 1.2, 'speed_step': 0.5}
+
+SCENARIOS = {}
+
+
+def scenario(name):
+    def register(setup):
+        SCENARIOS[name] = setup
+        return setup
+    return register
+
+
+# Each setup prepares a fresh simulation and returns a per-frame hook (or None)
+# that runs before every step.
+
+@scenario('crowd')
+def crowd(sim, opts):
+    """Keep ``--enemies`` enemies on screen at all times."""
+    sim.lives = UNKILLABLE_LIVES
+    rng = random.Random(opts.seed)
+
+    def top_up(sim):
+        missing = opts.enemies - sim.entity_counts()['enemies']
+        for _ in range(missing):
+            sim.spawn_enemy(rng.randint(20, WIDTH - 70), rng.randint(0, HEIGHT // 2))
+    return top_up
+
+
+@scenario('multi_fast')
+def multi_fast(sim, opts):
+    """Sustained multi_shot + fast_fire."""
+    sim.lives = UNKILLABLE_LIVES
+
+    def keep_powers(sim):
+        sim.player.grant_power('fast_fire', sim.now + 10000)
+        sim.player.grant_power('multi_shot', sim.now + 10000)
+    return keep_powers
+
+
+@scenario('item_storm')
+def item_storm(sim, opts):
+    """Every kill drops an item, with a steady supply of targets."""
+    sim.balance = sim.balance._replace(item_drop_chance=1.0)
+    keep_powers = multi_fast(sim, opts)
+    top_up = crowd(sim, argparse.Namespace(enemies=max(20, opts.enemies // 10), seed=opts.seed))
+
+    def hook(sim):
+        keep_powers(sim)
+        top_up(sim)
+    return hook
+
+
+@scenario('level5')
+def level5(sim, opts):
+    """Final level spawn rate, never finishing the level."""
+    sim.lives = UNKILLABLE_LIVES
+    sim.start_level(MAX_LEVEL)
+    sim.enemies_required = 10**9
+    return None
+
+
+@scenario('bullet_hell')
+def bullet_hell(sim, opts):
+    """At least ``--shots`` enemy shots live, fired as rings from the top half.
+
+    The ship never stays invulnerable, so the shot/ship test runs every tick.
+    """
+    from patterns import PatternFile  # needs numpy, like enemy fire itself
+    sim.lives = UNKILLABLE_LIVES
+    rng = random.Random(opts.seed)
+    ring = PatternFile({'ring': HELL_RING}, []).patterns['ring']
+    volley = len(ring.offsets)
+
+    def top_up(sim):
+        sim.player.invulnerable = False
+        missing = opts.shots - len(sim.fire.shots)
+        for _ in range(max(0, -(-missing // volley))):
+            sim.fire.fire(sim, ring, 0, rng.randint(40, WIDTH - 40), rng.randint(40, 360))
+    return top_up
+
+
+@scenario('boss')
+def boss(sim, opts):
+    """The boss fight from the first frame; the boss never dies."""
+    sim.lives = UNKILLABLE_LIVES
+    spec = sim.fire.patterns.boss
+    sim.start_level(spec.level)
+
+    def keep_boss(sim):
+        if sim.fire.boss is None:
+            sim.fire.holds_level(sim)
+        sim.fire.boss.hp = spec.hp
+    return keep_boss
+
+
+def run_scenario(name, opts):
+    sim = simulation.make_simulation(opts.engine, seed=opts.seed)
+    hook = SCENARIOS[name](sim, opts)
+    surface = pygame.Surface((WIDTH, HEIGHT)).convert()
+    renderer = render.RENDERERS[opts.render](surface)
+    timer = PhaseTimer()
+    sim.phase_timer = timer
+    samples = {phase: [] for phase in PHASES}
+    peak = {}
+
+    for frame in range(opts.warmup + opts.frames):
+        if hook is not None:
+            hook(sim)
+        inputs = simulation.autopilot(sim)
+        start = time.perf_counter()
+        timer.mark()
+        sim.step(FRAME_MS, inputs)
+        renderer.game(sim)
+        timer.lap('draw')
+        phases = timer.end_frame()
+        total = time.perf_counter() - start
+        if frame < opts.warmup:
+            continue
+        for phase in PHASES[:-1]:
+            samples[phase].append(phases.get(phase, 0.0) * 1000)
+        samples['total'].append(total * 1000)
+        for kind, count in sim.entity_counts().items():
+            peak[kind] = max(peak.get(kind, 0), count)
+
+    result = {'frames': opts.frames, 'peak_entities': peak, 'phases': {}}
+    for phase, values in samples.items():
+        values.sort()
+        stats = {f'p{p}': round(percentile(values, p), 4) for p in PERCENTILES}
+        stats['mean'] = round(sum(values) / len(values), 4)
+        stats['max'] = round(values[-1], 4)
+        result['phases'][phase] = stats
+    return result
+
+
+def compare(results, baseline, threshold, floor_ms):
+    """Return (rows, regressions) comparing percentiles against a baseline run."""
+    rows, regressions = [], []
+    for name, res in results['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(name)
+        if base is None:
+            continue
+        for phase, stats in res['phases'].items():
+            old_stats = base['phases'].get(phase)
+            if old_stats is None:
+                continue
+            for key in (f'p{p}' for p in PERCENTILES):
+                new, old = stats[key], old_stats[key]
+                ratio = new / old if old else float('inf') if new else 1.0
+                regressed = new > old * (1 + threshold) and new - old > floor_ms
+                row = (name, phase, key, old, new, ratio, regressed)
+                rows.append(row)
+                if regressed:
+                    regressions.append(row)
+    return rows, regressions
+
+
+def run_meta(opts):
+    """The options that shape the workload, as stored in results['meta']."""
+    return {key: getattr(opts, key) for key in RUN_PARAMS}
+
+
+def meta_mismatches(meta, baseline_meta, keys):
+    """(key, baseline value, this run's value) for each of ``keys`` that differs;
+    keys the baseline doesn't record are skipped."""
+    return [(key, baseline_meta[key], meta.get(key)) for key in keys
+            if key in baseline_meta and baseline_meta[key] != meta.get(key)]
+
+
+def print_results(results):
+    for name, res in results['scenarios'].items():
+        peak = ', '.join(f"{k} {v}" for k, v in res['peak_entities'].items())
+        print(f"\n{name}  (peak: {peak})")
+        print(f"  {'phase':<10}" + ''.join(f"{f'p{p} ms':>10}" for p in PERCENTILES) + f"{'max ms':>10}")
+        for phase, stats in res['phases'].items():
+            print(f"  {phase:<10}" + ''.join(f"{stats[f'p{p}']:>10.3f}" for p in PERCENTILES)
+                  + f"{stats['max']:>10.3f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=sorted(SCENARIOS))
+    parser.add_argument("--frames", type=int, default=1200)
+    parser.add_argument("--warmup", type=int, default=120)
+    parser.add_argument("--enemies", type=int, default=200, help="on-screen enemies for 'crowd'")
+    parser.add_argument("--shots", type=int, default=5000, help="live enemy shots for 'bullet_hell'")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engine", choices=simulation.ENGINES, default='sprites')
+    parser.add_argument("--render", choices=sorted(render.RENDERERS), default='full')
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--compare", metavar="BASELINE", help="flag regressions against a saved run")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="relative slowdown that counts as a regression (default 25%%)")
+    parser.add_argument("--floor-ms", type=float, default=0.05,
+                        help="ignore slowdowns smaller than this in absolute terms")
+    parser.add_argument("--allow-mismatch", action="store_true",
+                        help="compare against a baseline recorded with other run parameters")
+    opts = parser.parse_args(argv)
+
+    baseline = None
+    if opts.compare:
+        # checked before the run, which takes a while
+        with open(opts.compare) as f:
+            baseline = json.load(f)
+        base_meta = baseline.get('meta', {})
+        missing = [key for key in RUN_PARAMS if key not in base_meta]
+        if missing:
+            print(f"warning: baseline has no {', '.join(missing)}; can't check they match")
+        mismatched = meta_mismatches(run_meta(opts), base_meta, RUN_PARAMS)
+        if mismatched:
+            diffs = ', '.join(f"{key} {old!r} vs {new!r}" for key, old, new in mismatched)
+            if not opts.allow_mismatch:
+                print(f"baseline {opts.compare} was recorded with other run parameters ({diffs}); "
+                      f"rerun with matching options or pass --allow-mismatch")
+                sys.exit(2)
+            print(f"warning: comparing across different run parameters: {diffs}")
+
+    simulation.init_headless()
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    results = {
+        'meta': {
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'machine': platform.machine(),
+            **run_meta(opts),
+        },
+        'scenarios': {},
+    }
+    for name in opts.scenarios:
+        results['scenarios'][name] = run_scenario(name, opts)
+    print_results(results)
+
+    if opts.out:
+        with open(opts.out, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nwrote {opts.out}")
+
+    if baseline is not None:
+        for key, old, new in meta_mismatches(results['meta'], baseline.get('meta', {}), HOST_PARAMS):
+            print(f"warning: baseline ran on {key} {old!r}, this run on {new!r}")
+        rows, regressions = compare(results, baseline, opts.threshold, opts.floor_ms)
+        print(f"\ncompared {len(rows)} percentiles against {opts.compare}")
+        for name, phase, key, old, new, ratio, _ in regressions:
+            print(f"  REGRESSION {name}/{phase} {key}: {old:.3f} -> {new:.3f} ms ({ratio:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print("  no regressions")
+
+
+if __name__ == "__main__":
+    main()
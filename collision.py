@@ -0,0 +1,148 @@
+"""Uniform-grid broad phase for sprite collisions.
+
+``groupcollide`` and ``spritecollide`` here are drop-in versions of the pygame
+functions of the same name and return the same hit sets in the same order:
+sprites in a dict/list follow their group's iteration order, and with
+``dokillb`` a sprite in groupb is consumed by the first groupa sprite it
+overlaps. Instead of testing every pair they only test sprites that share a
+grid cell, so a step costs O(n + m) rather than O(n * m).
+
+Both take an optional ``collided`` test like pygame's, but only call it on
+pairs whose rects overlap (pygame would call it for every pair); the rect
+pass stays in pygame's C loop or the grid. ``collide_mask`` is the
+pixel-accurate test the game uses, with masks from surface_cache, built
+once per image.
+
+Callers pass ``grid=None`` for small groups, which falls straight through to
+pygame (see GRID_MIN_PAIRS). The grid indexes one group (normally the enemies) and is rebuilt once per step,
+after spawning and before the first query; killed sprites are filtered out on
+query, so the same grid can serve several checks within a step.
+"""
+from collections import defaultdict
+
+import pygame
+
+import surface_cache
+
+CELL_SIZE = 64
+# Below this many candidate pairs pygame's C-level rect loop is cheaper than
+# building the grid (crossover measured with benchmarks/bench_collision.py).
+GRID_MIN_PAIRS = 15000
+
+
+def collide_mask(a, b):
+    """True if the opaque pixels of sprites ``a`` and ``b`` overlap."""
+    ra, rb = a.rect, b.rect
+    if not ra.colliderect(rb):
+        return False
+    return surface_cache.mask(a.image).overlap(surface_cache.mask(b.image), (rb.x - ra.x, rb.y - ra.y)) is not None
+
+
+class SpatialHash:
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = defaultdict(list)  # (cx, cy) -> [(order, sprite)]
+        self.sprites = []  # order -> sprite
+
+    def clear(self):
+        self.cells.clear()
+        self.sprites = []
+
+    def rebuild(self, sprites):
+        self.clear()
+        for sprite in sprites:
+            self.insert(sprite)
+
+    def insert(self, sprite):
+        # order = position in the group at rebuild time, used to reproduce
+        # pygame's iteration order in the results
+        entry = (len(self.sprites), sprite)
+        self.sprites.append(sprite)
+        cs = self.cell_size
+        rect = sprite.rect
+        cells = self.cells
+        for cx in range(rect.left // cs, (rect.right - 1) // cs + 1):
+            for cy in range(rect.top // cs, (rect.bottom - 1) // cs + 1):
+                cells[(cx, cy)].append(entry)
+
+    def query(self, rect):
+        """Return {order: sprite} for indexed sprites whose rect overlaps ``rect``."""
+        found = {}
+        cs = self.cell_size
+        cells = self.cells
+        colliderect = rect.colliderect
+        for cx in range(rect.left // cs, (rect.right - 1) // cs + 1):
+            for cy in range(rect.top // cs, (rect.bottom - 1) // cs + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    for order, sprite in bucket:
+                        if order not in found and colliderect(sprite.rect):
+                            found[order] = sprite
+        return found
+
+
+def groupcollide(groupa, groupb, dokilla, dokillb, grid=None, collided=None):
+    """pygame.sprite.groupcollide with ``grid`` indexing ``groupa``."""
+    if grid is None:
+        if collided is None:
+            return pygame.sprite.groupcollide(groupa, groupb, dokilla, dokillb)
+        crashed = {}
+        taken = set()  # with dokillb, groupb sprites already consumed
+        for a, candidates in pygame.sprite.groupcollide(groupa, groupb, False, False).items():
+            hits = [b for b in candidates if b not in taken and collided(a, b)]
+            if hits:
+                crashed[a] = hits
+                if dokillb:
+                    taken.update(hits)
+        _kill_hits(crashed, dokilla, dokillb)
+        return crashed
+    has_a = groupa.has
+    owned = defaultdict(list)  # order in groupa -> colliding groupb sprites
+    for b in groupb.sprites():
+        hits = [order for order, a in grid.query(b.rect).items()
+                if has_a(a) and (collided is None or collided(a, b))]
+        if not hits:
+            continue
+        if dokillb:
+            # pygame hands b to the first groupa sprite that reaches it and
+            # kills it there, so later sprites never see it
+            owned[min(hits)].append(b)
+            b.kill()
+        else:
+            for order in hits:
+                owned[order].append(b)
+
+    crashed = {}
+    for order in sorted(owned):
+        crashed[grid.sprites[order]] = owned[order]
+    if dokilla:
+        for a in crashed:
+            a.kill()
+    return crashed
+
+
+def _kill_hits(crashed, dokilla, dokillb):
+    for a, hits in crashed.items():
+        if dokillb:
+            for b in hits:
+                b.kill()
+        if dokilla:
+            a.kill()
+
+
+def spritecollide(sprite, group, dokill, grid=None, collided=None):
+    """pygame.sprite.spritecollide with ``grid`` indexing ``group``."""
+    if grid is None:
+        if collided is None:
+            return pygame.sprite.spritecollide(sprite, group, dokill)
+        crashed = [s for s in pygame.sprite.spritecollide(sprite, group, False) if collided(sprite, s)]
+    else:
+        has = group.has
+        found = grid.query(sprite.rect)
+        crashed = [found[order] for order in sorted(found)
+                   if has(found[order]) and (collided is None or collided(sprite, found[order]))]
+    if dokill:
+        for s in crashed:
+            s.kill()
+    return crashed
+
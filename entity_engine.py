@@ -0,0 +1,402 @@
+"""NumPy struct-of-arrays backend for bullets and enemies (optional, needs numpy).
+
+ArraySimulation is a GameSimulation whose bullets and enemies live in flat
+arrays instead of Sprite objects: movement, the zigzag pattern, the off-screen
+cull (and the life it costs) and bullet/enemy collisions each run as a handful
+of vectorized operations per tick regardless of how many entities are alive;
+only the pairs whose rects overlap go on to the per-pair mask test.
+The player and items stay sprites. Removal is a stable compaction,
+so entity order - and with it hit order and RNG draws - matches the sprite
+backend.
+
+Every numpy call costs about a microsecond whatever its size, so with the
+handful of entities of normal play the arrays lose to plain sprites (about
+3x per tick). Below ARRAY_MIN live bullets + enemies the simulation keeps them
+as sprites and runs the GameSimulation code; past it, a tick moves them into
+the arrays, and they go back below half of it. Both paths give the same
+results tick for tick, and the move goes through the same
+enemy_columns()/load_entities() rows rewind uses, so switching changes
+nothing but speed.
+
+Renderers get ``(image, (x, y))`` pairs from ``layer_view()``. For drawing,
+``layer_blits()`` streams them to ``Surface.blits`` straight from the culled
+columns via zip/repeat, with Rect destinations (pygame's fast path) and no
+Python-level loop or list. What is left is SDL blending each bullet, the same
+work the sprite backend pays. The ``px``/``py``
+columns hold last tick's position for drawing between ticks; compaction keeps
+them aligned.
+"""
+from itertools import repeat
+
+import numpy as np
+
+import resources
+import surface_cache
+from settings import HEIGHT, BULLET_SPEED, SCROLL_SPEED
+from simulation import GameSimulation
+from sprites import ENEMY_TYPES
+
+# -------- CONFIG ----------
+ARRAY_MIN = 64  # live bullets + enemies at which they move into arrays (back below half)
+
+ZIGZAG = ENEMY_TYPES.index('zigzag')
+FAST = ENEMY_TYPES.index('fast')
+NO_ENEMIES = ([],) * 6  # enemy_columns() with no rows
+NO_BULLETS = ([], [])
+
+
+class EntityArrays:
+    """Growable struct-of-arrays; ``arrays[name]`` is a live view of the used rows."""
+
+    def __init__(self, fields, capacity=256):
+        self.fields = fields  # name -> dtype
+        self.n = 0
+        self.data = {name: np.zeros(capacity, dtype) for name, dtype in fields.items()}
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, name):
+        return self.data[name][:self.n]
+
+    def _reserve(self, extra):
+        capacity = len(next(iter(self.data.values())))
+        if self.n + extra <= capacity:
+            return
+        while capacity < self.n + extra:
+            capacity *= 2
+        for name, arr in self.data.items():
+            grown = np.zeros(capacity, arr.dtype)
+            grown[:self.n] = arr[:self.n]
+            self.data[name] = grown
+
+    def append(self, **values):
+        self._reserve(1)
+        i = self.n
+        for name, value in values.items():
+            self.data[name][i] = value
+        self.n += 1
+        return i
+
+    def extend(self, count, **values):
+        """Append ``count`` rows; each value is a scalar or a length-``count`` array."""
+        self._reserve(count)
+        start, end = self.n, self.n + count
+        for name, value in values.items():
+            self.data[name][start:end] = value
+        self.n = end
+
+    def keep(self, mask):
+        """Drop rows where ``mask`` is False, preserving the order of the rest."""
+        kept = int(np.count_nonzero(mask))
+        if kept == self.n:
+            return
+        for arr in self.data.values():
+            arr[:kept] = arr[:self.n][mask]
+        self.n = kept
+
+    def clear(self):
+        self.n = 0
+
+
+class EnemyArrays(EntityArrays):
+    def __init__(self, size, capacity=256):
+        super().__init__({
+            'x': np.int32, 'y': np.int32,  # rect topleft
+            'kind': np.int8, 'speed': np.int32, 'hp': np.int16,
+            'spawn_time': np.float64,
+            'px': np.int32, 'py': np.int32,  # x, y a tick ago
+        }, capacity)
+        self.w, self.h = size
+
+    def spawn(self, x, y, kind, now, scroll_speed=SCROLL_SPEED):
+        speed = scroll_speed + 2 if kind == FAST else scroll_speed
+        return self.append(x=x, y=y, kind=kind, speed=speed, hp=1, spawn_time=now, px=x, py=y)
+
+    def update(self, now):
+        """Enemy.update for every row at once; returns how many left the screen."""
+        x, y = self['x'], self['y']
+        zig = self['kind'] == ZIGZAG
+        if zig.any():
+            t = (now - self['spawn_time'][zig]) / 200.0
+            x[zig] += np.trunc(np.sin(t) * 2).astype(np.int32)
+        y += self['speed']
+        gone = y > HEIGHT
+        lost = int(np.count_nonzero(gone))
+        if lost:
+            self.keep(~gone)
+        return lost
+
+    def centers(self, rows):
+        return list(zip((self['x'][rows] + self.w // 2).tolist(),
+                        (self['y'][rows] + self.h // 2).tolist()))
+
+
+class BulletArrays(EntityArrays):
+    def __init__(self, size, capacity=1024):
+        super().__init__({'x': np.int32, 'y': np.int32, 'px': np.int32, 'py': np.int32}, capacity)  # rect topleft
+        self.w, self.h = size
+
+    def spawn(self, centerx, bottom):
+        # same placement as Bullet: rect midbottom at (centerx, bottom)
+        x, y = centerx - self.w // 2, bottom - self.h
+        return self.append(x=x, y=y, px=x, py=y)
+
+    def update(self, rows=None):
+        """Bullet.update for the first ``rows`` rows (default all)."""
+        y = self['y']
+        y[:rows] += BULLET_SPEED
+        self.keep(y + self.h >= 0)
+
+
+def overlapping_pairs(ax, ay, aw, ah, bx, by, bw, bh):
+    """Index pairs (ia, ib) of rects that overlap, pygame colliderect style.
+
+    Sort-and-sweep on x: every ``a`` gets the contiguous run of ``b`` rects
+    (sorted by left edge) that overlap it horizontally, then the y test
+    filters the pairs. Pairs come out sorted by ``ia``.
+    """
+    if not len(ax) or not len(bx):
+        empty = np.zeros(0, np.intp)
+        return empty, empty
+    order = np.argsort(bx, kind='stable')
+    sorted_bx = bx[order]
+    lo = np.searchsorted(sorted_bx, ax - bw, side='right')  # b.right > a.left
+    hi = np.searchsorted(sorted_bx, ax + aw, side='left')   # b.left < a.right
+    counts = np.maximum(hi - lo, 0)
+    total = int(counts.sum())
+    ia = np.repeat(np.arange(len(ax)), counts)
+    run_start = np.repeat(np.cumsum(counts) - counts, counts)
+    ib = order[np.repeat(lo, counts) + (np.arange(total) - run_start)]
+    vertical = (ay[ia] < by[ib] + bh) & (by[ib] < ay[ia] + ah)
+    return ia[vertical], ib[vertical]
+
+
+def mask_overlaps(mask_a, ax, ay, mask_b, bx, by):
+    """Bool array: do the masks of each (a, b) pair overlap? Positions are rect topleft."""
+    overlap = mask_a.overlap
+    offsets = zip((bx - ax).tolist(), (by - ay).tolist())
+    return np.array([overlap(mask_b, offset) is not None for offset in offsets], bool)
+
+
+class ArraySimulation(GameSimulation):
+    def __init__(self, *args, array_min=ARRAY_MIN, **kwargs):
+        """``array_min=0`` keeps bullets and enemies in the arrays at any count."""
+        self.enemy_arrays = EnemyArrays(resources.enemy_img.get_size())
+        self.bullet_arrays = BulletArrays(surface_cache.bullet_image().get_size())
+        self.array_min = array_min
+        self.vectorized = False  # bullets and enemies are in the arrays, not the sprite groups
+        self.switches = 0
+        super().__init__(*args, **kwargs)
+
+    def reset(self):
+        super().reset()
+        self.enemy_arrays.clear()
+        self.bullet_arrays.clear()
+        self.vectorized = self.array_min == 0
+
+    # -------- REPRESENTATION ----------
+    def fit_representation(self):
+        """Move bullets and enemies to arrays past ``array_min``, back below half of it."""
+        if self.vectorized:
+            if len(self.enemy_arrays) + len(self.bullet_arrays) < self.array_min // 2:
+                self.vectorize(False)
+        elif len(self.enemies) + len(self.bullets) >= self.array_min:
+            self.vectorize(True)
+
+    def vectorize(self, on):
+        enemies, bullets = self.enemy_columns(), self.bullet_columns()
+        self.load_entities(NO_ENEMIES, NO_BULLETS)
+        self.vectorized = on
+        self.load_entities(enemies, bullets)
+        self.switches += 1
+        if not on:
+            # pooled sprites come back placed at (0, 0); nothing to blend from
+            for sprite in self.enemies.sprites() + self.bullets.sprites():
+                sprite.prev = sprite.rect.topleft
+
+    # -------- ENTITIES ----------
+    def spawn_bullet(self, x, y):
+        if not self.vectorized:
+            return super().spawn_bullet(x, y)
+        self.bullet_arrays.spawn(x, y)
+
+    def spawn_enemy(self, x, y, typ=None):
+        if not self.vectorized:
+            return super().spawn_enemy(x, y, typ)
+        if typ is None:
+            typ = self.rng.choice(ENEMY_TYPES)
+        self.enemy_arrays.spawn(x, y, ENEMY_TYPES.index(typ), self.now, self.balance.scroll_speed)
+
+    def update_entities(self, now, inputs):
+        # at the top of the tick, before anything moves or collides
+        self.fit_representation()
+        if not self.vectorized:
+            return super().update_entities(now, inputs)
+        # bullets and enemies advance twice per tick, as in the sprite backend,
+        # except bullets fired by the player's own update: those miss the
+        # all_sprites pass there and only move once
+        old_bullets = len(self.bullet_arrays)
+        super().update_entities(now, inputs)
+        for rows in (old_bullets, None):
+            self.bullet_arrays.update(rows)
+            lost = self.enemy_arrays.update(now)
+            if lost:
+                self.lose_life(lost)
+
+    # -------- COLLISIONS ----------
+    def bullet_hits(self):
+        if not self.vectorized:
+            return super().bullet_hits()
+        enemies, bullets = self.enemy_arrays, self.bullet_arrays
+        ei, bi = overlapping_pairs(enemies['x'], enemies['y'], enemies.w, enemies.h,
+                                   bullets['x'], bullets['y'], bullets.w, bullets.h)
+        if len(ei) and self.pixel_collisions:
+            pixel = mask_overlaps(surface_cache.mask(resources.enemy_img), enemies['x'][ei], enemies['y'][ei],
+                                  surface_cache.mask(surface_cache.bullet_image()), bullets['x'][bi], bullets['y'][bi])
+            ei, bi = ei[pixel], bi[pixel]
+        if not len(ei):
+            return []
+        # like groupcollide(dokillb=True): each bullet goes to the first enemy
+        # (in spawn order) it overlaps
+        owner = np.full(len(bullets), len(enemies), np.intp)
+        np.minimum.at(owner, bi, ei)
+        hit_bullets = owner < len(enemies)
+        hit_enemies = np.unique(owner[hit_bullets])
+        centers = enemies.centers(hit_enemies)
+
+        alive = np.ones(len(enemies), bool)
+        alive[hit_enemies] = False
+        enemies.keep(alive)
+        bullets.keep(~hit_bullets)
+        return centers
+
+    def player_enemy_hits(self, player):
+        if not self.vectorized:
+            return super().player_enemy_hits(player)
+        enemies = self.enemy_arrays
+        r = player.rect
+        x, y = enemies['x'], enemies['y']
+        touching = (x < r.right) & (r.left < x + enemies.w) & (y < r.bottom) & (r.top < y + enemies.h)
+        if self.pixel_collisions and touching.any():
+            rows = np.flatnonzero(touching)
+            touching[rows] = mask_overlaps(surface_cache.mask(player.image), r.x, r.y,
+                                           surface_cache.mask(resources.enemy_img), x[rows], y[rows])
+        count = int(np.count_nonzero(touching))
+        if count:
+            enemies.keep(~touching)
+        return count
+
+    def boss_hits(self, boss):
+        if not self.vectorized:
+            return super().boss_hits(boss)
+        bullets = self.bullet_arrays
+        r = boss.rect
+        x, y = bullets['x'], bullets['y']
+        touching = (x < r.right) & (r.left < x + bullets.w) & (y < r.bottom) & (r.top < y + bullets.h)
+        if self.pixel_collisions and touching.any():
+            rows = np.flatnonzero(touching)
+            touching[rows] = mask_overlaps(surface_cache.mask(boss.image), r.x, r.y,
+                                           surface_cache.mask(surface_cache.bullet_image()), x[rows], y[rows])
+        count = int(np.count_nonzero(touching))
+        if count:
+            bullets.keep(~touching)
+        return count
+
+    def shooters(self):
+        if not self.vectorized:
+            return super().shooters()
+        enemies = self.enemy_arrays
+        x, y = enemies['x'], enemies['y']
+        rows = np.flatnonzero((y >= 0) & (y + enemies.h <= HEIGHT // 2))
+        return list(zip((x[rows] + enemies.w // 2).tolist(), (y[rows] + enemies.h).tolist()))
+
+    # -------- SNAPSHOTS ----------
+    def enemy_columns(self):
+        if not self.vectorized:
+            return super().enemy_columns()
+        e = self.enemy_arrays
+        return (e['x'].tolist(), e['y'].tolist(), e['kind'].tolist(), e['speed'].tolist(),
+                e['hp'].tolist(), e['spawn_time'].tolist())
+
+    def bullet_columns(self):
+        if not self.vectorized:
+            return super().bullet_columns()
+        return self.bullet_arrays['x'].tolist(), self.bullet_arrays['y'].tolist()
+
+    def load_entities(self, enemies, bullets):
+        if not self.vectorized:
+            return super().load_entities(enemies, bullets)
+        for arrays, columns in ((self.enemy_arrays, enemies), (self.bullet_arrays, bullets)):
+            arrays.clear()
+            if columns[0]:
+                arrays.extend(len(columns[0]), px=columns[0], py=columns[1],
+                              **dict(zip(arrays.fields, columns)))
+
+    # -------- VIEWS ----------
+    def mark_positions(self):
+        super().mark_positions()
+        for arrays in (self.enemy_arrays, self.bullet_arrays):
+            arrays['px'][:] = arrays['x']
+            arrays['py'][:] = arrays['y']
+
+    def entity_counts(self):
+        counts = super().entity_counts()
+        if not self.vectorized:
+            return counts
+        counts['enemies'] = len(self.enemy_arrays)
+        counts['bullets'] = len(self.bullet_arrays)
+        return counts
+
+    def lowest_enemy(self):
+        if not self.vectorized:
+            return super().lowest_enemy()
+        enemies = self.enemy_arrays
+        if not len(enemies):
+            return None
+        i = int(np.argmax(enemies['y']))
+        return int(enemies['x'][i]) + enemies.w // 2, int(enemies['y'][i]) + enemies.h
+
+    def _visible(self, layer, alpha, offset=(0, 0)):
+        """(image, x list, y list) of the on-screen rows of an array layer, moved
+        by ``offset``; None for a layer the arrays don't hold."""
+        if not self.vectorized:
+            return None
+        if layer == 'enemies':
+            arrays, image = self.enemy_arrays, resources.enemy_img
+        elif layer == 'bullets':
+            arrays, image = self.bullet_arrays, surface_cache.bullet_image()
+        else:
+            return None
+        x, y = arrays['x'], arrays['y']
+        # enemies queue up to 300px above the screen; skip what can't show
+        visible = (y < HEIGHT) & (y + arrays.h > 0)
+        if alpha < 1.0:
+            px, py = arrays['px'], arrays['py']
+            x = np.rint(px + (x - px) * alpha).astype(np.int32)
+            y = np.rint(py + (y - py) * alpha).astype(np.int32)
+        x, y = x[visible], y[visible]
+        dx, dy = offset
+        if dx or dy:
+            x, y = x + dx, y + dy
+        return image, x.tolist(), y.tolist()
+
+    def layer_view(self, layer, alpha=1.0):
+        found = self._visible(layer, alpha)
+        if found is None:
+            return super().layer_view(layer, alpha)
+        image, xs, ys = found
+        return list(zip(repeat(image), zip(xs, ys)))
+
+    def layer_blits(self, layer, alpha=1.0, image=None, offset=(0, 0), flags=0):
+        found = self._visible(layer, alpha, offset)
+        if found is None:
+            return super().layer_blits(layer, alpha, image, offset, flags)
+        own, xs, ys = found
+        image = image or own
+        # Surface.blits takes a Rect destination faster than an (x, y) tuple, and
+        # Rect.move is the cheapest way to make one
+        dests = map(image.get_rect().move, xs, ys)
+        if not flags:
+            return zip(repeat(image), dests)
+        return zip(repeat(image), dests, repeat(None), repeat(flags))
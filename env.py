@@ -0,0 +1,395 @@
+"""Gym-style environments for training bots (optional, needs numpy).
+
+GameEnv wraps one GameSimulation behind ``reset()`` / ``step(action)`` with
+the gymnasium signatures, without depending on gym itself:
+
+    obs, info = env.reset(seed=0)
+    obs, reward, terminated, truncated, info = env.step(action)
+
+An action is an int whose bits are the Inputs fields in order (left, right,
+up, down, fire held, fire pressed), i.e. exactly what Player.update reads;
+an Inputs tuple is accepted as well. Observations are either a flat float32
+vector (``obs_type='vector'``, layout in OBS_LAYOUT: player state and power
+timers, then fixed slots for the nearest enemies, bullets and items, and
+for the enemy shots closest to the ship with their velocity) or a
+downscaled RGB frame (``obs_type='frame'``).
+
+SyncVecEnv steps N envs in-process; SubprocVecEnv spreads them over worker
+processes that read actions from and write observations, rewards, done flags
+and final infos straight into one shared-memory block, synchronised by
+semaphores instead of pipe messages. Both auto-reset finished envs and
+report the final info in ``infos``.
+"""
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+import pygame
+
+import render
+import simulation
+from settings import WIDTH, HEIGHT, FRAME_MS, MAX_LIVES, MAX_LEVEL, POWER_DURATION_MAX
+from simulation import Inputs
+
+ACTION_BITS = Inputs._fields
+N_ACTIONS = 1 << len(ACTION_BITS)
+
+MAX_ENEMIES = 16
+MAX_BULLETS = 32
+MAX_ITEMS = 4
+MAX_SHOT_SLOTS = 32
+SHOT_SPEED_SCALE = 8.0  # px/tick mapped to 1.0
+ITEM_INDEX = {typ: i for i, typ in enumerate(simulation.ITEM_TYPES)}
+
+# name -> (start, end) in the vector observation
+OBS_LAYOUT = {}
+_size = 0
+for _name, _width in (('player', 9), ('enemies', MAX_ENEMIES * 3),
+                      ('bullets', MAX_BULLETS * 3), ('items', MAX_ITEMS * 4),
+                      ('shots', MAX_SHOT_SLOTS * 5)):
+    OBS_LAYOUT[_name] = (_size, _size + _width)
+    _size += _width
+OBS_SIZE = _size
+
+FRAME_SCALE = 8  # frame observations are (HEIGHT / 8, WIDTH / 8, 3) uint8
+
+# reward per event / per life lost
+REWARDS = {'explosion': 1.0, 'pickup': 0.2, 'win': 10.0}
+LIFE_LOST_REWARD = -1.0
+
+
+def observation_spec(obs_type='vector', frame_scale=FRAME_SCALE):
+    """(shape, dtype) of one observation."""
+    if obs_type == 'vector':
+        return (OBS_SIZE,), np.float32
+    if obs_type == 'frame':
+        return (HEIGHT // frame_scale, WIDTH // frame_scale, 3), np.uint8
+    raise ValueError(f"unknown obs_type {obs_type!r}")
+
+
+ACTIONS = tuple(Inputs(*(bool(a & (1 << i)) for i in range(len(ACTION_BITS))))
+                for a in range(N_ACTIONS))
+
+
+def action_inputs(action):
+    if isinstance(action, Inputs):
+        return action
+    return ACTIONS[int(action)]
+
+
+def _by_y(pos):
+    return pos[1]
+
+
+def inputs_action(inputs):
+    return sum(1 << i for i, held in enumerate(inputs) if held)
+
+
+class GameEnv:
+    def __init__(self, engine='sprites', obs_type='vector', frame_skip=1,
+                 max_steps=20000, balance=None, frame_scale=FRAME_SCALE):
+        self.obs_shape, self.obs_dtype = observation_spec(obs_type, frame_scale)
+        self.engine = engine
+        self.obs_type = obs_type
+        self.frame_skip = frame_skip
+        self.max_steps = max_steps
+        self.balance = balance
+        self.sim = None
+        self.steps = 0
+        if obs_type == 'frame':
+            self.canvas = pygame.Surface((WIDTH, HEIGHT)).convert()
+            self.small = pygame.Surface((WIDTH // frame_scale, HEIGHT // frame_scale)).convert()
+
+    # -------- GYM API ----------
+    def reset(self, seed=None, out=None):
+        self.sim = simulation.make_simulation(self.engine, seed=seed, balance=self.balance)
+        self.steps = 0
+        return self.observe(out), {}
+
+    def step(self, action, out=None):
+        sim = self.sim
+        inputs = action_inputs(action)
+        reward = 0.0
+        lives_lost = sim.lives_lost
+        for _ in range(self.frame_skip):
+            for name in sim.step(FRAME_MS, inputs):
+                reward += REWARDS.get(name, 0.0)
+            if sim.finished:
+                break
+            inputs = inputs._replace(fire_pressed=False)  # a press is one KEYDOWN
+        reward += LIFE_LOST_REWARD * (sim.lives_lost - lives_lost)
+        self.steps += 1
+        terminated = sim.finished
+        truncated = not terminated and self.steps >= self.max_steps
+        info = {}
+        if terminated or truncated:
+            info = {'level': sim.level, 'win': sim.game_win, 'lives_lost': sim.lives_lost,
+                    'frames': sim.frame}
+        return self.observe(out), reward, terminated, truncated, info
+
+    # -------- OBSERVATIONS ----------
+    def observe(self, out=None):
+        if out is None:
+            out = np.empty(self.obs_shape, self.obs_dtype)
+        if self.obs_type == 'vector':
+            self._observe_vector(out)
+        else:
+            self._observe_frame(out)
+        return out
+
+    def _observe_vector(self, out):
+        sim = self.sim
+        out[:] = 0.0
+        now = sim.now
+        player = sim.player
+        powers = player.powers
+        p = player.rect
+        out[0:9] = (
+            p.centerx / WIDTH, p.centery / HEIGHT,
+            sim.lives / MAX_LIVES, sim.level / MAX_LEVEL,
+            sim.enemies_destroyed / max(1, sim.enemies_required),
+            max(0.0, powers.get('fast_fire', now) - now) / POWER_DURATION_MAX,
+            max(0.0, powers.get('multi_shot', now) - now) / POWER_DURATION_MAX,
+            max(0.0, player.invulnerable_until - now) / 1000.0,
+            1.0 if sim.level_transition else 0.0,
+        )
+        self._fill_slots(out, 'enemies', sim.layer_view('enemies'), 3)
+        self._fill_slots(out, 'bullets', sim.layer_view('bullets'), 3)
+        start, _ = OBS_LAYOUT['items']
+        items = sorted(sim.items, key=lambda it: -it.rect.bottom)[:MAX_ITEMS]
+        for i, it in enumerate(items):
+            row = start + i * 4
+            out[row:row + 4] = (it.rect.centerx / WIDTH, it.rect.centery / HEIGHT,
+                                (ITEM_INDEX.get(it.type, 0) + 1) / len(ITEM_INDEX), 1.0)
+        if sim.fire is not None and sim.fire.shots.n:
+            self._fill_shots(out, sim.fire.shots, p.center)
+
+    @staticmethod
+    def _fill_shots(out, shots, center):
+        """Closest to the ship first; (cx, cy, vx, vy, present)."""
+        x, y, vx, vy = shots.data[:, :shots.n]
+        dist = (x - center[0]) ** 2 + (y - center[1]) ** 2
+        count = min(MAX_SHOT_SLOTS, len(dist))
+        nearest = np.argpartition(dist, count - 1)[:count] if count < len(dist) else np.arange(count)
+        nearest = nearest[np.argsort(dist[nearest], kind='stable')]
+        start, _ = OBS_LAYOUT['shots']
+        slots = out[start:start + count * 5].reshape(count, 5)
+        slots[:, 0] = x[nearest] / WIDTH
+        slots[:, 1] = y[nearest] / HEIGHT
+        slots[:, 2] = vx[nearest] / SHOT_SPEED_SCALE
+        slots[:, 3] = vy[nearest] / SHOT_SPEED_SCALE
+        slots[:, 4] = 1.0
+
+    @staticmethod
+    def _fill_slots(out, name, view, width):
+        """Nearest-to-the-player (lowest on screen) first; (cx, cy, present)."""
+        if not view:
+            return
+        start, end = OBS_LAYOUT[name]
+        w, h = view[0][0].get_size()
+        # a few dozen entries: plain Python beats numpy's per-call overhead
+        positions = sorted(((q[0], q[1]) for _, q in view), key=_by_y, reverse=True)
+        flat = []
+        for x, y in positions[:(end - start) // width]:
+            flat += ((x + w / 2) / WIDTH, (y + h / 2) / HEIGHT, 1.0)
+        out[start:start + len(flat)] = flat
+
+    def _observe_frame(self, out):
+        sim = self.sim
+        render.draw_background(self.canvas, sim.bg_y % HEIGHT)
+        render.draw_world(self.canvas, sim)
+        pygame.transform.scale(self.canvas, self.small.get_size(), self.small)
+        out[:] = pygame.surfarray.pixels3d(self.small).swapaxes(0, 1)
+
+
+# -------- VECTORIZED ----------
+class SyncVecEnv:
+    """N GameEnvs stepped one after another in this process."""
+
+    def __init__(self, num_envs, seed=0, **env_kwargs):
+        self.envs = [GameEnv(**env_kwargs) for _ in range(num_envs)]
+        self.num_envs = num_envs
+        self.seed = seed
+        self.episodes = 0
+        env = self.envs[0]
+        self.obs = np.zeros((num_envs,) + env.obs_shape, env.obs_dtype)
+        self.rewards = np.zeros(num_envs, np.float32)
+        self.terminated = np.zeros(num_envs, bool)
+        self.truncated = np.zeros(num_envs, bool)
+
+    def reset(self):
+        for i, env in enumerate(self.envs):
+            env.reset(self.seed + i, out=self.obs[i])
+        self.episodes = self.num_envs
+        return self.obs
+
+    def step(self, actions):
+        infos = [{}] * self.num_envs
+        for i, env in enumerate(self.envs):
+            _, r, term, trunc, info = env.step(actions[i], out=self.obs[i])
+            self.rewards[i], self.terminated[i], self.truncated[i] = r, term, trunc
+            if term or trunc:
+                infos[i] = info
+                env.reset(self.seed + self.episodes, out=self.obs[i])
+                self.episodes += 1
+        return self.obs, self.rewards, self.terminated, self.truncated, infos
+
+    def close(self):
+        pass
+
+
+# per env, what the worker hands back when an episode ends (GameEnv.step's info)
+INFO_FIELDS = ('level', 'win', 'lives_lost', 'frames')
+# SubprocVecEnv command slot
+CMD_STEP, CMD_RESET, CMD_CLOSE = range(3)
+WORKER_POLL = 1.0  # s between liveness checks while waiting on the workers
+
+
+def _layout(num_envs, obs_shape, obs_dtype):
+    """(shape, dtype) of each view over the shared block, in order."""
+    return (((num_envs,) + obs_shape, obs_dtype), ((num_envs,), np.float32),
+            ((num_envs,), np.bool_), ((num_envs,), np.bool_), ((num_envs,), np.int64),
+            ((num_envs, len(INFO_FIELDS)), np.int64), ((1,), np.int64))
+
+
+def _buffers(shm, num_envs, obs_shape, obs_dtype):
+    """numpy views over the shared block: obs, rewards, terminated, truncated,
+    actions, final infos and the command slot."""
+    views = []
+    offset = 0
+    for shape, dtype in _layout(num_envs, obs_shape, obs_dtype):
+        arr = np.ndarray(shape, dtype, buffer=shm.buf, offset=offset)
+        views.append(arr)
+        offset += arr.nbytes
+        offset += -offset % 8
+    return views
+
+
+def _buffer_size(num_envs, obs_shape, obs_dtype):
+    size = 0
+    for shape, dtype in _layout(num_envs, obs_shape, obs_dtype):
+        size += int(np.prod(shape)) * np.dtype(dtype).itemsize
+        size += -size % 8
+    return size
+
+
+def _worker(shm_name, go, done, num_envs, rows, seeds, env_kwargs):
+    simulation.init_headless()
+    envs = [GameEnv(**env_kwargs) for _ in rows]
+    shm = shared_memory.SharedMemory(name=shm_name)
+    (obs, rewards, terminated, truncated, actions,
+     infos, cmd) = _buffers(shm, num_envs, envs[0].obs_shape, envs[0].obs_dtype)
+    try:
+        while True:
+            go.acquire()
+            command = cmd[0]
+            if command == CMD_STEP:
+                for env, i in zip(envs, rows):
+                    _, r, term, trunc, info = env.step(actions[i], out=obs[i])
+                    rewards[i], terminated[i], truncated[i] = r, term, trunc
+                    if term or trunc:
+                        infos[i] = [info[name] for name in INFO_FIELDS]
+                        env.reset(next(seeds), out=obs[i])
+            elif command == CMD_RESET:
+                for env, i in zip(envs, rows):
+                    env.reset(next(seeds), out=obs[i])
+            else:
+                break
+            done.release()
+    finally:
+        del obs, rewards, terminated, truncated, actions, infos, cmd
+        shm.close()
+
+
+class _Seeds:
+    """Picklable seed counter: start, start + stride, ..."""
+
+    def __init__(self, start, stride):
+        self.next_seed = start
+        self.stride = stride
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        seed = self.next_seed
+        self.next_seed += self.stride
+        return seed
+
+
+class SubprocVecEnv:
+    """N GameEnvs over ``workers`` processes sharing one block of memory.
+
+    Envs are split into contiguous runs, one per worker, and a worker steps
+    its whole run per command. Nothing goes through a pipe per step: actions,
+    results, the final infos and the command itself live in the shared block,
+    and the workers meet the main process at a barrier made of semaphores:
+    each worker waits on its own to start (a shared one would let a fast
+    worker take a slow one's turn) and all release one shared one when done.
+    Seeds never repeat across envs or episodes.
+    """
+
+    def __init__(self, num_envs, workers=None, seed=0, **env_kwargs):
+        workers = min(num_envs, workers or multiprocessing.cpu_count())
+        self.num_envs = num_envs
+        obs_shape, obs_dtype = observation_spec(env_kwargs.get('obs_type', 'vector'),
+                                                env_kwargs.get('frame_scale', FRAME_SCALE))
+        self.shm = shared_memory.SharedMemory(create=True, size=_buffer_size(num_envs, obs_shape, obs_dtype))
+        (self.obs, self.rewards, self.terminated, self.truncated, self.actions,
+         self.infos, self.cmd) = _buffers(self.shm, num_envs, obs_shape, obs_dtype)
+
+        self.go = [multiprocessing.Semaphore(0) for _ in range(workers)]
+        self.done = multiprocessing.Semaphore(0)
+        self.procs = []
+        for w, go in enumerate(self.go):
+            rows = list(range(w * num_envs // workers, (w + 1) * num_envs // workers))
+            proc = multiprocessing.Process(
+                target=_worker, daemon=True,
+                args=(self.shm.name, go, self.done, num_envs, rows,
+                      _Seeds(seed + w, workers), env_kwargs))
+            proc.start()
+            self.procs.append(proc)
+
+    def _run(self, command):
+        """Every worker runs ``command`` once; returns when all are done."""
+        self.cmd[0] = command
+        for go in self.go:
+            go.release()
+        for _ in self.procs:
+            while not self.done.acquire(timeout=WORKER_POLL):
+                dead = [p.pid for p in self.procs if not p.is_alive()]
+                if dead:
+                    raise RuntimeError(f"SubprocVecEnv worker(s) {dead} exited")
+
+    def reset(self):
+        self._run(CMD_RESET)
+        return self.obs
+
+    def step(self, actions):
+        self.actions[:] = actions
+        self._run(CMD_STEP)
+        infos = [{}] * self.num_envs
+        for i in np.flatnonzero(self.terminated | self.truncated):
+            level, win, lives_lost, frames = self.infos[i].tolist()
+            infos[i] = {'level': level, 'win': bool(win), 'lives_lost': lives_lost, 'frames': frames}
+        return self.obs, self.rewards, self.terminated, self.truncated, infos
+
+    def close(self):
+        if self.shm is None:
+            return
+        self.cmd[0] = CMD_CLOSE
+        for go in self.go:
+            go.release()
+        for proc in self.procs:
+            proc.join(timeout=5)
+        self.obs = self.rewards = self.terminated = self.truncated = self.actions = None
+        self.infos = self.cmd = None
+        self.shm.close()
+        self.shm.unlink()
+        self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,268 @@
+"""Garbage-collector control and per-frame allocation telemetry.
+
+CPython's cyclic collector runs whenever tracked allocations outpace frees
+by a threshold, wherever the program happens to be: in practice mid-frame.
+Young passes are short, but they promote survivors, and every so often a full
+pass walks every tracked object in the process: the loaded assets, the pools,
+thousands of sprites. Under the bullet_hell stress scenario that was the whole
+p99 (about 20 ms against 6 ms with collection off).
+
+GCControl moves collection out of gameplay:
+
+- freeze() after the assets are in: one collection, then gc.freeze() moves
+  everything alive into the permanent generation, which no pass scans again.
+- play() turns automatic collection off. A young-generation pass still runs
+  if YOUNG_LIMIT tracked objects pile up (a cycle-heavy stretch), so memory
+  stays bounded even in a level that never ends.
+- safe_window() runs a full collection where a pause can't be seen: the
+  menu, the level-transition fade and the end screen.
+
+A gc callback times every collection and counts the ones that ran during
+play, so stats() shows whether any hitch is left. ``enabled=False`` leaves
+Python's defaults alone and only measures them.
+
+AllocationTracker (``--alloc-trace``) counts allocations with tracemalloc.
+Each frame it records the high-water of bytes allocated above the frame's
+start, which includes short-lived temporaries, and the bytes the frame left
+alive. Watched functions (Player.update, Bullet.__init__, Item.__init__, the
+renderer's game()) are wrapped to get the same two numbers per call. Every
+SAMPLE_EVERY frames a snapshot is diffed against the previous one. Allocations
+that survived and came from inside a watched function are charged to it by
+allocating line. Those survivors are what the collector counts, which makes
+them the top call sites report(). tracemalloc slows everything down a lot,
+so this is a diagnostic switch and not something to play with.
+"""
+import functools
+import gc
+import os
+import time
+import tracemalloc
+from collections import Counter, deque
+
+from profiling import percentile
+
+# -------- CONFIG ----------
+YOUNG_LIMIT = 20000  # tracked objects pending before a young pass runs anyway during play
+PAUSE_HISTORY = 2000  # collections whose pause times stats() covers
+TRACE_DEPTH = 12  # frames kept per traced allocation
+SAMPLE_EVERY = 60  # frames between snapshot diffs
+TOP_SITES = 10
+FRAME_HISTORY = 3600  # frames the per-frame figures cover
+TRACE_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class GCControl:
+    def __init__(self, enabled=True, clock=time.perf_counter):
+        self.enabled = enabled  # False: automatic collection as Python does it
+        self.clock = clock
+        self.window = None  # why the collection running now was started; None = automatic
+        self.started = 0.0
+        self.frozen = 0
+        self.play_collections = [0, 0, 0]  # automatic passes during play, per generation
+        self.play_pauses = deque(maxlen=PAUSE_HISTORY)  # ms
+        self.forced = 0  # young passes past YOUNG_LIMIT
+        self.windows = Counter()  # reason -> full collections run
+        self.window_ms = 0.0  # longest of those
+        self.collected = 0  # unreachable objects the windows freed
+        gc.callbacks.append(self._on_gc)
+
+    def _on_gc(self, phase, info):
+        if phase == 'start':
+            self.started = self.clock()
+            return
+        ms = (self.clock() - self.started) * 1000
+        if self.window is None:
+            self.play_collections[info['generation']] += 1
+            self.play_pauses.append(ms)
+        elif self.window != 'guard':
+            self.window_ms = max(self.window_ms, ms)
+
+    def _collect(self, reason, generation=2):
+        self.window = reason
+        try:
+            return gc.collect(generation)
+        finally:
+            self.window = None
+
+    def freeze(self):
+        """Assets are loaded: collect once, then keep everything alive out of every pass."""
+        if not self.enabled:
+            return
+        self.collected += self._collect('load')
+        gc.freeze()
+        self.frozen = gc.get_freeze_count()
+
+    def play(self):
+        """Gameplay from here on: no automatic passes."""
+        if self.enabled:
+            gc.disable()
+
+    def safe_window(self, reason):
+        """Nothing moving is on screen (menu, level fade, end screen): collect fully."""
+        if not self.enabled:
+            return
+        self.windows[reason] += 1
+        self.collected += self._collect(reason)
+
+    def frame(self):
+        """Once per gameplay frame: the young-generation backstop."""
+        if self.enabled and gc.get_count()[0] >= YOUNG_LIMIT:
+            self.forced += 1
+            self._collect('guard', 0)
+
+    def close(self):
+        """Back to Python's defaults."""
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+        if self.frozen:
+            gc.unfreeze()
+        gc.enable()
+
+    def stats(self):
+        pauses = sorted(self.play_pauses)
+        return {
+            'mode': 'windows' if self.enabled else 'auto',
+            'frozen': self.frozen,
+            'play_collections': list(self.play_collections),
+            'play_pause_p99_ms': round(percentile(pauses, 99), 2),
+            'play_pause_max_ms': round(pauses[-1], 2) if pauses else 0.0,
+            'forced': self.forced,
+            'windows': dict(self.windows),
+            'window_max_ms': round(self.window_ms, 2),
+            'collected': self.collected,
+        }
+
+
+class AllocationTracker:
+    def __init__(self, depth=TRACE_DEPTH, sample_every=SAMPLE_EVERY):
+        self.depth = depth
+        self.sample_every = sample_every
+        self.watched = {}  # label -> {'calls', 'peak', 'retained'} (bytes summed over calls)
+        self.ranges = []  # (filename, first line, last line, label) of the watched code
+        self.restore = []  # (owner, name, original or None if inherited)
+        self.stack = []  # [bytes at entry, peak seen] per open frame; [0] is the game frame
+        self.allocated = deque(maxlen=FRAME_HISTORY)  # bytes per frame, high-water above its start
+        self.retained = deque(maxlen=FRAME_HISTORY)  # bytes per frame still alive at its end
+        self.sites = Counter()  # (label, site) -> surviving blocks
+        self.site_bytes = Counter()
+        self.snapshot = None
+        self.frames = 0
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.depth)
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        self.stack[:] = [[current, current]]  # the wrappers hold this list
+
+    def stop(self):
+        for owner, name, original in reversed(self.restore):
+            if original is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+        self.restore = []
+        self.snapshot = None
+        tracemalloc.stop()
+
+    def watch(self, owner, name, label=None):
+        """Wrap ``owner.name`` to count what each call allocates."""
+        label = label or f"{owner.__name__}.{name}"
+        original = getattr(owner, name)
+        code = original.__code__
+        lines = [line for _, _, line in code.co_lines() if line is not None]
+        self.ranges.append((code.co_filename, min(lines), max(lines), label))
+        entry = self.watched[label] = {'calls': 0, 'peak': 0, 'retained': 0}
+        stack = self.stack
+
+        @functools.wraps(original)
+        def traced(*args, **kwargs):
+            current, peak = tracemalloc.get_traced_memory()
+            # the caller's high-water so far, before this call resets it
+            stack[-1][1] = max(stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            mine = [current, current]
+            stack.append(mine)
+            try:
+                return original(*args, **kwargs)
+            finally:
+                stack.pop()
+                after, peak = tracemalloc.get_traced_memory()
+                peak = max(mine[1], peak)
+                stack[-1][1] = max(stack[-1][1], peak)
+                entry['calls'] += 1
+                entry['peak'] += peak - current
+                entry['retained'] += after - current
+
+        self.restore.append((owner, name, owner.__dict__.get(name)))
+        setattr(owner, name, traced)
+
+    def end_frame(self):
+        current, peak = tracemalloc.get_traced_memory()
+        start, seen = self.stack[0]
+        self.allocated.append(max(seen, peak) - start)
+        self.retained.append(current - start)
+        tracemalloc.reset_peak()
+        self.stack[0] = [current, current]
+        self.frames += 1
+        if self.frames % self.sample_every == 0:
+            self._sample()
+
+    def _label(self, traceback):
+        """(label, line in the watched function) of the innermost watched frame, or None."""
+        for frame in reversed(traceback):
+            for filename, first, last, label in self.ranges:
+                if frame.filename == filename and first <= frame.lineno <= last:
+                    return label, frame
+        return None
+
+    def _sample(self):
+        snapshot = tracemalloc.take_snapshot().filter_traces(TRACE_FILTERS)
+        if self.snapshot is not None:
+            for diff in snapshot.compare_to(self.snapshot, 'traceback'):
+                if diff.count_diff <= 0:
+                    continue
+                found = self._label(diff.traceback)
+                if found is None:
+                    continue
+                label, via = found
+                here = diff.traceback[-1]
+                site = f"{os.path.basename(here.filename)}:{here.lineno}"
+                if here != via:
+                    site += f" (via {os.path.basename(via.filename)}:{via.lineno})"
+                self.sites[label, site] += diff.count_diff
+                self.site_bytes[label, site] += diff.size_diff
+        self.snapshot = snapshot
+
+    # -------- REPORTING ----------
+    def stats(self):
+        allocated = sorted(self.allocated)
+        kb = 1024
+        return {
+            'frames': self.frames,
+            'alloc_kb_p50': round(percentile(allocated, 50) / kb, 1),
+            'alloc_kb_p99': round(percentile(allocated, 99) / kb, 1),
+            'retained_kb_mean': round(sum(self.retained) / max(1, len(self.retained)) / kb, 2),
+        }
+
+    def report(self, top=TOP_SITES):
+        """Per-frame figures, what each watched function allocates, and the top sites."""
+        frames = max(1, self.frames)
+        lines = [f"allocations: {self.stats()}"]
+        lines.append(f"{'watched':<24}{'calls/frame':>12}{'peak B/call':>13}{'kept B/call':>13}")
+        for label, entry in self.watched.items():
+            calls = entry['calls']
+            per = max(1, calls)
+            lines.append(f"{label:<24}{calls / frames:>12.2f}{entry['peak'] / per:>13.0f}"
+                         f"{entry['retained'] / per:>13.0f}")
+        if self.sites:
+            lines.append(f"top surviving allocation sites (blocks, bytes over {frames} frames):")
+            for (label, site), count in self.sites.most_common(top):
+                lines.append(f"  {label:<22}{count:>8}{self.site_bytes[label, site]:>10}  {site}")
+        else:
+            lines.append("no surviving allocations from the watched functions")
+        return "\n".join(lines)
@@ -0,0 +1,834 @@
+"""Two-player co-op over the network: the host simulates, the client predicts.
+
+The host runs the only GameSimulation (``players=2``) and is the authority
+on everything in it. Every tick it sends each client a snapshot of what the
+window needs to draw: the world counters, both ships, the boss, and the
+on-screen enemies, bullets, items and enemy shots as packed int16 columns
+(interest culling - enemies queued above the screen and anything off it
+never go out). Lists are capped per layer so a snapshot always fits one
+datagram; past MAX_SHOTS_NET the oldest shots are left out.
+
+Snapshots are delta-compressed: the body is XORed with the newest snapshot
+the client has acknowledged (the host keeps HISTORY of them) and zlib packs
+the mostly-zero result. A client that hasn't acked anything recent gets a
+full snapshot, so a lost datagram costs one bigger packet, never a resync.
+
+The client sends its inputs as replay.py's input bitmask, one message per
+frame carrying the last INPUT_REDUNDANCY frames so a lost datagram doesn't
+lose a keypress. The host queues them by sequence number and applies one per
+tick (holding the last one when the queue runs dry). The client moves its
+own ship immediately (sprites.move_ship) and, on each snapshot, snaps to the
+host's position and replays the inputs the host hasn't applied yet; only
+the ship is predicted, everything else is drawn as the host last saw it.
+
+UDP is the default transport; ``tcp`` sends the same messages with a 2-byte
+length prefix (no loss, but a late packet holds up everything behind it).
+
+    python netplay.py host --port 7777            # dedicated: a bot flies player 1
+    python netplay.py join 127.0.0.1:7777 --seconds 30
+    python AnhMinhSaDec.py --host 7777            # play player 1, wait for a partner
+    python AnhMinhSaDec.py --join 127.0.0.1:7777
+"""
+import argparse
+import itertools
+import select
+import socket
+import statistics
+import struct
+import time
+import zlib
+from array import array
+from collections import deque
+
+import surface_cache
+import resources
+from profiling import percentile
+from replay import pack_inputs, unpack_inputs
+from rewind import xor_bytes
+from settings import FPS, FRAME_MS, MAX_LIVES
+from simulation import ITEM_TYPES, NO_INPUT, SCREEN_RECT, GameSimulation, autopilot, init_headless, make_simulation
+from sprites import Player, move_ship
+from surface_cache import INVULNERABLE_ALPHA
+
+# -------- CONFIG ----------
+DEFAULT_PORT = 7777
+NET_VERSION = 2
+HISTORY = 64  # snapshots the host keeps per session as delta baselines
+INPUT_REDUNDANCY = 3  # frames of input bits in every INPUT message
+MAX_INPUT_QUEUE = 2  # inputs the host buffers before skipping the oldest
+TIMEOUT_S = 5.0  # silence before either side drops the other
+HELLO_EVERY_S = 0.25
+MAX_ENEMIES = 200  # per snapshot, after culling
+MAX_BULLETS = 400
+MAX_ITEMS = 32
+MAX_SHOTS_NET = 2000
+TRANSPORTS = ('udp', 'tcp')
+
+HELLO, WELCOME, INPUT, SNAPSHOT, BYE = range(5)
+_HELLO = struct.Struct("<BB")  # type, version
+_WELCOME = struct.Struct("<BBH")  # type, player index, ticks per second
+_INPUT = struct.Struct("<BII%dB" % INPUT_REDUNDANCY)  # type, seq, acked tick, bits for seq, seq-1, ...
+_SNAPSHOT = struct.Struct("<BIII")  # type, tick, baseline tick (0 = full), last input seq applied
+_LENGTH = struct.Struct("<H")  # tcp framing
+
+# snapshot body: world, then per ship, then the columns
+_WORLD = struct.Struct("<IdBBHHBId5H")
+# frame, now, level, lives, destroyed, required, flags, bg_y, transition start,
+# then enemy/bullet/item/shot/effect counts
+_SHIP = struct.Struct("<hhB" + "H" * 2)  # x, y, flags, ms left of each power
+_BOSS = struct.Struct("<hhHH")  # x, y, hp, max hp; only while _BOSS_UP is set
+POWERS = ('fast_fire', 'multi_shot')
+EVENTS = ('shoot', 'explosion', 'pickup', 'level_up', 'level_start', 'win', 'game_over')
+EFFECTS = (('explosion', None),) + tuple(('pickup', typ) for typ in ITEM_TYPES)
+_EFFECT = struct.Struct("<Bhh")
+_EVENT_COUNT = struct.Struct("<B")
+
+_GAME_OVER, _GAME_WIN, _TRANSITION, _BOSS_UP = 1, 2, 4, 8
+_FLAME, _INVULNERABLE = 1, 2
+
+
+# -------- SNAPSHOTS ----------
+def encode_snapshot(sim):
+    """What a client needs to draw ``sim`` this tick, as bytes."""
+    enemies = sim.layer_view('enemies')[:MAX_ENEMIES]
+    bullets = sim.layer_view('bullets')[:MAX_BULLETS]
+    visible = SCREEN_RECT.colliderect
+    items = [it for it in sim.items if visible(it.rect)][:MAX_ITEMS]
+    shots = sim.layer_view('shots')[-MAX_SHOTS_NET:]
+    boss = sim.layer_view('boss')
+    effects = sim.effects[:255]
+    flags = (sim.game_over and _GAME_OVER) | (sim.game_win and _GAME_WIN) \
+        | (sim.level_transition and _TRANSITION) | (bool(boss) and _BOSS_UP)
+    parts = [_WORLD.pack(sim.frame, sim.now, sim.level, sim.lives, sim.enemies_destroyed,
+                         sim.enemies_required, flags, int(sim.bg_y), sim.level_transition_start,
+                         len(enemies), len(bullets), len(items), len(shots), len(effects))]
+    if boss:
+        rect = boss[0][1]
+        parts.append(_BOSS.pack(rect.x, rect.y, *sim.boss_hp()))
+    now = sim.now
+    for player in sim.players:
+        parts.append(_SHIP.pack(player.rect.x, player.rect.y,
+                                (player.show_flame and _FLAME) | (player.invulnerable and _INVULNERABLE),
+                                *(min(0xFFFF, max(0, int(player.powers[name] - now))) if name in player.powers
+                                  else 0 for name in POWERS)))
+    # x column then y column per layer: neighbouring ticks line up for the XOR
+    for view in (enemies, bullets, shots):
+        parts.append(array('h', [int(pos[0]) for _, pos in view]).tobytes())
+        parts.append(array('h', [int(pos[1]) for _, pos in view]).tobytes())
+    parts.append(array('h', [it.rect.x for it in items]).tobytes())
+    parts.append(array('h', [it.rect.y for it in items]).tobytes())
+    parts.append(bytes(ITEM_TYPES.index(it.type) for it in items))
+    for name, x, y, variant in effects:
+        parts.append(_EFFECT.pack(EFFECTS.index((name, variant)), int(x), int(y)))
+    events = [EVENTS.index(name) for name in sim.events if name in EVENTS][:255]
+    parts.append(_EVENT_COUNT.pack(len(events)))
+    parts.append(bytes(events))
+    return b"".join(parts)
+
+
+class SnapshotView:
+    """A decoded snapshot; ``ships`` holds (x, y, flags, {power: ms left}) per player."""
+
+    def __init__(self, body, players):
+        (self.frame, self.now, self.level, self.lives, self.enemies_destroyed, self.enemies_required,
+         flags, self.bg_y, self.level_transition_start, n_enemies, n_bullets, n_items, n_shots, n_effects) \
+            = _WORLD.unpack_from(body)
+        self.game_over = bool(flags & _GAME_OVER)
+        self.game_win = bool(flags & _GAME_WIN)
+        self.level_transition = bool(flags & _TRANSITION)
+        offset = _WORLD.size
+        self.boss = None  # (x, y, hp, max hp)
+        if flags & _BOSS_UP:
+            self.boss = _BOSS.unpack_from(body, offset)
+            offset += _BOSS.size
+        self.ships = []
+        for _ in range(players):
+            x, y, ship_flags, *left = _SHIP.unpack_from(body, offset)
+            self.ships.append((x, y, ship_flags, {name: ms for name, ms in zip(POWERS, left) if ms}))
+            offset += _SHIP.size
+        columns = []
+        for n in (n_enemies, n_enemies, n_bullets, n_bullets, n_shots, n_shots, n_items, n_items):
+            column = array('h')
+            column.frombytes(body[offset:offset + 2 * n])
+            columns.append(column)
+            offset += 2 * n
+        self.enemies = columns[0:2]
+        self.bullets = columns[2:4]
+        self.shots = columns[4:6]
+        self.items = columns[6:8] + [body[offset:offset + n_items]]
+        offset += n_items
+        self.effects = []
+        for _ in range(n_effects):
+            kind, x, y = _EFFECT.unpack_from(body, offset)
+            name, variant = EFFECTS[kind]
+            self.effects.append((name, x, y, variant))
+            offset += _EFFECT.size
+        n_events = _EVENT_COUNT.unpack_from(body, offset)[0]
+        offset += _EVENT_COUNT.size
+        self.events = [EVENTS[i] for i in body[offset:offset + n_events]]
+
+
+# -------- TRANSPORT ----------
+class TcpChannel:
+    """Messages over a connected TCP socket, each behind a 2-byte length."""
+
+    def __init__(self, sock):
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = sock
+        self.inbox = bytearray()
+        self.outbox = bytearray()
+        self.closed = False
+        self.bytes_out = self.bytes_in = 0
+
+    def send(self, msg):
+        self.outbox += _LENGTH.pack(len(msg))
+        self.outbox += msg
+        self.bytes_out += _LENGTH.size + len(msg)
+        self.flush()
+
+    def flush(self):
+        if not self.outbox or self.closed:
+            return
+        try:
+            sent = self.sock.send(self.outbox)
+        except BlockingIOError:
+            return
+        except OSError:
+            self.closed = True
+            return
+        del self.outbox[:sent]
+
+    def receive(self):
+        """Whole messages that arrived since the last call."""
+        while not self.closed:
+            try:
+                chunk = self.sock.recv(65536)
+            except BlockingIOError:
+                break
+            except OSError:
+                chunk = b""
+            if not chunk:
+                self.closed = True
+                break
+            self.inbox += chunk
+            self.bytes_in += len(chunk)
+        self.flush()
+        messages = []
+        inbox = self.inbox
+        while len(inbox) >= _LENGTH.size:
+            size = _LENGTH.unpack_from(inbox)[0]
+            end = _LENGTH.size + size
+            if len(inbox) < end:
+                break
+            messages.append(bytes(inbox[_LENGTH.size:end]))
+            del inbox[:end]
+        return messages
+
+    def close(self):
+        self.closed = True
+        self.sock.close()
+
+
+class UdpChannel:
+    """Datagrams to one address. The host's channels share its socket and get
+    their datagrams handed over by Host.poll(); a client's owns its socket."""
+
+    def __init__(self, sock, address, owns_socket=False):
+        self.sock = sock
+        self.address = address
+        self.owns_socket = owns_socket
+        self.pending = []
+        self.closed = False
+        self.bytes_out = self.bytes_in = 0
+        self.dropped = 0  # sends the socket refused (buffer full)
+
+    def send(self, msg):
+        try:
+            self.sock.sendto(msg, self.address)
+            self.bytes_out += len(msg)
+        except (BlockingIOError, ConnectionRefusedError):
+            self.dropped += 1
+        except OSError:
+            self.dropped += 1
+
+    def deliver(self, msg):
+        self.pending.append(msg)
+        self.bytes_in += len(msg)
+
+    def receive(self):
+        if self.owns_socket:
+            while True:
+                try:
+                    msg, address = self.sock.recvfrom(65536)
+                except (BlockingIOError, ConnectionRefusedError):
+                    break
+                except OSError:
+                    break
+                if address == self.address:
+                    self.deliver(msg)
+        messages, self.pending = self.pending, []
+        return messages
+
+    def close(self):
+        self.closed = True
+        if self.owns_socket:
+            self.sock.close()
+
+
+def parse_address(text, default_port=DEFAULT_PORT):
+    host, _, port = text.rpartition(':')
+    if not host:
+        return text, default_port
+    return host, int(port)
+
+
+# -------- HOST ----------
+class Session:
+    """One client on the host: its channel, input queue and snapshot history."""
+
+    def __init__(self, channel, sim, player=1, clock=time.monotonic):
+        self.channel = channel
+        self.sim = sim
+        self.player = player
+        self.clock = clock
+        self.inputs = {}  # seq -> input bits not applied yet
+        self.applied = 0  # newest input seq applied
+        self.held = NO_INPUT
+        self.restart = False
+        self.acked = 0  # newest snapshot tick the client has
+        self.tick = 0
+        self.history = {}  # tick -> snapshot body
+        self.last_heard = clock()
+        self.snapshots = self.full_snapshots = 0
+        self.snapshot_bytes = 0
+        self.inputs_received = self.inputs_skipped = self.inputs_starved = 0
+
+    @property
+    def closed(self):
+        return self.channel.closed or self.clock() - self.last_heard > TIMEOUT_S
+
+    def handle(self, msg):
+        self.last_heard = self.clock()
+        kind = msg[0]
+        if kind == INPUT and len(msg) == _INPUT.size:
+            _, seq, acked, *bits = _INPUT.unpack(msg)
+            if acked > self.acked:
+                self.acked = acked
+            for i, b in enumerate(bits):
+                if seq - i > self.applied and seq - i not in self.inputs:
+                    self.inputs[seq - i] = b
+                    self.inputs_received += 1
+        elif kind == HELLO:
+            self.welcome()  # our WELCOME got lost
+        elif kind == BYE:
+            self.channel.closed = True
+
+    def welcome(self):
+        self.channel.send(_WELCOME.pack(WELCOME, self.player, FPS))
+
+    def next_inputs(self):
+        """Inputs for this session's ship on the coming tick."""
+        queue = self.inputs
+        if not queue:
+            self.inputs_starved += self.applied > 0
+            return self.held
+        while len(queue) > MAX_INPUT_QUEUE:
+            # the client got ahead (a burst after a stall): catch up
+            del queue[min(queue)]
+            self.inputs_skipped += 1
+        seq = min(queue)
+        inputs, restart = unpack_inputs(queue.pop(seq))
+        self.applied = seq
+        self.restart |= restart
+        self.held = inputs._replace(fire_pressed=False)
+        return inputs
+
+    def take_restart(self):
+        restart, self.restart = self.restart, False
+        return restart
+
+    def send_snapshot(self):
+        self.tick += 1
+        body = encode_snapshot(self.sim)
+        baseline = self.history.get(self.acked)
+        if baseline is not None:
+            payload = zlib.compress(xor_bytes(body, baseline), 1)
+        else:
+            payload = zlib.compress(body, 1)
+            self.full_snapshots += 1
+        msg = _SNAPSHOT.pack(SNAPSHOT, self.tick, self.acked if baseline is not None else 0,
+                             self.applied) + payload
+        self.history[self.tick] = body
+        self.history.pop(self.tick - HISTORY, None)
+        self.channel.send(msg)
+        self.snapshots += 1
+        self.snapshot_bytes += len(msg)
+
+    def close(self):
+        if not self.channel.closed:
+            self.channel.send(bytes([BYE]))
+        self.channel.close()
+
+    def stats(self):
+        return {
+            'snapshots': self.snapshots,
+            'full': self.full_snapshots,
+            'snapshot_bytes': round(self.snapshot_bytes / max(1, self.snapshots), 1),
+            'bytes_out': self.channel.bytes_out,
+            'bytes_in': self.channel.bytes_in,
+            'inputs': self.inputs_received,
+            'skipped': self.inputs_skipped,
+            'starved': self.inputs_starved,
+        }
+
+
+class Host:
+    """Accepts clients and sends them snapshots.
+
+    With ``sim`` (the windowed game's two-player simulation) the first client
+    flies player 2 of it and the game loop steps it with partner_inputs().
+    Without one the host is dedicated: every client gets its own game from
+    ``sim_factory`` with a bot flying player 1, and tick() steps them all.
+    """
+
+    def __init__(self, port=DEFAULT_PORT, transport='udp', bind='127.0.0.1', sim=None, sim_factory=None,
+                 clock=time.monotonic):
+        if transport not in TRANSPORTS:
+            raise ValueError(f"unknown transport {transport!r}, expected one of {TRANSPORTS}")
+        self.transport = transport
+        self.shared = sim
+        self.sim_factory = sim_factory
+        self.clock = clock
+        self.sessions = {}  # address (udp) or socket (tcp) -> Session
+        self.finished_sessions = []  # stats of sessions that ended
+        kind = socket.SOCK_DGRAM if transport == 'udp' else socket.SOCK_STREAM
+        self.sock = socket.socket(socket.AF_INET, kind)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((bind, port))
+        if transport == 'tcp':
+            self.sock.listen()
+        self.sock.setblocking(False)
+        self.port = self.sock.getsockname()[1]
+        self.ticks = self.late_ticks = 0
+        self.busy = 0.0  # seconds spent in tick()
+
+    def poll(self):
+        """Take in new clients and their messages; drop the ones gone quiet."""
+        if self.transport == 'udp':
+            while True:
+                try:
+                    msg, address = self.sock.recvfrom(65536)
+                except (BlockingIOError, ConnectionResetError):
+                    break
+                session = self.sessions.get(address)
+                if session is None:
+                    session = self._open(msg, UdpChannel(self.sock, address), address)
+                if session is not None:
+                    session.channel.deliver(msg)
+                    for m in session.channel.receive():
+                        session.handle(m)
+        else:
+            while True:
+                try:
+                    conn, _ = self.sock.accept()
+                except BlockingIOError:
+                    break
+                channel = TcpChannel(conn)
+                self.sessions[conn] = Session(channel, None, clock=self.clock)  # sim once it says HELLO
+            for key, session in list(self.sessions.items()):
+                for msg in session.channel.receive():
+                    if session.sim is None:
+                        del self.sessions[key]
+                        if self._open(msg, session.channel, key) is None:
+                            session.channel.close()
+                            break
+                        session = self.sessions[key]
+                    session.handle(msg)
+        for key, session in list(self.sessions.items()):
+            if session.closed:
+                self._drop(key)
+
+    def _open(self, msg, channel, key):
+        """A session for a HELLO from a new client, or None (refused)."""
+        if len(msg) != _HELLO.size or msg[0] != HELLO:
+            return None
+        if msg[1] != NET_VERSION or (self.shared is not None and self.sessions):
+            channel.send(bytes([BYE]))  # wrong version, or the shared game is full
+            if self.transport == 'tcp':
+                channel.close()
+            return None
+        sim = self.shared if self.shared is not None else self.sim_factory()
+        session = self.sessions[key] = Session(channel, sim, clock=self.clock)
+        return session
+
+    def _drop(self, key):
+        session = self.sessions.pop(key)
+        if session.sim is not None:
+            self.finished_sessions.append(session.stats())
+        session.close()
+
+    def session_count(self):
+        return sum(1 for s in self.sessions.values() if s.sim is not None)
+
+    def partner_inputs(self):
+        """(partner Inputs tuple, restart requested) for stepping the shared sim."""
+        for session in self.sessions.values():
+            if session.sim is not None:
+                return (session.next_inputs(),), session.take_restart()
+        return (), False
+
+    def send_snapshots(self):
+        for session in self.sessions.values():
+            if session.sim is not None:
+                session.send_snapshot()
+        if self.transport == 'tcp':
+            for session in self.sessions.values():
+                session.channel.flush()
+
+    def tick(self, policy=autopilot, dt=FRAME_MS):
+        """Dedicated host: one step of every session's game, then snapshots."""
+        start = time.perf_counter()
+        self.poll()
+        for session in self.sessions.values():
+            sim = session.sim
+            if sim is None:
+                continue
+            partner = session.next_inputs()
+            if session.take_restart() and sim.finished:
+                sim.reset()
+            sim.step(dt, policy(sim), (partner,))
+            session.send_snapshot()
+        self.ticks += 1
+        self.busy += time.perf_counter() - start
+
+    def serve(self, seconds=None, policy=autopilot, until_empty=False):
+        """Run tick() at FPS until ``seconds`` pass (or, with ``until_empty``,
+        until every client that joined has left)."""
+        period = FRAME_MS / 1000
+        start = next_tick = time.perf_counter()
+        had_clients = False
+        while seconds is None or time.perf_counter() - start < seconds:
+            wait = next_tick - time.perf_counter()
+            if wait > 0:
+                select.select(self._sockets(), [], [], wait)
+                self.poll()
+                continue
+            self.tick(policy)
+            next_tick += period
+            if time.perf_counter() > next_tick:
+                self.late_ticks += 1
+                if time.perf_counter() - next_tick > 0.25:
+                    next_tick = time.perf_counter()  # too far behind to catch up
+            had_clients |= bool(self.sessions)
+            if until_empty and had_clients and not self.sessions:
+                break
+
+    def _sockets(self):
+        if self.transport == 'udp':
+            return [self.sock]
+        return [self.sock] + list(self.sessions)
+
+    def stats(self):
+        sessions = [s.stats() for s in self.sessions.values() if s.sim is not None] + self.finished_sessions
+        snapshots = sum(s['snapshots'] for s in sessions)
+        return {
+            'sessions': len(sessions),
+            'ticks': self.ticks,
+            'late_ticks': self.late_ticks,
+            'tick_ms': round(self.busy * 1000 / max(1, self.ticks), 3),
+            'snapshots': snapshots,
+            'full_snapshots': sum(s['full'] for s in sessions),
+            'snapshot_bytes': round(sum(s['snapshot_bytes'] * s['snapshots'] for s in sessions)
+                                    / max(1, snapshots), 1),
+            'bytes_out': sum(s['bytes_out'] for s in sessions),
+            'bytes_in': sum(s['bytes_in'] for s in sessions),
+            'inputs_skipped': sum(s['skipped'] for s in sessions),
+            'inputs_starved': sum(s['starved'] for s in sessions),
+        }
+
+    def close(self):
+        for key in list(self.sessions):
+            self._drop(key)
+        self.sock.close()
+
+
+# -------- CLIENT ----------
+class Client:
+    """A connection to a Host that stands in for the GameSimulation: the
+    renderer and the game loop use it like one (step, layer_view, players...).
+    """
+    interpolation = False  # snapshots are drawn as they arrive
+
+    def __init__(self, address, transport='udp', timeout=TIMEOUT_S, clock=time.monotonic):
+        if transport not in TRANSPORTS:
+            raise ValueError(f"unknown transport {transport!r}, expected one of {TRANSPORTS}")
+        self.clock = clock
+        self.address = address if isinstance(address, tuple) else parse_address(address)
+        if transport == 'udp':
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.connect(self.address)  # so an absent host shows up as a refused send
+            sock.setblocking(False)
+            self.channel = UdpChannel(sock, sock.getpeername(), owns_socket=True)
+        else:
+            sock = socket.create_connection(self.address, timeout=timeout)
+            self.channel = TcpChannel(sock)
+        self.index = self._handshake(timeout)
+
+        # the sim-like face the renderer reads
+        self.frame = 0
+        self.now = 0
+        self.level = 1
+        self.lives = MAX_LIVES
+        self.enemies_destroyed = 0
+        self.enemies_required = 0
+        self.game_over = self.game_win = False
+        self.level_transition = False
+        self.level_transition_start = 0
+        self.bg_y = 0
+        self.events = []
+        self.effects = []
+        self.players = [Player(self) for _ in range(2)]
+        self.player = self.players[self.index]  # the local ship
+        self.view = None  # the newest SnapshotView
+
+        self.seq = 0
+        self.sent_bits = deque([0] * INPUT_REDUNDANCY, maxlen=INPUT_REDUNDANCY)
+        self.pending = deque()  # (seq, Inputs) the host hasn't applied yet
+        self.sent_at = {}  # seq -> clock() when sent, for the round trip
+        self.restart = False
+        self.tick = 0  # newest snapshot tick
+        self.history = {}  # tick -> body, delta baselines
+        self.last_heard = clock()
+        self.lost = False  # the host went away
+        self.started = clock()
+        self.rtt_ms = []
+        self.snapshots = self.missed = self.corrections = 0
+        self.correction_px = 0.0
+
+    def _handshake(self, timeout):
+        deadline = self.clock() + timeout
+        hello = _HELLO.pack(HELLO, NET_VERSION)
+        while self.clock() < deadline:
+            self.channel.send(hello)
+            ready = select.select([self.channel.sock], [], [], HELLO_EVERY_S)[0]
+            for msg in (self.channel.receive() if ready else ()):
+                if msg[0] == WELCOME and len(msg) == _WELCOME.size:
+                    return _WELCOME.unpack(msg)[1]
+                if msg[0] == BYE:
+                    raise ConnectionError("host refused the connection (full or another version)")
+            if self.channel.closed:
+                break
+        raise ConnectionError(f"no answer from {self.address[0]}:{self.address[1]}")
+
+    @property
+    def finished(self):
+        return self.game_over or self.game_win
+
+    @property
+    def powers(self):
+        return self.player.powers
+
+    def reset(self):
+        """Ask the host for a new game (it only restarts a finished one)."""
+        self.restart = True
+
+    def step(self, dt=FRAME_MS, inputs=NO_INPUT):
+        """Send this frame's inputs, move the local ship, take in snapshots;
+        returns the events of the snapshots that arrived."""
+        self.seq += 1
+        bits = pack_inputs(inputs, self.restart)
+        self.restart = False
+        self.sent_bits.appendleft(bits)
+        self.channel.send(_INPUT.pack(INPUT, self.seq, self.tick, *self.sent_bits))
+        self.sent_at[self.seq] = self.clock()
+        if not self.finished:
+            self.pending.append((self.seq, inputs))
+            move_ship(self.player.rect, inputs)
+            self.player.show_flame = bool(inputs.up)
+
+        self.events = []
+        self.effects = []
+        for msg in self.channel.receive():
+            self.handle(msg)
+        if self.channel.closed or self.clock() - self.last_heard > TIMEOUT_S:
+            self.lost = True
+        return self.events
+
+    def handle(self, msg):
+        self.last_heard = self.clock()
+        if msg[0] == BYE:
+            self.lost = True
+            return
+        if msg[0] != SNAPSHOT or len(msg) < _SNAPSHOT.size:
+            return
+        _, tick, baseline, applied = _SNAPSHOT.unpack_from(msg)
+        if tick <= self.tick:
+            return  # reordered behind a newer one
+        body = zlib.decompress(msg[_SNAPSHOT.size:])
+        if baseline:
+            key = self.history.get(baseline)
+            if key is None:
+                return  # baseline already dropped; the next one will be full
+            body = xor_bytes(body, key)
+        self.missed += tick - self.tick - 1 if self.tick else 0
+        self.tick = tick
+        self.history[tick] = body
+        for old in [t for t in self.history if t <= tick - HISTORY]:
+            del self.history[old]
+        self.snapshots += 1
+        self.apply(SnapshotView(body, len(self.players)), applied)
+
+    def apply(self, view, applied):
+        first = self.view is None
+        self.view = view
+        for name in ('frame', 'now', 'level', 'lives', 'enemies_destroyed', 'enemies_required',
+                     'game_over', 'game_win', 'level_transition', 'level_transition_start', 'bg_y'):
+            setattr(self, name, getattr(view, name))
+        self.events += view.events
+        self.effects += view.effects
+        now = view.now
+        for player, (x, y, flags, left) in zip(self.players, view.ships):
+            if player is not self.player:
+                player.rect.topleft = (x, y)
+                player.show_flame = bool(flags & _FLAME)
+            player.powers = {name: now + ms for name, ms in left.items()}
+            if flags & _INVULNERABLE:
+                player.image = surface_cache.player_image(INVULNERABLE_ALPHA if (now // 100) % 2 == 0 else 255)
+            else:
+                player.image = surface_cache.player_image()
+
+        # the round trip: from sending an input to seeing the host apply it
+        if applied in self.sent_at:
+            self.rtt_ms.append((self.clock() - self.sent_at[applied]) * 1000)
+        for seq in [s for s in self.sent_at if s <= applied]:
+            del self.sent_at[seq]
+
+        # reconcile: restart from the host's ship and replay what it hasn't seen
+        pending = self.pending
+        while pending and pending[0][0] <= applied:
+            pending.popleft()
+        x, y = view.ships[self.index][:2]
+        rect = self.player.rect
+        predicted = rect.topleft
+        rect.topleft = (x, y)
+        if not self.finished:
+            for _, inputs in pending:
+                move_ship(rect, inputs)
+        else:
+            pending.clear()
+        error = abs(rect.x - predicted[0]) + abs(rect.y - predicted[1])
+        if error and not first:  # the first snapshot only places the ship
+            self.corrections += 1
+            self.correction_px += error
+
+    def scroll_at(self, alpha=1.0):
+        return self.bg_y
+
+    def layer_view(self, layer, alpha=1.0):
+        """(image, (x, y)) pairs from the newest snapshot."""
+        view = self.view
+        if view is None:
+            return []
+        if layer == 'enemies':
+            image = resources.enemy_img
+            return [(image, pos) for pos in zip(*view.enemies)]
+        if layer == 'bullets':
+            image = surface_cache.bullet_image()
+            return [(image, pos) for pos in zip(*view.bullets)]
+        if layer == 'shots':
+            image = surface_cache.shot_image()
+            return [(image, pos) for pos in zip(*view.shots)]
+        if layer == 'boss':
+            return [(surface_cache.boss_image(), view.boss[:2])] if view.boss is not None else []
+        xs, ys, types = view.items
+        return [(surface_cache.item_image(ITEM_TYPES[t]), (x, y)) for x, y, t in zip(xs, ys, types)]
+
+    layer_blits = GameSimulation.layer_blits
+
+    def boss_hp(self):
+        view = self.view
+        return view.boss[2:] if view is not None and view.boss is not None else None
+
+    def stats(self):
+        seconds = max(1e-9, self.clock() - self.started)
+        rtt = sorted(self.rtt_ms)
+        return {
+            'rtt_ms': round(statistics.fmean(rtt), 2) if rtt else None,
+            'rtt_p95_ms': round(percentile(rtt, 95), 2) if rtt else None,
+            'down_kbps': round(self.channel.bytes_in * 8 / 1000 / seconds, 1),
+            'up_kbps': round(self.channel.bytes_out * 8 / 1000 / seconds, 1),
+            'snapshot_bytes': round(self.channel.bytes_in / max(1, self.snapshots), 1),
+            'snapshots': self.snapshots,
+            'missed': self.missed,
+            'corrections': self.corrections,
+            'correction_px': round(self.correction_px / max(1, self.corrections), 1),
+        }
+
+    def close(self):
+        if not self.channel.closed:
+            self.channel.send(bytes([BYE]))
+            if isinstance(self.channel, TcpChannel):
+                self.channel.flush()
+        self.channel.close()
+
+
+def bot_inputs(client):
+    """The benchmark's and `join`'s stand-in player: autopilot on the client's view."""
+    target = max(zip(*client.view.enemies), key=lambda p: p[1], default=None) if client.view else None
+    px = client.player.rect.centerx
+    left = right = False
+    if target is not None:
+        cx = target[0] + resources.enemy_img.get_width() // 2
+        left = cx < px - 4
+        right = cx > px + 4
+    return NO_INPUT._replace(left=left, right=right, fire=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless co-op host or bot client.")
+    sub = parser.add_subparsers(dest="role", required=True)
+    host = sub.add_parser("host", help="dedicated host: a bot flies player 1 of every game")
+    host.add_argument("--port", type=int, default=DEFAULT_PORT)
+    host.add_argument("--bind", default='127.0.0.1')
+    host.add_argument("--engine", choices=('sprites', 'numpy'), default='sprites')
+    host.add_argument("--seed", type=int, default=0)
+    join = sub.add_parser("join", help="bot client: fly player 2 against a host, print the link stats")
+    join.add_argument("address", help="HOST:PORT")
+    for p in (host, join):
+        p.add_argument("--transport", choices=TRANSPORTS, default='udp')
+        p.add_argument("--seconds", type=float, help="stop after this long")
+    args = parser.parse_args(argv)
+
+    init_headless()
+    if args.role == "host":
+        games = itertools.count(args.seed)
+        server = Host(args.port, args.transport, bind=args.bind,
+                      sim_factory=lambda: make_simulation(args.engine, seed=next(games), players=2))
+        print(f"hosting on {args.bind}:{server.port} ({args.transport})")
+        try:
+            server.serve(args.seconds)
+        except KeyboardInterrupt:
+            pass
+        print("host:", server.stats())
+        server.close()
+        return
+    client = Client(args.address, args.transport)
+    print(f"joined as player {client.index + 1}")
+    period = FRAME_MS / 1000
+    start = next_tick = time.perf_counter()
+    try:
+        while not client.lost and (args.seconds is None or time.perf_counter() - start < args.seconds):
+            time.sleep(max(0.0, next_tick - time.perf_counter()))
+            next_tick += period
+            if client.finished:
+                client.reset()
+            client.step(FRAME_MS, bot_inputs(client))
+    except KeyboardInterrupt:
+        pass
+    print("netplay:", client.stats())
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Frame pacing: a fixed simulation tick under a precise frame limiter.
+
+The simulation moves things a fixed number of pixels per step, so it has to
+step exactly FPS times a second whatever the display does. FramePacer
+decouples the two. Each frame it waits for the frame deadline (wait()), the
+caller reads its input right then - as late as possible - and runs as many
+fixed ticks as wall time owes (ticks()). A frame can run zero ticks on a fast
+display or several after a slow frame; past MAX_CATCHUP_TICKS the backlog is
+dropped instead of snowballing. The leftover fraction of a tick is ``alpha``:
+the renderer draws every position that far between the last two ticks
+(GameSimulation.interpolation), so motion is smooth at 120/144 Hz and
+nothing is shown ahead of the simulation.
+
+Interpolating costs up to a tick of latency: at alpha 0 the tick the input
+just drove isn't shown at all. When the display rate is the tick rate
+(``--max-fps 60``, the default) there is nothing to smooth, so the pacer
+runs in lockstep instead: every frame rounds the time owed to whole ticks
+(so jitter around the deadline neither skips nor doubles one) and draws the
+newest tick at alpha 1.
+
+The limiter sleeps until a little before the deadline, then spins on
+perf_counter for the rest: time.sleep (and SDL's clock.tick) can overshoot
+by a millisecond or more, a spin can't. The spin margin adapts to the sleep
+overshoot it measures. Deadlines advance by exactly one period, so the rate
+doesn't drift; a frame later than a whole period restarts the schedule.
+With ``max_fps=0`` there is no limiter (vsync, if on, paces the flip);
+``limit=False`` only measures a loop something else paces.
+
+stats() reports the frame rate, frame-time jitter (spread of the intervals
+between frame starts and how many ran late), input latency (input read to
+the end of the flip, plus the delay interpolation adds - also reported on
+its own), and the tick count.
+"""
+import statistics
+import time
+from collections import deque
+
+from profiling import percentile
+from settings import FRAME_MS
+
+# -------- CONFIG ----------
+MAX_CATCHUP_TICKS = 5  # ticks one frame may run after a stall; older time is dropped
+SPIN_MS = 1.0  # initial spin margin before a deadline
+MIN_SPIN_MS = 0.2
+SPIN_DECAY = 0.99  # per frame, so one bad sleep doesn't spin forever
+SPIN_HEADROOM = 1.5  # spin margin = this times the worst recent sleep overshoot
+LATE_FRAME = 1.5  # an interval this many periods long counts as a late frame
+HISTORY = 600  # frames the jitter and latency figures cover
+LOCKSTEP_TOLERANCE = 0.002  # a frame period this close to the tick (as a share of it) runs in lockstep
+
+
+class FramePacer:
+    def __init__(self, max_fps=60, tick_ms=FRAME_MS, clock=time.perf_counter, sleep=time.sleep, limit=True):
+        self.period = 1.0 / max_fps if max_fps else 0.0
+        self.limit = limit and bool(max_fps)
+        self.tick_s = tick_ms / 1000
+        # one tick per frame, drawn as is: nothing to interpolate
+        self.lockstep = bool(max_fps) and abs(self.period - self.tick_s) <= self.tick_s * LOCKSTEP_TOLERANCE
+        self.clock = clock
+        self.sleep = sleep
+        self.spin = SPIN_MS / 1000
+        self.deadline = None  # when the next frame may start
+        self.frame_start = None
+        self.last_tick = None  # wall time the tick accumulator is counted up to
+        self.pending = 0.0  # wall seconds not yet run as ticks
+        self.alpha = 1.0
+        self.frames = self.late_frames = self.ticks_run = self.ticks_dropped = 0
+        self.spun = self.slept = 0.0
+        self.started = clock()
+        self.intervals = deque(maxlen=HISTORY)  # seconds between frame starts
+        self.latency = deque(maxlen=HISTORY)  # seconds from input read to presented
+        self.interp_delay = deque(maxlen=HISTORY)  # seconds drawn behind the newest tick
+
+    @property
+    def period_ms(self):
+        return self.period * 1000 if self.period else FRAME_MS
+
+    def wait(self):
+        """Sleep, then spin, until the frame deadline; read input right after."""
+        clock = self.clock
+        now = clock()
+        if self.limit:
+            deadline = self.deadline
+            if deadline is None or now - deadline > self.period:
+                deadline = now  # first frame, or too late to catch up: restart
+            else:
+                wake = deadline - self.spin
+                if wake > now:
+                    self.sleep(wake - now)
+                    woke = clock()
+                    self.slept += woke - now
+                    self.spin = max(self.spin * SPIN_DECAY, (woke - wake) * SPIN_HEADROOM, MIN_SPIN_MS / 1000)
+                    now = woke
+                spin_from = now
+                while now < deadline:
+                    now = clock()
+                self.spun += now - spin_from
+            self.deadline = deadline + self.period
+        if self.frame_start is not None:
+            interval = now - self.frame_start
+            self.intervals.append(interval)
+            if self.period and interval > self.period * LATE_FRAME:
+                self.late_frames += 1
+        self.frame_start = now
+        self.frames += 1
+        return now
+
+    def resync(self):
+        """Start the tick count from this frame (a new game, after the menu)."""
+        self.last_tick = None
+
+    def ticks(self):
+        """How many fixed ticks this frame owes; sets ``alpha`` for drawing."""
+        now = self.frame_start if self.frame_start is not None else self.clock()
+        if self.last_tick is None:
+            # the first frame of a game runs one tick; time owed starts from here
+            self.last_tick = now
+            self.pending = 0.0
+            self.alpha = 1.0 if self.lockstep else 0.0
+            self.ticks_run += 1
+            return 1
+        self.pending += now - self.last_tick
+        self.last_tick = now
+        if self.lockstep:
+            count = max(0, round(self.pending / self.tick_s))  # pending may go half a tick negative
+        else:
+            count = int(self.pending / self.tick_s)
+        if count > MAX_CATCHUP_TICKS:
+            self.ticks_dropped += count - MAX_CATCHUP_TICKS
+            count = MAX_CATCHUP_TICKS
+            self.pending = self.tick_s * count
+        self.pending -= count * self.tick_s
+        self.alpha = 1.0 if self.lockstep else self.pending / self.tick_s
+        self.ticks_run += count
+        return count
+
+    def presented(self):
+        """The frame is on screen (the flip returned)."""
+        delay = (1.0 - self.alpha) * self.tick_s  # what's shown trails the newest tick by this
+        self.interp_delay.append(delay)
+        self.latency.append(self.clock() - self.frame_start + delay)
+
+    def stats(self):
+        intervals = sorted(self.intervals)
+        latency = sorted(self.latency)
+        seconds = max(1e-9, self.clock() - self.started)
+        ms = 1000
+        stats = {'fps': round(self.frames / seconds, 1), 'frames': self.frames,
+                 'ticks': self.ticks_run, 'dropped_ticks': self.ticks_dropped,
+                 'late_frames': self.late_frames}
+        if len(intervals) > 1:
+            target = self.period or statistics.fmean(intervals)
+            stats.update({
+                'frame_ms': round(statistics.fmean(intervals) * ms, 3),
+                'jitter_ms': round(statistics.pstdev(intervals) * ms, 3),
+                'jitter_p99_ms': round(percentile(sorted(abs(i - target) for i in intervals), 99) * ms, 3),
+            })
+        if latency:
+            stats.update({
+                'input_ms': round(statistics.fmean(latency) * ms, 2),
+                'input_p99_ms': round(percentile(latency, 99) * ms, 2),
+                'interp_delay_ms': round(statistics.fmean(self.interp_delay) * ms, 2),
+            })
+        stats['spin_ms'] = round(self.spun * ms, 1)
+        stats['sleep_ms'] = round(self.slept * ms, 1)
+        return stats
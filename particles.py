@@ -0,0 +1,265 @@
+"""Particle effects: explosions, engine flame trails and pickup bursts.
+
+An explosion used to be one static 50x50 sprite shown for a few frames. Now
+the simulation only reports where something happened (``sim.effects``) and
+the renderer's ParticleSystem turns it into a burst of particles. Particles
+are purely visual: they never touch the simulation or its RNG, so replays
+and headless runs are unaffected.
+
+Particle state lives in preallocated NumPy arrays used as one ring buffer
+(position, velocity, age, lifetime, color ramp). Emitting writes at the ring
+head, so once the global budget is full the oldest particles are overwritten
+first. update() moves every particle with a handful of array operations and
+draw() hands all visible particles to one ``Surface.blits`` call, each
+picking a pre-built texture for its ramp and age. Textures are plain RGB
+blitted with BLEND_ADD (glow, and about twice as fast as per-pixel alpha);
+fading out is darkening toward black. Dirty rects come back as one rect per
+occupied screen tile rather than one per particle.
+
+``density`` scales how many particles every effect emits (1.0 = as
+specified); the budget caps the total however busy the screen gets.
+
+Cost: drawing is about 1 us a particle on top of ~0.1 ms of array work a
+frame, so the effect counts (16 particles an explosion, 10 a pickup) and
+PARTICLE_BUDGET (512) are sized to keep the particle pass a small, fixed
+share of the 16.7 ms frame. bench_particles at density 1.0: ~0.16 ms (1%)
+at 4 explosions/s, ~0.4 ms (2.5%) at 30/s, and past that the budget holds
+it at ~0.7 ms (4.5%, p99 ~1.1 ms) however many explosions a frame brings.
+The old explosion sprite cost 0.005-0.075 ms on the same streams.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pygame
+
+import resources
+from settings import WIDTH, HEIGHT, PARTICLE_BUDGET
+from surface_cache import DEFAULT_ITEM_TINT, ITEM_TINTS
+
+# ramp: how a particle looks over its life. ``colors`` (RGBA, alpha scales the
+# brightness) is interpolated from birth to death, ``radius`` likewise;
+# ``shape`` is 'dot' (soft disc) or
+# 'explosion' (the explosion artwork); drag is the fraction of velocity kept
+# per second, gravity px/s^2 downward.
+Ramp = namedtuple('Ramp', 'colors radius shape drag gravity')
+RAMPS = {
+    'fire': Ramp(((255, 255, 220, 255), (255, 170, 40, 230), (200, 50, 10, 0)), (7, 2), 'explosion', 0.05, 0),
+    'spark': Ramp(((255, 240, 200, 255), (255, 120, 20, 0)), (2, 1), 'dot', 0.3, 180),
+    'flame': Ramp(((180, 220, 255, 220), (255, 140, 30, 160), (120, 30, 10, 0)), (5, 2), 'dot', 0.02, 0),
+    'pickup:health': Ramp((ITEM_TINTS['health'] + (255,), (255, 255, 255, 0)), (4, 1), 'dot', 0.2, 0),
+    'pickup:fast_fire': Ramp((ITEM_TINTS['fast_fire'] + (255,), (255, 255, 255, 0)), (4, 1), 'dot', 0.2, 0),
+    'pickup:multi_shot': Ramp((DEFAULT_ITEM_TINT + (255,), (255, 255, 255, 0)), (4, 1), 'dot', 0.2, 0),
+}
+RAMP_NAMES = tuple(RAMPS)
+RAMP_STEPS = 8  # textures per ramp, one per slice of a particle's life
+
+# effect: one burst. speed px/s and life ms are (min, max); angle/spread in
+# degrees (0 = right, 90 = down), spread is the full cone width.
+Effect = namedtuple('Effect', 'ramp count speed life angle spread')
+# (effect name, variant) as the simulation reports it -> list of bursts
+EFFECTS = {
+    ('explosion', None): (Effect('fire', 10, (30, 160), (250, 550), 0, 360),
+                          Effect('spark', 6, (120, 320), (300, 650), 0, 360)),
+    ('pickup', 'health'): (Effect('pickup:health', 10, (60, 180), (250, 450), 0, 360),),
+    ('pickup', 'fast_fire'): (Effect('pickup:fast_fire', 10, (60, 180), (250, 450), 0, 360),),
+    ('pickup', 'multi_shot'): (Effect('pickup:multi_shot', 10, (60, 180), (250, 450), 0, 360),),
+}
+# engine trail; emitted per frame at a rate (particles/s) rather than a count
+FLAME = Effect('flame', 0, (140, 240), (120, 260), 90, 30)
+TILE = 64  # dirty-rect granularity
+TILE_COLS = WIDTH // TILE + 2  # plus a column each side for particles straddling the edge
+TILE_ROWS = HEIGHT // TILE + 2
+
+
+def _dot(radius):
+    size = radius * 2 + 1
+    surf = pygame.Surface((size, size), pygame.SRCALPHA, 32)
+    # soft edge: brighter rings on top of dimmer, wider ones
+    for r in range(radius, 0, -1):
+        alpha = int(255 * (1 - (r - 1) / radius) ** 1.5)
+        pygame.draw.circle(surf, (255, 255, 255, alpha), (radius, radius), r)
+    if radius == 0:
+        surf.fill((255, 255, 255, 255))
+    return surf
+
+
+def _lerp_color(colors, t):
+    t *= len(colors) - 1
+    i = min(int(t), len(colors) - 2)
+    f = t - i
+    return tuple(int(a + (b - a) * f) for a, b in zip(colors[i], colors[i + 1]))
+
+
+def build_textures():
+    """[texture] indexed ramp * RAMP_STEPS + step, plus their (w/2, h/2) offsets."""
+    textures, halves = [], []
+    for name in RAMP_NAMES:
+        ramp = RAMPS[name]
+        r0, r1 = ramp.radius
+        for step in range(RAMP_STEPS):
+            t = step / (RAMP_STEPS - 1)
+            radius = max(0, round(r0 + (r1 - r0) * t))
+            if ramp.shape == 'explosion':
+                size = radius * 2 + 1
+                shape = pygame.transform.smoothscale(resources.explosion_img.convert_alpha(), (size, size))
+            else:
+                shape = _dot(radius)
+            # flatten onto black: additive blending treats black as transparent
+            tex = pygame.Surface(shape.get_size())
+            tex.blit(shape, (0, 0))
+            r, g, b, a = _lerp_color(ramp.colors, t)
+            tex.fill((r * a // 255, g * a // 255, b * a // 255), special_flags=pygame.BLEND_RGB_MULT)
+            if pygame.display.get_surface() is not None:
+                tex = tex.convert()
+            textures.append(tex)
+            halves.append((tex.get_width() // 2, tex.get_height() // 2))
+    return textures, np.array(halves, dtype=np.intp)
+
+
+class ParticleSystem:
+    def __init__(self, budget=PARTICLE_BUDGET, density=1.0, seed=None):
+        self.budget = budget
+        self.density = density
+        self.rng = np.random.default_rng(seed)
+        self.pos = np.zeros((budget, 2), np.float32)
+        self.vel = np.zeros((budget, 2), np.float32)
+        self.age = np.zeros(budget, np.float32)  # ms
+        self.life = np.zeros(budget, np.float32)  # ms; age >= life is a free slot
+        self.color = np.zeros(budget, np.uint8)  # index into RAMP_NAMES
+        self.head = 0  # next slot to write; the oldest particle once the ring is full
+        self.live = 0
+        self.flame_carry = 0.0  # fractional flame particles owed from earlier frames
+        self.textures = None  # built on first draw (needs the display)
+        self.halves = None  # (w/2, h/2) per texture
+        self.margin = 0  # widest texture, for the dirty tiles
+        self.tiles = None  # shared dirty rect per screen tile; callers must not modify them
+        self.ramp_index = {name: i for i, name in enumerate(RAMP_NAMES)}
+        self.drag = np.array([RAMPS[n].drag for n in RAMP_NAMES], np.float32)
+        self.gravity = np.array([RAMPS[n].gravity for n in RAMP_NAMES], np.float32)
+        self.emitted = 0
+        self.evicted = 0  # live particles overwritten to make room
+
+    def __len__(self):
+        return self.live
+
+    def clear(self):
+        self.age[:] = 0
+        self.life[:] = 0
+        self.live = 0
+        self.flame_carry = 0.0
+
+    # -------- EMITTING ----------
+    def emit(self, effect, x, y):
+        """One burst of ``effect`` at (x, y), scaled by density."""
+        n = int(round(effect.count * self.density))
+        if n > 0:
+            self._spawn(effect, x, y, min(n, self.budget))
+
+    def _spawn(self, effect, x, y, n):
+        head = self.head
+        if head + n <= self.budget:
+            slots = slice(head, head + n)  # a view: cheaper than index arrays
+        else:
+            slots = (head + np.arange(n)) % self.budget
+        self.head = (head + n) % self.budget
+        self.evicted += int(np.count_nonzero(self.age[slots] < self.life[slots]))
+
+        spread, speed, life = self.rng.random((3, n), np.float32)
+        angle = np.radians(effect.angle + (spread - 0.5) * effect.spread)
+        lo, hi = effect.speed
+        speed = lo + (hi - lo) * speed
+        self.pos[slots, 0] = x
+        self.pos[slots, 1] = y
+        self.vel[slots, 0] = np.cos(angle) * speed
+        self.vel[slots, 1] = np.sin(angle) * speed
+        self.age[slots] = 0
+        lo, hi = effect.life
+        self.life[slots] = lo + (hi - lo) * life
+        self.color[slots] = self.ramp_index[effect.ramp]
+        self.emitted += n
+        self.live = min(self.budget, self.live + n)
+
+    def emit_effects(self, effects):
+        """Bursts for a step's ``sim.effects`` list of (name, x, y, variant)."""
+        for name, x, y, variant in effects:
+            for effect in EFFECTS.get((name, variant), ()):
+                self.emit(effect, x, y)
+
+    def flame(self, x, y, dt, rate):
+        """Engine trail from (x, y): ``rate`` particles/s over a frame of ``dt`` ms."""
+        self.flame_carry += rate * self.density * dt / 1000
+        n = int(self.flame_carry)
+        if n:
+            self.flame_carry -= n
+            self._spawn(FLAME, x, y, min(n, self.budget))
+
+    # -------- UPDATE / DRAW ----------
+    def update(self, dt):
+        """Age and move every particle by ``dt`` ms."""
+        if not self.live:
+            return
+        self.age += dt
+        rows = np.flatnonzero(self.age < self.life)
+        self.live = rows.size
+        if not self.live:
+            return
+        # gather the live rows, move them, scatter back: the ring is mostly empty
+        seconds = dt / 1000
+        color = self.color[rows]
+        vel = self.vel[rows]
+        vel *= (self.drag ** seconds)[color][:, None]
+        vel[:, 1] += self.gravity[color] * seconds
+        self.vel[rows] = vel
+        self.pos[rows] += vel * seconds
+
+    def draw(self, surface, scale=1.0):
+        """Blit every visible particle in one batch; returns dirty rects (one per tile).
+
+        ``scale`` < 1 draws onto a reduced-resolution canvas (positions scale,
+        textures don't); no dirty rects are returned then.
+        """
+        if not self.live:
+            return []
+        if self.textures is None:
+            self.textures, self.halves = build_textures()
+            self.margin = max(t.get_width() for t in self.textures)
+            self.tiles = [
+                pygame.Rect((tx - 1) * TILE, (ty - 1) * TILE, TILE + self.margin, TILE + self.margin)
+                .clip(0, 0, WIDTH, HEIGHT)
+                for ty in range(TILE_ROWS) for tx in range(TILE_COLS)]
+        rows = np.flatnonzero(self.age < self.life)
+        step = np.minimum(self.age[rows] / self.life[rows] * RAMP_STEPS, RAMP_STEPS - 1).astype(np.intp)
+        tex = self.color[rows].astype(np.intp) * RAMP_STEPS + step
+        pos = self.pos[rows]
+        if scale != 1.0:
+            pos = pos * scale
+        topleft = pos.astype(np.intp) - self.halves[tex]
+        x, y = topleft[:, 0], topleft[:, 1]
+        margin = self.margin
+        width, height = surface.get_size()
+        visible = (x > -margin) & (x < width) & (y > -margin) & (y < height)
+        if not visible.all():
+            tex, topleft = tex[visible], topleft[visible]
+            if not tex.size:
+                return []
+        textures = self.textures
+        add = pygame.BLEND_ADD
+        surface.blits([(textures[t], pos, None, add) for t, pos in zip(tex.tolist(), topleft.tolist())],
+                      doreturn=False)
+        return self._tile_rects(topleft) if scale == 1.0 else []
+
+    def _tile_rects(self, topleft):
+        # topleft runs from -margin to the screen edge: shift by one tile
+        tiles = (topleft[:, 1] // TILE + 1) * TILE_COLS + topleft[:, 0] // TILE + 1
+        occupied = np.flatnonzero(np.bincount(tiles, minlength=len(self.tiles)))
+        tile_rects = self.tiles
+        return [tile_rects[t] for t in occupied.tolist()]
+
+    def stats(self):
+        return {
+            'live': self.live,
+            'budget': self.budget,
+            'emitted': self.emitted,
+            'evicted': self.evicted,
+            'density': self.density,
+        }
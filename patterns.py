@@ -0,0 +1,408 @@
+"""Enemy fire: declarative projectile patterns, emitted and moved as arrays.
+
+Patterns, which of them each level fires and the boss's script come from a
+JSON pattern file (assets/patterns.json by default):
+
+    {"version": 1,
+     "patterns": {
+        "fan5": {"shape": "aimed", "count": 5, "spread": 50, "speed": 3.0},
+        "ring": {"shape": "radial", "count": 24, "layers": 3, "speed": 2.0, "speed_step": 0.6},
+        "spiral": {"shape": "spiral", "count": 4, "speed": 2.6, "spin": 11,
+                   "volleys": 36, "interval": 70}},
+     "levels": [{"fire": []}, {"fire": [{"pattern": "fan5", "every": 2400}]}],
+     "boss": {"level": 5, "hp": 60, "pause": 900, "script": ["spiral", "ring", "fan5"]}}
+
+Shapes: ``radial`` spreads ``count`` shots evenly round the circle starting
+at ``angle`` (degrees, 0 = right, 90 = down); ``aimed`` fans them over
+``spread`` degrees centred on the nearest ship; ``spiral`` is radial with a
+default ``spin``. ``spin`` turns every volley that many degrees further,
+``layers`` repeats the volley ``speed_step`` px/tick faster each time, and a
+pattern fires ``volleys`` times, ``interval`` ms apart, from where it
+started (an emitter outlives the enemy that fired it). Speeds are px/tick.
+Each level's ``fire`` rules start a pattern from a random on-screen enemy in
+the top half every ``every`` ms; levels past the end reuse the last entry.
+On the boss's level, reaching the kill count brings the boss instead of
+ending the level: it cycles through ``script`` (``pause`` ms between
+patterns) until ``hp`` player bullets have hit it.
+
+A volley is one array operation: the pattern's direction offsets are built
+once at load, so firing a ring of 72 is a cos/sin over 72 angles and one
+append to ShotArrays - every live shot's x, y, vx, vy in a single float32
+block, moved each tick with one add and culled once off screen. Shots hit a
+ship through their own path: a vectorized box test against the ship's rect,
+then the mask test (surface_cache.mask) on the few shots inside it.
+
+Needs numpy; without it GameSimulation runs with no enemy fire.
+"""
+import json
+import math
+import os
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+import surface_cache
+from settings import WIDTH, HEIGHT, MAX_SHOTS
+from sprites import Boss
+
+PATTERN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "patterns.json")
+PATTERNS_VERSION = 1
+SHAPES = ('radial', 'spiral', 'aimed')
+SHOT_RADIUS = surface_cache.SHOT_SIZE // 2
+SHOT_MARGIN = 2 * SHOT_RADIUS  # shots this far off screen are gone
+
+Pattern = namedtuple('Pattern', 'name shape volleys interval spin angle offsets speeds duration')
+FireRule = namedtuple('FireRule', 'pattern every')
+BossSpec = namedtuple('BossSpec', 'level hp pause script')
+
+
+# -------- LOADING ----------
+class PatternFile:
+    def __init__(self, patterns, levels, boss=None, path="<data>"):
+        self.path = path
+        self.patterns = {name: self._check_pattern(name, spec) for name, spec in patterns.items()}
+        self.names = tuple(self.patterns)  # a pattern's index in snapshots
+        self.levels = [self._check_level(i, spec) for i, spec in enumerate(levels, 1)]
+        self.boss = self._check_boss(boss) if boss is not None else None
+
+    @classmethod
+    def load(cls, path=PATTERN_FILE):
+        with open(path) as f:
+            data = json.load(f)
+        return cls.from_dict(data, path)
+
+    @classmethod
+    def from_dict(cls, data, path="<data>"):
+        if data.get('version') != PATTERNS_VERSION:
+            raise ValueError(f"{path}: pattern file version {data.get('version')}, expected {PATTERNS_VERSION}")
+        return cls(data.get('patterns', {}), data.get('levels', []), data.get('boss'), path)
+
+    def level(self, level):
+        """The FireRules of ``level``."""
+        if not self.levels:
+            return []
+        return self.levels[min(level, len(self.levels)) - 1]
+
+    def _fail(self, where, message):
+        raise ValueError(f"{self.path}: {where}: {message}")
+
+    def _check_pattern(self, name, spec):
+        where = f"pattern {name!r}"
+        shape = spec.get('shape', 'radial')
+        if shape not in SHAPES:
+            self._fail(where, f"unknown shape {shape!r}; known: {', '.join(SHAPES)}")
+        count = int(spec.get('count', 1))
+        layers = int(spec.get('layers', 1))
+        volleys = int(spec.get('volleys', 1))
+        if count < 1 or layers < 1 or volleys < 1:
+            self._fail(where, "count, layers and volleys must be at least 1")
+        speed = float(spec.get('speed', 3.0))
+        step = float(spec.get('speed_step', 0.0))
+        if speed <= 0 or speed + step * (layers - 1) <= 0:
+            self._fail(where, "speed must be positive")
+        interval = float(spec.get('interval', 100))
+        if volleys > 1 and interval <= 0:
+            self._fail(where, "interval must be positive")
+        if shape == 'aimed':
+            spread = math.radians(float(spec.get('spread', 0)))
+            offsets = np.linspace(-spread / 2, spread / 2, count) if count > 1 else np.zeros(1)
+        else:
+            offsets = np.arange(count) * (2 * math.pi / count)
+        spin = float(spec.get('spin', 10 if shape == 'spiral' else 0))
+        return Pattern(
+            name=name, shape=shape, volleys=volleys, interval=interval,
+            spin=math.radians(spin), angle=math.radians(float(spec.get('angle', 90))),
+            offsets=np.tile(offsets, layers),
+            speeds=np.repeat(speed + step * np.arange(layers), count),
+            duration=(volleys - 1) * interval,
+        )
+
+    def _check_level(self, number, spec):
+        rules = []
+        for i, rule in enumerate(spec.get('fire', [])):
+            where = f"level {number} fire rule {i}"
+            every = float(rule.get('every', 0))
+            if every <= 0:
+                self._fail(where, "every must be positive")
+            rules.append(FireRule(self._pattern(where, rule.get('pattern')), every))
+        return rules
+
+    def _check_boss(self, spec):
+        hp = int(spec.get('hp', 1))
+        level = int(spec.get('level', 1))
+        if hp < 1 or level < 1:
+            self._fail("boss", "level and hp must be at least 1")
+        script = [self._pattern("boss", name) for name in spec.get('script', [])]
+        if not script:
+            self._fail("boss", "the script needs at least one pattern")
+        return BossSpec(level, hp, float(spec.get('pause', 1000)), script)
+
+    def _pattern(self, where, name):
+        if name not in self.patterns:
+            self._fail(where, f"unknown pattern {name!r}")
+        return self.patterns[name]
+
+
+_default = None
+
+
+def default_patterns():
+    """The shipped pattern file, parsed once per process."""
+    global _default
+    if _default is None:
+        _default = PatternFile.load()
+    return _default
+
+
+def volley(pattern, index, x, y, target=None):
+    """(vx, vy) arrays of volley ``index`` of ``pattern`` fired from (x, y)."""
+    if pattern.shape == 'aimed' and target is not None:
+        base = math.atan2(target[1] - y, target[0] - x)
+    else:
+        base = pattern.angle
+    angles = pattern.offsets + (base + pattern.spin * index)
+    return np.cos(angles) * pattern.speeds, np.sin(angles) * pattern.speeds
+
+
+# -------- SHOTS ----------
+class ShotArrays:
+    """Live enemy shots as rows x, y (centre), vx, vy of one float32 block, oldest first."""
+
+    def __init__(self, limit=MAX_SHOTS, capacity=1024):
+        self.limit = limit
+        self.data = np.zeros((4, capacity), np.float32)
+        self.n = 0
+        self.dropped = 0  # shots not fired because the limit was reached
+
+    def __len__(self):
+        return self.n
+
+    def clear(self):
+        self.n = 0
+
+    def _reserve(self, count):
+        capacity = self.data.shape[1]
+        if count > capacity:
+            grown = np.zeros((4, max(count, capacity * 2)), np.float32)
+            grown[:, :self.n] = self.data[:, :self.n]
+            self.data = grown
+
+    def emit(self, x, y, vx, vy):
+        """Append one volley: every shot starts at (x, y)."""
+        count = min(len(vx), self.limit - self.n)
+        self.dropped += len(vx) - count
+        if count <= 0:
+            return
+        n = self.n
+        self._reserve(n + count)
+        block = self.data[:, n:n + count]
+        block[0] = x
+        block[1] = y
+        block[2] = vx[:count]
+        block[3] = vy[:count]
+        self.n = n + count
+
+    def update(self):
+        """Move every shot one tick and drop those off screen."""
+        live = self.data[:, :self.n]
+        live[0:2] += live[2:4]
+        x, y = live[0], live[1]
+        inside = (x > -SHOT_MARGIN) & (x < WIDTH + SHOT_MARGIN) & (y > -SHOT_MARGIN) & (y < HEIGHT + SHOT_MARGIN)
+        if not inside.all():
+            self._keep(inside)
+
+    def _keep(self, mask):
+        kept = int(np.count_nonzero(mask))
+        self.data[:, :kept] = self.data[:, :self.n][:, mask]
+        self.n = kept
+
+    def topleft(self, alpha=1.0):
+        """(x, y) int32 arrays of where each shot's image goes; ``alpha`` < 1
+        backs each one up along its velocity to that point of the last tick."""
+        live = self.data[:, :self.n]
+        x, y = live[0], live[1]
+        if alpha < 1.0:
+            back = 1.0 - alpha
+            x = x - live[2] * back
+            y = y - live[3] * back
+        return (x - SHOT_RADIUS).astype(np.int32), (y - SHOT_RADIUS).astype(np.int32)
+
+    def hit(self, rect, mask):
+        """Remove the shots touching the opaque pixels ``mask`` covers at ``rect``; returns how many."""
+        if not self.n:
+            return 0
+        xs, ys = self.topleft()
+        size = surface_cache.SHOT_SIZE
+        near = (xs < rect.right) & (xs + size > rect.left) & (ys < rect.bottom) & (ys + size > rect.top)
+        if not near.any():
+            return 0
+        rows = np.flatnonzero(near)
+        shot = surface_cache.mask(surface_cache.shot_image())
+        overlap = mask.overlap
+        offsets = zip((xs[rows] - rect.x).tolist(), (ys[rows] - rect.y).tolist())
+        hits = [row for row, offset in zip(rows.tolist(), offsets) if overlap(shot, offset) is not None]
+        if hits:
+            keep = np.ones(self.n, bool)
+            keep[hits] = False
+            self._keep(keep)
+        return len(hits)
+
+    def tobytes(self):
+        return self.data[:, :self.n].tobytes()
+
+    def load(self, data, offset, count):
+        """Replace the shots with ``count`` read from tobytes() output at ``offset``."""
+        self._reserve(count)
+        self.data[:, :count] = np.frombuffer(data, np.float32, 4 * count, offset).reshape(4, count)
+        self.n = count
+        return offset + 16 * count
+
+
+# -------- FIRE CONTROL ----------
+_FIRE = struct.Struct("<IHHBHiiHdd")
+# shots, rules, emitters, boss flags, boss script index, boss x, y, hp, spawn time, next boss pattern
+_EMITTER = struct.Struct("<HddHd")  # pattern index, x, y, volleys fired, next volley due
+_BOSS_ALIVE, _BOSS_BEATEN = 1, 2
+BOSS_BLASTS = ((0, 0), (-40, -25), (40, -20), (-25, 30), (30, 35))
+
+
+class FireControl:
+    """One simulation's enemy fire: the current level's rules, patterns
+    mid-volley, the boss and every live shot."""
+
+    def __init__(self, patterns, limit=MAX_SHOTS):
+        self.patterns = patterns
+        self.shots = ShotArrays(limit)
+        self.reset()
+
+    def reset(self):
+        self.shots.clear()
+        self.rules = []  # [FireRule, next due ms]
+        self.emitters = []  # [Pattern, x, y, volleys fired, next volley due ms]
+        self.boss = None
+        self.boss_beaten = False
+        self.boss_attack = 0  # script index of the boss's next pattern
+        self.boss_due = 0  # when it starts
+
+    def start_level(self, level, now):
+        self.rules = [[rule, now + rule.every] for rule in self.patterns.level(level)]
+        self.emitters = []
+        self.boss = None
+        self.boss_beaten = False
+
+    def start(self, pattern, x, y, now):
+        """Begin firing ``pattern`` from (x, y); its first volley goes out this tick."""
+        self.emitters.append([pattern, x, y, 0, now])
+
+    def update(self, sim, now):
+        """Start what's due at ``now``, fire due volleys and move every shot."""
+        if not sim.level_transition:
+            for entry in self.rules:
+                if now >= entry[1]:
+                    entry[1] = now + entry[0].every
+                    shooters = sim.shooters()
+                    if shooters:
+                        x, y = shooters[sim.rng.randrange(len(shooters))]
+                        self.start(entry[0].pattern, x, y, now)
+        boss = self.boss
+        if boss is not None:
+            boss.update(now, None)
+            if boss.entered and now >= self.boss_due:
+                spec = self.patterns.boss
+                pattern = spec.script[self.boss_attack % len(spec.script)]
+                self.boss_attack += 1
+                self.boss_due = now + pattern.duration + spec.pause
+                self.start(pattern, boss.rect.centerx, boss.rect.bottom - boss.rect.height // 4, now)
+        if self.emitters:
+            running = []
+            for emitter in self.emitters:
+                pattern, x, y = emitter[0], emitter[1], emitter[2]
+                while emitter[3] < pattern.volleys and now >= emitter[4]:
+                    self.fire(sim, pattern, emitter[3], x, y)
+                    emitter[3] += 1
+                    emitter[4] += pattern.interval
+                if emitter[3] < pattern.volleys:
+                    running.append(emitter)
+            self.emitters = running
+        self.shots.update()
+
+    def fire(self, sim, pattern, index, x, y):
+        target = None
+        if pattern.shape == 'aimed':
+            ship = min(sim.players, key=lambda p: (p.rect.centerx - x) ** 2 + (p.rect.centery - y) ** 2)
+            target = ship.rect.center
+        vx, vy = volley(pattern, index, x, y, target)
+        self.shots.emit(x, y, vx, vy)
+
+    def hit_ship(self, player):
+        """Shots that hit ``player`` this tick (removed)."""
+        return self.shots.hit(player.rect, surface_cache.mask(player.image))
+
+    # -------- BOSS ----------
+    def holds_level(self, sim):
+        """True while the level's boss keeps it from ending; summons the boss
+        on the first call."""
+        spec = self.patterns.boss
+        if spec is None or spec.level != sim.level or self.boss_beaten:
+            return False
+        if self.boss is None:
+            self.boss = Boss(spec.hp, sim.now)
+            self.boss_attack = 0
+            self.boss_due = sim.now
+        return True
+
+    def boss_hit(self, sim, count):
+        """``count`` player bullets hit the boss; at 0 hp it blows up and the level ends."""
+        boss = self.boss
+        boss.hp -= count
+        if boss.hp > 0:
+            return
+        cx, cy = boss.rect.center
+        for dx, dy in BOSS_BLASTS:
+            sim.effects.append(('explosion', cx + dx, cy + dy, None))
+        sim.emit('explosion')
+        self.boss = None
+        self.boss_beaten = True
+        # its patterns die with it, and the screen clears
+        self.emitters = []
+        self.shots.clear()
+        sim.finish_level()
+
+    # -------- SNAPSHOTS ----------
+    def encode(self):
+        """This fire state as bytes, for rewind.py."""
+        boss = self.boss
+        flags = (boss is not None and _BOSS_ALIVE) | (self.boss_beaten and _BOSS_BEATEN)
+        boss_fields = (boss.rect.x, boss.rect.y, boss.hp, boss.spawn_time) if boss is not None else (0, 0, 0, 0)
+        parts = [_FIRE.pack(len(self.shots), len(self.rules), len(self.emitters), flags, self.boss_attack,
+                            *boss_fields, self.boss_due)]
+        parts += [struct.pack("<d", due) for _, due in self.rules]
+        names = self.patterns.names
+        parts += [_EMITTER.pack(names.index(pattern.name), x, y, fired, due)
+                  for pattern, x, y, fired, due in self.emitters]
+        parts.append(self.shots.tobytes())
+        return b"".join(parts)
+
+    def restore(self, sim, data, offset):
+        """Load what encode() wrote at ``offset`` (the level is already restored)."""
+        (shots, rules, emitters, flags, self.boss_attack,
+         bx, by, hp, spawn_time, self.boss_due) = _FIRE.unpack_from(data, offset)
+        offset += _FIRE.size
+        dues = struct.unpack_from(f"<{rules}d", data, offset)
+        offset += 8 * rules
+        self.rules = [[rule, due] for rule, due in zip(self.patterns.level(sim.level), dues)]
+        self.emitters = []
+        patterns = self.patterns.patterns
+        names = self.patterns.names
+        for _ in range(emitters):
+            index, x, y, fired, due = _EMITTER.unpack_from(data, offset)
+            offset += _EMITTER.size
+            self.emitters.append([patterns[names[index]], x, y, fired, due])
+        self.boss_beaten = bool(flags & _BOSS_BEATEN)
+        self.boss = None
+        if flags & _BOSS_ALIVE:
+            self.boss = Boss(self.patterns.boss.hp, spawn_time)
+            self.boss.rect.topleft = (bx, by)
+            self.boss.hp = hp
+        return self.shots.load(data, offset, shots)
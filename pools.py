@@ -0,0 +1,76 @@
+"""Free-list pools for short-lived sprites.
+
+Bullets, enemies and items are recycled instead of reallocated:
+``SpritePool.acquire(*args)`` hands back a previously killed instance re-armed
+through its ``reset(*args)`` (or builds a new one when the free list is empty),
+and ``PooledSprite.kill()`` returns the sprite to its pool. Each pool keeps at
+most ``cap`` idle sprites; anything beyond that is left to the GC.
+
+Pooled sprites are recycled as soon as they are killed, so don't keep a
+reference to one past the point where another sprite of the same kind may be
+acquired.
+"""
+import pygame
+
+
+class PooledSprite(pygame.sprite.Sprite):
+    # '_Sprite__g' is the group set pygame.sprite.Sprite.__init__ assigns as
+    # self.__g. With it slotted too, pooled sprites never materialise a __dict__.
+    __slots__ = ('_Sprite__g', 'image', 'rect', 'pool', 'prev')  # prev: topleft a tick ago
+
+    def kill(self):
+        was_alive = self.alive()
+        super().kill()
+        # kill() can run twice in one update (e.g. Item timing out off-screen);
+        # only the first one hands the sprite back.
+        if was_alive and self.pool is not None:
+            self.pool.release(self)
+
+
+class SpritePool:
+    def __init__(self, cls, cap=64):
+        self.cls = cls
+        self.cap = cap
+        self.free = []
+        self.created = 0
+        self.reused = 0  # allocations avoided
+        self.released = 0
+        self.discarded = 0  # released while the free list was already at cap
+        self.peak_in_use = 0
+
+    @property
+    def in_use(self):
+        return self.created - self.discarded - len(self.free)
+
+    def acquire(self, *args):
+        if self.free:
+            obj = self.free.pop()
+            obj.reset(*args)
+            self.reused += 1
+        else:
+            obj = self.cls(*args, pool=self)
+            self.created += 1
+        obj.prev = obj.rect.topleft  # just placed: nothing to interpolate from
+        in_use = self.in_use
+        if in_use > self.peak_in_use:
+            self.peak_in_use = in_use
+        return obj
+
+    def release(self, obj):
+        self.released += 1
+        if len(self.free) < self.cap:
+            self.free.append(obj)
+        else:
+            self.discarded += 1
+
+    def stats(self):
+        return {
+            'cap': self.cap,
+            'free': len(self.free),
+            'in_use': self.in_use,
+            'peak_in_use': self.peak_in_use,
+            'created': self.created,
+            'reused': self.reused,
+            'released': self.released,
+            'discarded': self.discarded,
+        }
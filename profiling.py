@@ -0,0 +1,204 @@
+"""Frame phase timing and the in-game profiler.
+
+PhaseTimer splits a frame into named phases with lap(): each lap charges the
+time since the previous lap (or mark) to a phase. GameSimulation.step laps
+'update', 'spawn', 'collision' and 'pickups' when a timer is attached; callers lap
+their own phases (draw, ...) around it and call end_frame() once per frame.
+
+FrameProfiler wraps a PhaseTimer for the windowed main loop: it keeps a
+rolling history for the on-screen graph and the raw spans for a
+Chrome-trace export (chrome://tracing, Perfetto). When it is off nothing holds
+its timer, so the instrumented code pays only a None check per phase.
+"""
+import json
+import time
+from collections import deque
+
+import pygame
+
+from settings import FRAME_MS
+from text_cache import render_text
+
+# Phases of one main-loop frame, in the order they happen
+MAIN_LOOP_PHASES = (
+    'events', 'update', 'spawn', 'collision', 'pickups',
+    'background', 'particles', 'sprites', 'hud', 'overlay', 'flip', 'idle',
+)
+PHASE_COLORS = {
+    'events': (120, 120, 255),
+    'update': (80, 200, 120),
+    'spawn': (200, 200, 80),
+    'collision': (230, 90, 60),
+    'pickups': (230, 150, 200),
+    'background': (90, 90, 160),
+    'particles': (255, 110, 60),
+    'sprites': (60, 170, 230),
+    'hud': (200, 120, 255),
+    'overlay': (110, 110, 110),
+    'flip': (255, 170, 40),
+    'idle': (45, 45, 55),
+}
+GRAPH_SIZE = (240, 100)
+GRAPH_MS = FRAME_MS * 2  # full graph height; the budget line sits halfway
+LEGEND_EVERY = 30  # frames between legend refreshes
+
+
+class PhaseTimer:
+    def __init__(self, clock=time.perf_counter, record_spans=False):
+        self.clock = clock
+        self.current = {}  # phase -> seconds so far this frame
+        self.spans = [] if record_spans else None  # (phase, start, end) this frame
+        self._last = clock()
+
+    def mark(self):
+        """Start timing from now without charging the gap to any phase."""
+        self._last = self.clock()
+
+    def lap(self, phase):
+        now = self.clock()
+        current = self.current
+        current[phase] = current.get(phase, 0.0) + (now - self._last)
+        if self.spans is not None:
+            self.spans.append((phase, self._last, now))
+        self._last = now
+
+    def end_frame(self):
+        """Return this frame's {phase: seconds} and start a new frame."""
+        frame = self.current
+        self.current = {}
+        return frame
+
+    def take_spans(self):
+        spans = self.spans
+        self.spans = []
+        return spans
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))  # ceil
+    return sorted_values[int(rank) - 1]
+
+
+class FrameProfiler:
+    def __init__(self, history=GRAPH_SIZE[0], trace_frames=3600, clock=time.perf_counter):
+        self.enabled = False
+        self.timer = PhaseTimer(clock, record_spans=True)
+        self.clock = clock
+        self.history = deque(maxlen=history)  # per-frame {phase: ms}
+        self.trace = deque(maxlen=trace_frames)  # per-frame span lists
+        self.frames = 0
+        self.graph = None
+        self.legend = []
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        if self.enabled:
+            self.timer.current = {}
+            self.timer.take_spans()
+            self.timer.mark()
+        return self.enabled
+
+    def end_frame(self):
+        timer = self.timer
+        frame = {phase: sec * 1000 for phase, sec in timer.end_frame().items()}
+        self.history.append(frame)
+        self.trace.append(timer.take_spans())
+        self.frames += 1
+        if self.graph is not None:
+            self._push_column(frame)
+
+    # -------- REPORTING ----------
+    def averages(self):
+        """Mean ms per phase over the rolling history."""
+        totals = {}
+        for frame in self.history:
+            for phase, ms in frame.items():
+                totals[phase] = totals.get(phase, 0.0) + ms
+        count = len(self.history) or 1
+        return {phase: ms / count for phase, ms in totals.items()}
+
+    def worst_frame(self):
+        """(total ms, {phase: ms}) of the slowest busy frame in the history."""
+        worst = (0.0, {})
+        for frame in self.history:
+            busy = sum(ms for phase, ms in frame.items() if phase != 'idle')
+            if busy > worst[0]:
+                worst = (busy, frame)
+        return worst
+
+    def chrome_trace(self):
+        """Trace Event Format dict: one complete event per phase span, frames on tid 0."""
+        events = []
+        for index, spans in enumerate(self.trace):
+            if not spans:
+                continue
+            for phase, start, end in spans:
+                events.append({
+                    'name': phase, 'cat': 'phase', 'ph': 'X', 'pid': 1, 'tid': 1,
+                    'ts': start * 1e6, 'dur': (end - start) * 1e6,
+                })
+            events.append({
+                'name': 'frame', 'cat': 'frame', 'ph': 'X', 'pid': 1, 'tid': 0,
+                'ts': spans[0][1] * 1e6, 'dur': (spans[-1][2] - spans[0][1]) * 1e6,
+                'args': {'frame': self.frames - len(self.trace) + index},
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export_chrome_trace(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+        return path
+
+    # -------- OVERLAY ----------
+    def _push_column(self, frame):
+        graph = self.graph
+        w, h = GRAPH_SIZE
+        graph.scroll(-1, 0)
+        graph.fill((0, 0, 0, 160), (w - 1, 0, 1, h))
+        y = h
+        scale = h / GRAPH_MS
+        for phase in MAIN_LOOP_PHASES:
+            ms = frame.get(phase)
+            if not ms:
+                continue
+            seg = ms * scale
+            top = max(0, int(round(y - seg)))
+            if int(y) > top:
+                graph.fill(PHASE_COLORS[phase], (w - 1, top, 1, int(y) - top))
+            y -= seg
+            if y <= 0:
+                break
+        graph.set_at((w - 1, h // 2), (255, 255, 255))  # 16.6 ms budget line
+
+    def draw_overlay(self, screen):
+        """Rolling stacked per-phase graph in the bottom-left corner; returns its rect."""
+        w, h = GRAPH_SIZE
+        if self.graph is None:
+            self.graph = pygame.Surface((w, h), pygame.SRCALPHA)
+            self.graph.fill((0, 0, 0, 160))
+            for frame in self.history:
+                self._push_column(frame)
+        if self.frames % LEGEND_EVERY == 0 or not self.legend:
+            self.legend = self._legend()
+
+        rect = pygame.Rect(8, screen.get_height() - h - 8, w, h)
+        screen.blit(self.graph, rect)
+        y = rect.top
+        for surf in self.legend:
+            y -= surf.get_height()
+            screen.blit(surf, (rect.left, y))
+        return rect.unionall([pygame.Rect(rect.left, y, w, rect.top - y)])
+
+    def _legend(self):
+        avgs = self.averages()
+        busy = sum(ms for phase, ms in avgs.items() if phase != 'idle')
+        lines = [render_text(f"frame {busy:5.2f} ms busy   F3 hide   F4 export", 18, (255, 255, 255))]
+        for phase in MAIN_LOOP_PHASES:
+            ms = avgs.get(phase)
+            if ms is not None and ms >= 0.01:
+                lines.append(render_text(f"{phase:<10} {ms:6.2f} ms", 18, PHASE_COLORS[phase]))
+        lines.reverse()  # drawn upward from the graph
+        return lines
@@ -0,0 +1,177 @@
+"""Adaptive quality: step visual and audio cost down when frames run long.
+
+QualityGovernor watches how long each game frame keeps the CPU busy (the
+frame minus the limiter's sleep) against the FRAME_MS budget. When the 90th
+percentile of the last second goes over DEGRADE_AT of the budget it drops
+one tier. It climbs back one tier once the tier above has been expected to
+fit under DEGRADE_AT for a while: the current load plus what that tier cost
+over this one, measured in the first window after the last change between
+the two - or once the load is under RECOVER_AT, which is all a tier not
+measured yet (or measured while the load moved) can go on. So a machine
+whose full tier needs 60-90% of the budget still gets it back after a spike. A short cooldown after every change lets the new tier show its cost
+before the next decision, and a tier that overloads again soon after being
+recovered into waits twice as long before the next try, so a machine sitting
+on the edge doesn't flap. A step down that leaves frames slower than before
+(scaling the canvas up isn't free and can cost more than it saves) is undone
+and the governor stops degrading past it for the rest of the session.
+
+Tiers are cumulative, cheapest savings first:
+
+    full          bullet glow, all particles, flame trail, every voice
+    no-glow       no additive glow pass under bullets
+    particles-50  half the particles per effect
+    no-flame      no engine trail
+    voices-2      at most 2 voices per sound category, particles down to 25%
+    hud-10hz      HUD text refreshed every 6th frame
+    scale-75      world drawn at 75% resolution and scaled up
+    scale-50      world drawn at 50% resolution and scaled up
+
+Every change is logged (printed, and appended to ``--quality-log`` as JSON
+lines) so degradation on low-spec machines shows up in the field.
+"""
+import json
+import time
+from collections import deque, namedtuple
+
+from settings import FRAME_MS
+
+QualityTier = namedtuple('QualityTier',
+                         'name bullet_glow particle_density flame voice_limit hud_every render_scale')
+TIERS = (
+    QualityTier('full', True, 1.0, True, None, 1, 1.0),
+    QualityTier('no-glow', False, 1.0, True, None, 1, 1.0),
+    QualityTier('particles-50', False, 0.5, True, None, 1, 1.0),
+    QualityTier('no-flame', False, 0.5, False, None, 1, 1.0),
+    QualityTier('voices-2', False, 0.25, False, 2, 1, 1.0),
+    QualityTier('hud-10hz', False, 0.25, False, 2, 6, 1.0),
+    QualityTier('scale-75', False, 0.25, False, 2, 6, 0.75),
+    QualityTier('scale-50', False, 0.25, False, 2, 6, 0.5),
+)
+TIER_NAMES = tuple(t.name for t in TIERS)
+
+WINDOW = 60  # frames of busy time the decisions look at
+DEGRADE_AT = 0.9  # of the budget, p90 over the window
+RECOVER_AT = 0.6  # only for a tier whose cost hasn't been measured
+RECOVER_FRAMES = 180  # calm frames before climbing back a tier
+COOLDOWN = 60  # frames after a change before the next decision
+RELAPSE_S = 10.0  # overloading this soon after a recovery doubles its wait
+WORSE_BY = 1.05  # a step down whose p90 comes out this much higher gets undone
+
+
+def apply_tier(tier, renderer, voices=None):
+    """Push ``tier``'s settings into the renderer (and the voice manager)."""
+    renderer.set_quality(tier)
+    if voices is not None:
+        voices.set_limit(tier.voice_limit)
+
+
+class QualityGovernor:
+    def __init__(self, tiers=TIERS, budget_ms=FRAME_MS, start=0, log=print, log_path=None,
+                 clock=time.monotonic):
+        self.tiers = tiers
+        self.budget_ms = budget_ms
+        self.index = start
+        self.log = log
+        self.log_path = log_path
+        self.clock = clock
+        self.samples = deque(maxlen=WINDOW)
+        self.frame = 0
+        self.since_change = 0
+        self.calm = 0
+        self.recover_frames = [RECOVER_FRAMES] * len(tiers)
+        self.recovered_at = None  # (clock, tier index) of the last recovery
+        self.changed_from = None  # (tier index, p90 ms) at the last change, until the next window
+        self.step_cost = [None] * (len(tiers) - 1)  # p90 ms tier i costs over tier i + 1
+        self.ceiling = len(tiers) - 1  # lowest tier still worth trying
+        self.started = clock()
+        self.changes = []  # (seconds since start, frame, old index, new index, p90 ms)
+        self.frames_at = [0] * len(tiers)
+
+    @property
+    def tier(self):
+        return self.tiers[self.index]
+
+    def observe(self, busy_ms):
+        """Record one frame's busy time; returns the new tier on a change, else None."""
+        self.frame += 1
+        self.frames_at[self.index] += 1
+        self.samples.append(busy_ms)
+        self.since_change += 1
+        if self.since_change < COOLDOWN or len(self.samples) < WINDOW:
+            return None
+
+        load = sorted(self.samples)[int(WINDOW * 0.9)]
+        changed_from, self.changed_from = self.changed_from, None
+        if changed_from is not None:
+            # the first window on the new tier: what the step between the two costs
+            old, old_load = changed_from
+            upper, lower = (old_load, load) if old < self.index else (load, old_load)
+            self.step_cost[min(old, self.index)] = max(0.0, upper - lower)
+            if old < self.index and load > old_load * WORSE_BY:
+                # the last step down made things worse: undo it and go no lower
+                self.ceiling = self.index - 1
+                return self._change(self.index - 1, load)
+        if load > self.budget_ms * DEGRADE_AT:
+            self.calm = 0
+            if self.index < self.ceiling:
+                recovered = self.recovered_at
+                if recovered is not None and recovered[1] == self.index \
+                        and self.clock() - recovered[0] < RELAPSE_S:
+                    self.recover_frames[self.index] *= 2
+                return self._change(self.index + 1, load)
+            return None
+        self.calm = self.calm + 1 if self._fits_above(load) else 0
+        if self.index > 0 and self.calm >= self.recover_frames[self.index - 1]:
+            self.recovered_at = (self.clock(), self.index - 1)
+            return self._change(self.index - 1, load)
+        return None
+
+    def _fits_above(self, load):
+        """Would the tier above this one run under DEGRADE_AT at ``load``?"""
+        if self.index == 0:
+            return False
+        if load < self.budget_ms * RECOVER_AT:
+            return True
+        cost = self.step_cost[self.index - 1]
+        return cost is not None and load + cost < self.budget_ms * DEGRADE_AT
+
+    def _change(self, index, load):
+        old = self.index
+        self.index = index
+        self.changed_from = (old, load)
+        self.since_change = 0
+        self.calm = 0
+        self.samples.clear()
+        elapsed = self.clock() - self.started
+        self.changes.append((elapsed, self.frame, old, index, load))
+        verb = "down" if index > old else "up"
+        if self.log is not None:
+            self.log(f"quality {verb}: {self.tiers[old].name} -> {self.tiers[index].name} "
+                     f"at {elapsed:.1f}s (p90 busy {load:.1f} ms, budget {self.budget_ms:.1f} ms)")
+        self._append_log({'event': 'change', 'from': self.tiers[old].name, 'to': self.tiers[index].name,
+                          'seconds': round(elapsed, 2), 'frame': self.frame, 'p90_ms': round(load, 2)})
+        return self.tiers[index]
+
+    def _append_log(self, record):
+        if self.log_path is None:
+            return
+        try:
+            with open(self.log_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            print(f"could not write quality log: {e}")
+            self.log_path = None
+
+    def stats(self):
+        frames = sum(self.frames_at) or 1
+        return {
+            'tier': self.tier.name,
+            'downgrades': sum(1 for c in self.changes if c[3] > c[2]),
+            'upgrades': sum(1 for c in self.changes if c[3] < c[2]),
+            'time_share': {t.name: round(n / frames, 3) for t, n in zip(self.tiers, self.frames_at) if n},
+        }
+
+    def close(self):
+        """Log the session summary (call once on exit)."""
+        self._append_log(dict(self.stats(), event='session', frames=self.frame,
+                              seconds=round(self.clock() - self.started, 1)))
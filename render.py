@@ -0,0 +1,442 @@
+"""Drawing for the windowed game.
+
+Two renderers share the same drawing code and layer order (background,
+particles, enemies, boss, player, items, bullets, enemy shots, HUD,
+level-start text); every
+sprite is drawn once and anything fully off-screen is skipped. Particles
+(explosions, pickup bursts, the engine trail) come from the renderer's
+ParticleSystem, fed with each step's ``sim.effects``; without numpy there are
+none.
+
+FullRenderer repaints the whole frame and flips. DirtyRenderer keeps last
+frame's pixels: it paints the background back only under what was drawn last
+frame and hands ``display.update`` just the changed rects. Past
+RESTORE_RECTS_MAX rects (a screen full of enemy shots) one background blit is
+cheaper than the per-rect repaints; only the changed rects are still pushed.
+Static screens (menu, game over) are painted once and then cost nothing per
+frame.
+
+A scrolling background is what keeps that from paying off: the backdrop is a
+photograph, and moving it 2px changes about 95% of the screen's pixels, so a
+frame that scrolls has to push all of them. DirtyRenderer therefore moves the
+background in DIRTY_SCROLL_STEP px steps. Frames in between push only the
+sprite rects; a step frame scrolls the screen in place, fills the exposed
+strip at the top and pushes the screen.
+
+game() takes the pacer's ``alpha`` (pacing.py): with the simulation's
+interpolation on, the background, every sprite and the particles are drawn
+that far between the last two ticks. ``effects`` are those of every tick
+since the last frame when a frame runs more than one.
+
+set_quality() takes a quality.QualityTier: bullet glow, particle density,
+the flame trail, how often the HUD text refreshes and the resolution the
+world is drawn at (below 1.0 it goes to a smaller canvas through a
+Downscaler and is scaled up to the window; the HUD stays sharp).
+"""
+import pygame
+
+import resources
+import surface_cache
+from settings import WIDTH, HEIGHT, FRAME_MS, TRANSITION_DURATION
+from text_cache import HudText, blit_alpha, render_text
+
+try:
+    from particles import ParticleSystem
+except ImportError:  # numpy missing: no particle effects
+    ParticleSystem = None
+
+SCREEN_RECT = pygame.Rect(0, 0, WIDTH, HEIGHT)
+SPRITE_LAYERS_BELOW_PLAYER = ('enemies', 'boss')
+SPRITE_LAYERS_ABOVE_PLAYER = ('items', 'bullets', 'shots')
+RESTORE_RECTS_MAX = 64  # one full background blit costs about this many clipped ones
+DIRTY_SCROLL_STEP = 8  # px the dirty renderer's background moves at a time; divides HEIGHT
+MAX_PARTICLE_DT = 100  # ms; longer gaps (a stall, the end screen) don't fast-forward particles
+# engine trail, particles per second
+FLAME_IDLE_RATE = 40
+FLAME_THRUST_RATE = 120
+
+
+# -------- FUNCTIONS ----------
+def draw_restart_icon(screen):
+    center = (WIDTH // 2, HEIGHT // 2 + 60)
+    radius = 25
+    pygame.draw.circle(screen, (100, 100, 100), center, radius)
+
+    arrow_w, arrow_h = 10, 12
+    arrow_x = center[0] - arrow_w // 2
+    arrow_y = center[1] - arrow_h // 2
+
+    pygame.draw.polygon(screen, (255, 255, 255), [
+        (arrow_x, arrow_y),
+        (arrow_x + arrow_w, center[1]),
+        (arrow_x, arrow_y + arrow_h),
+    ])
+
+    return pygame.Rect(center[0] - radius, center[1] - radius, radius*2, radius*2)
+
+def draw_menu(screen):
+    screen.blit(resources.background, (0, 0))
+    title = render_text("SPACE INVADERS", 72, (255, 255, 255))
+    screen.blit(title, (WIDTH//2 - title.get_width()//2, HEIGHT//2 - 100))
+
+    start_btn = pygame.Rect(WIDTH//2 - 75, HEIGHT//2, 150, 50)
+    pygame.draw.rect(screen, (100, 100, 100), start_btn)
+    txt = render_text("Start", 36, (255, 255, 255))
+    screen.blit(txt, (start_btn.centerx - txt.get_width()//2, start_btn.centery - txt.get_height()//2))
+    return start_btn
+
+def draw_background(screen, offset):
+    background = resources.background
+    screen.blit(background, (0, offset))
+    screen.blit(background, (0, offset - HEIGHT))
+
+def restore_background(screen, rect, offset):
+    """Repaint the scrolled background (at ``offset``) inside ``rect`` only."""
+    screen.set_clip(rect)
+    draw_background(screen, offset)
+    screen.set_clip(None)
+
+def draw_end_screen(screen, sim, hint=None):
+    draw_background(screen, sim.bg_y % HEIGHT)
+    if sim.game_win:
+        msg = render_text("YOU WIN!", 72, (255, 255, 0))
+    else:
+        msg = render_text("GAME OVER", 72, (255, 0, 0))
+    screen.blit(msg, (WIDTH//2 - msg.get_width()//2, HEIGHT//2))
+
+    if sim.game_over:
+        draw_restart_icon(screen)
+    if hint:
+        txt = render_text(hint, 28, (200, 200, 200))
+        screen.blit(txt, (WIDTH//2 - txt.get_width()//2, HEIGHT//2 + 110))
+
+def glow_blits(sim, alpha=1.0):
+    """Additive glow blits centred on each bullet."""
+    glow = surface_cache.bullet_glow_image()
+    bw, bh = surface_cache.bullet_image().get_size()
+    offset = ((bw - glow.get_width()) // 2, (bh - glow.get_height()) // 2)
+    return sim.layer_blits('bullets', alpha, glow, offset, pygame.BLEND_ADD)
+
+def draw_world(screen, sim, bullet_glow=False, scaler=None, alpha=1.0, rects=True):
+    """Blit every visible entity once, in layer order; returns the rects touched
+    (none with ``rects=False``, which saves building them).
+
+    With a ``scaler`` (Downscaler) ``screen`` is its reduced-size canvas.
+    """
+    batches = [sim.layer_blits(layer, alpha) for layer in SPRITE_LAYERS_BELOW_PLAYER]
+    for player in sim.players:
+        batches.append(player.draw_pairs(alpha))
+    for layer in SPRITE_LAYERS_ABOVE_PLAYER:
+        if layer == 'bullets' and bullet_glow:
+            batches.append(glow_blits(sim, alpha))
+        batches.append(sim.layer_blits(layer, alpha))
+    drawn = []
+    for blits in batches:
+        if scaler is not None:
+            blits = scaler.blits(blits)
+        if rects:
+            drawn += screen.blits(blits)
+        else:
+            screen.blits(blits, doreturn=False)
+    return drawn
+
+def draw_transition(screen, sim):
+    # --- LEVEL TRANSITION EFFECT (fade in/out, non-blocking) ---
+    if not sim.level_transition:
+        return None
+    elapsed = sim.now - sim.level_transition_start
+    if elapsed >= TRANSITION_DURATION:
+        return None
+    # Tính alpha (độ trong suốt) từ 0→255→0
+    half = TRANSITION_DURATION / 2
+    if elapsed < half:
+        alpha = int((elapsed / half) * 255)
+    else:
+        alpha = int(((TRANSITION_DURATION - elapsed) / half) * 255)
+
+    # Chữ mờ dần (cached text, alpha applied only for this blit)
+    text = render_text(f"LEVEL {sim.level} START!", 72, (255, 255, 0))
+    pos = (WIDTH//2 - text.get_width()//2, HEIGHT//2 - text.get_height()//2)
+    blit_alpha(screen, text, pos, alpha)
+    return pygame.Rect(pos, text.get_size())
+
+class Hud:
+    def __init__(self):
+        self.status = HudText(28, (255, 255, 255))
+        self.enemy_info = HudText(28, (255, 255, 255))
+        self.boss_info = HudText(28, (255, 120, 200))
+        self.powers = {}  # power name -> HudText
+        self.refresh_every = 1  # frames between text updates; the quality governor raises it
+        self.frame = 0
+        self.lines = None  # [(HudText, text, anchor)] from the last refresh
+
+    def draw(self, screen, sim):
+        if self.lines is None or self.frame % self.refresh_every == 0:
+            self.lines = self.compose(sim)
+        self.frame += 1
+        return [line.draw(screen, text, **anchor) for line, text, anchor in self.lines]
+
+    def compose(self, sim):
+        lines = [
+            (self.status, f"Level: {sim.level}   Lives: {sim.lives}", {'topleft': (10, 10)}),
+            (self.enemy_info, f"Enemies: {sim.enemies_destroyed}/{sim.enemies_required}", {'topleft': (10, 40)}),
+        ]
+        boss = sim.boss_hp()
+        if boss is not None:
+            lines.append((self.boss_info, f"Boss: {boss[0]}/{boss[1]}", {'topleft': (10, 70)}))
+
+        # show active powers timers
+        now = sim.now
+        x = WIDTH - 8; y = 8
+        for name, expire in list(sim.player.powers.items()):
+            rem = max(0, int(expire - now) // 1000)
+            if name == 'fast_fire':
+                txt = f"FastFire: {rem}s"
+            elif name == 'multi_shot':
+                txt = f"MultiShot: {rem}s"
+            else:
+                txt = f"{name}: {rem}s"
+            line = self.powers.get(name)
+            if line is None:
+                line = self.powers[name] = HudText(28, (230,230,230))
+            lines.append((line, txt, {'topright': (x, y)}))
+            y += line.set(txt).get_height() + 6
+        return lines
+
+
+class Downscaler:
+    """Maps full-resolution blits onto a canvas ``scale`` times the window size."""
+
+    def __init__(self, scale):
+        self.scale = scale
+        self.canvas = pygame.Surface((round(WIDTH * scale), round(HEIGHT * scale)))
+        if pygame.display.get_surface() is not None:
+            self.canvas = self.canvas.convert()
+        self.images = {}  # full-size surface -> scaled copy
+
+    def image(self, surface):
+        scaled = self.images.get(surface)
+        if scaled is None:
+            w, h = surface.get_size()
+            size = (max(1, round(w * self.scale)), max(1, round(h * self.scale)))
+            scaled = self.images[surface] = pygame.transform.smoothscale(surface, size)
+        return scaled
+
+    def blits(self, blits):
+        """The same (image, pos, ...) sequence with images and positions scaled."""
+        s = self.scale
+        image = self.image
+        return [(image(b[0]), (int(b[1][0] * s), int(b[1][1] * s))) + tuple(b[2:]) for b in blits]
+
+
+# -------- RENDERERS ----------
+class Renderer:
+    def __init__(self, screen):
+        self.screen = screen
+        self.hud = Hud()
+        self.timer = None  # profiling.PhaseTimer while the profiler is on
+        self.overlay = None  # callable(screen) -> rect drawn last, e.g. profiler graph
+        self.particles = ParticleSystem() if ParticleSystem is not None else None
+        self.flame_trail = True
+        self.bullet_glow = True
+        self.scaler = None  # Downscaler while drawing the world below full resolution
+        self.particle_step = None  # (sim.now, sim.frame) the particles were last advanced to
+        self.end_hint = None  # extra line on the end screen, e.g. the retry key
+        self.scroll_step = 1  # px; the background offset is rounded down to a multiple
+
+    def _scroll(self, sim, alpha):
+        """Background offset to draw: the scroll at ``alpha``, in scroll_step px steps."""
+        offset = int(sim.scroll_at(alpha)) % HEIGHT
+        return offset - offset % self.scroll_step
+
+    def set_quality(self, tier):
+        """Apply a quality.QualityTier's visual settings."""
+        self.bullet_glow = tier.bullet_glow
+        self.flame_trail = tier.flame
+        if self.particles is not None:
+            self.particles.density = tier.particle_density
+        self.hud.refresh_every = tier.hud_every
+        if tier.render_scale >= 1:
+            self.scaler = None
+        elif self.scaler is None or self.scaler.scale != tier.render_scale:
+            self.scaler = Downscaler(tier.render_scale)
+
+    def _lap(self, phase):
+        if self.timer is not None:
+            self.timer.lap(phase)
+
+    def _draw_particles(self, sim, surface=None, scale=1.0, alpha=1.0, effects=None):
+        """Advance the particles to the time shown, add new effects, draw; returns the rects."""
+        particles = self.particles
+        if particles is None:
+            return []
+        last = self.particle_step
+        shown = sim.now - (1.0 - alpha) * FRAME_MS
+        if last is None or sim.frame < last[1]:
+            particles.clear()  # new game or a rewind
+            dt = 0
+        else:
+            dt = min(max(0.0, shown - last[0]), MAX_PARTICLE_DT)
+        stepped = last is None or sim.frame != last[1]
+        if stepped or dt:
+            self.particle_step = (shown, sim.frame)
+            particles.update(dt)
+            if stepped:
+                particles.emit_effects(sim.effects if effects is None else effects)
+            if self.flame_trail:
+                player = sim.player
+                rate = FLAME_THRUST_RATE if player.show_flame else FLAME_IDLE_RATE
+                particles.flame(player.rect.centerx, player.rect.bottom - 6, dt, rate)
+        drawn = particles.draw(self.screen if surface is None else surface, scale)
+        self._lap('particles')
+        return drawn
+
+    def _game_scaled(self, sim, alpha, effects):
+        """A game frame with the world drawn on the scaler's canvas, then scaled up."""
+        scaler = self.scaler
+        canvas = scaler.canvas
+        background = scaler.image(resources.background)
+        offset = int(sim.scroll_at(alpha) % HEIGHT * scaler.scale)
+        canvas.blit(background, (0, offset))
+        canvas.blit(background, (0, offset - background.get_height()))
+        self._lap('background')
+        self._draw_particles(sim, canvas, scaler.scale, alpha, effects)
+        draw_world(canvas, sim, self.bullet_glow, scaler, alpha, rects=False)
+        pygame.transform.scale(canvas, (WIDTH, HEIGHT), self.screen)
+        self._lap('sprites')
+        self._draw_top(sim)
+        pygame.display.flip()
+        self._lap('flip')
+
+    def _draw_top(self, sim):
+        """HUD, level-start text and overlay; returns the rects drawn."""
+        screen = self.screen
+        drawn = self.hud.draw(screen, sim)
+        r = draw_transition(screen, sim)
+        if r is not None:
+            drawn.append(r)
+        self._lap('hud')
+        if self.overlay is not None:
+            drawn.append(self.overlay(screen))
+            self._lap('overlay')
+        return drawn
+
+
+class FullRenderer(Renderer):
+    def menu(self):
+        start_btn = draw_menu(self.screen)
+        pygame.display.flip()
+        return start_btn
+
+    def game(self, sim, alpha=1.0, effects=None):
+        if not sim.interpolation:
+            alpha = 1.0
+        if self.scaler is not None:
+            self._game_scaled(sim, alpha, effects)
+            return
+        screen = self.screen
+        draw_background(screen, self._scroll(sim, alpha))
+        self._lap('background')
+        self._draw_particles(sim, alpha=alpha, effects=effects)
+        draw_world(screen, sim, self.bullet_glow, alpha=alpha, rects=False)
+        self._lap('sprites')
+        self._draw_top(sim)
+        pygame.display.flip()
+        self._lap('flip')
+
+    def end(self, sim):
+        draw_end_screen(self.screen, sim, self.end_hint)
+        pygame.display.flip()
+
+
+class DirtyRenderer(Renderer):
+    def __init__(self, screen):
+        super().__init__(screen)
+        self.scene = None
+        self.offset = 0
+        self.drawn = []  # rects painted over the background last frame
+        self.start_btn = None
+        self.scroll_step = DIRTY_SCROLL_STEP
+        self.updated_area = 0  # pixels pushed by the last display update
+        self.updated = None  # the rects pushed by it; None = the whole screen
+
+    def _enter(self, scene):
+        """True the first frame of a new scene, which needs a full repaint."""
+        if scene == self.scene:
+            return False
+        self.scene = scene
+        self.drawn = []
+        return True
+
+    def _update(self, rects=None):
+        self.updated = rects
+        if rects is None:
+            pygame.display.update()
+            self.updated_area = WIDTH * HEIGHT
+        else:
+            pygame.display.update(rects)
+            clip = SCREEN_RECT.clip
+            self.updated_area = sum(r.width * r.height for r in map(clip, rects))
+
+    def menu(self):
+        if self._enter('menu'):
+            self.start_btn = draw_menu(self.screen)
+            self._update()
+        else:
+            self._update([])
+        return self.start_btn
+
+    def end(self, sim):
+        if self._enter(('end', sim.game_win)):
+            draw_end_screen(self.screen, sim, self.end_hint)
+            self._update()
+        else:
+            self._update([])
+
+    def game(self, sim, alpha=1.0, effects=None):
+        if not sim.interpolation:
+            alpha = 1.0
+        if self.scaler is not None:
+            self._enter('scaled')  # back at full resolution, the first frame repaints
+            self._game_scaled(sim, alpha, effects)
+            self.updated_area = WIDTH * HEIGHT
+            return
+        screen = self.screen
+        offset = self._scroll(sim, alpha)
+        full = self._enter('game')
+        if full:
+            draw_background(screen, offset)
+        else:
+            # erase last frame's sprites with the background they covered
+            if len(self.drawn) > RESTORE_RECTS_MAX:
+                draw_background(screen, self.offset)
+            else:
+                for r in self.drawn:
+                    restore_background(screen, r, self.offset)
+            delta = (offset - self.offset) % HEIGHT
+            if delta:
+                # a background step: every pixel moves, so shift in place,
+                # paint only the new strip and push the whole screen
+                screen.scroll(0, delta)
+                restore_background(screen, pygame.Rect(0, 0, WIDTH, delta), offset)
+                full = True
+        self._lap('background')
+
+        drawn = self._draw_particles(sim, alpha=alpha, effects=effects)
+        drawn += draw_world(screen, sim, self.bullet_glow, alpha=alpha)
+        self._lap('sprites')
+        drawn += self._draw_top(sim)
+
+        if full:
+            self._update()
+        else:
+            self._update(self.drawn + drawn)
+        self._lap('flip')
+        self.drawn = drawn
+        self.offset = offset
+
+
+RENDERERS = {
+    'full': FullRenderer,
+    'dirty': DirtyRenderer,
+}
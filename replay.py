@@ -0,0 +1,179 @@
+"""Input recording and bit-for-bit replay.
+
+A recording is everything that feeds GameSimulation from outside: the seed,
+the engine, the clock's start time and, per frame, the dt the loop stepped
+with (stored exactly: clock.tick's whole ms or the fixed FRAME_MS tick)
+plus one byte of input bits (held arrows/space, the space KEYDOWN
+and a restart click). Runs of identical frames are stored once with a repeat
+count and the whole body is zlib-compressed, so an hour of play is a few KB.
+
+The file also carries a digest of the simulation state every DIGEST_EVERY
+frames; replay() recomputes them and reports the first frame that diverges.
+Replays run headless with no frame cap.
+
+    python AnhMinhSaDec.py --record session.rep
+    python replay.py session.rep                  # verify + frames/s
+    python replay.py session.rep --engine numpy   # same workload, other backend
+"""
+import argparse
+import hashlib
+import json
+import struct
+import time
+import zlib
+
+import simulation
+from simulation import Inputs, SimClock, make_simulation
+
+MAGIC = b"SIREPLAY"
+REPLAY_VERSION = 5  # 2: explosions are particles, no longer in the digest; 3: mask collisions; 4: enemy fire;
+                    # 5: dt stored as a double (fixed-tick pacing steps FRAME_MS, not whole ms)
+DIGEST_EVERY = 600  # frames
+_HEADER = struct.Struct("<8sI")
+_RUN = struct.Struct("<HdB")  # repeat count, dt ms, input bits
+
+# Inputs fields in bit order; bit 6 is a restart click handled before the step
+INPUT_BITS = Inputs._fields
+RESTART_BIT = 1 << len(INPUT_BITS)
+
+
+def pack_inputs(inputs, restart=False):
+    bits = RESTART_BIT if restart else 0
+    for i, held in enumerate(inputs):
+        if held:
+            bits |= 1 << i
+    return bits
+
+
+def unpack_inputs(bits):
+    return Inputs(*(bool(bits & (1 << i)) for i in range(len(INPUT_BITS)))), bool(bits & RESTART_BIT)
+
+
+def state_digest(sim):
+    """Short hash of the state a divergence would show up in, RNG included."""
+    h = hashlib.blake2b(digest_size=8)
+    h.update(repr((
+        # float: a recorded whole-ms dt comes back from the file as a double
+        sim.frame, float(sim.now), sim.level, sim.lives, sim.enemies_destroyed,
+        sim.bg_y, sim.world_y, tuple(sim.player.rect), sorted(sim.player.powers.items()),
+        sorted(sim.entity_counts().items()), sim.rng.getstate(),
+        sim.boss_hp(),
+    )).encode())
+    for layer in ('enemies', 'items', 'bullets', 'shots', 'boss'):
+        h.update(repr([(pos[0], pos[1]) for _, pos in sim.layer_view(layer)]).encode())
+    return h.hexdigest()
+
+
+class Recording:
+    def __init__(self, seed, engine='sprites', clock_start=0.0):
+        self.seed = seed
+        self.engine = engine
+        self.clock_start = clock_start
+        self.frames = []  # (dt ms, input bits)
+        self.digests = {}  # frame index -> state_digest after that frame
+
+    def __len__(self):
+        return len(self.frames)
+
+    # -------- RECORDING ----------
+    def record(self, dt, inputs, restart=False):
+        """Log one frame; call with the dt and inputs passed to sim.step()."""
+        self.frames.append((float(dt), pack_inputs(inputs, restart)))
+
+    def checkpoint(self, sim):
+        """Call after each step; keeps a state digest every DIGEST_EVERY frames."""
+        index = len(self.frames) - 1
+        if index % DIGEST_EVERY == DIGEST_EVERY - 1:
+            self.digests[index] = state_digest(sim)
+
+    # -------- FILE FORMAT ----------
+    def _runs(self):
+        runs = []
+        for frame in self.frames:
+            if runs and runs[-1][1:] == frame and runs[-1][0] < 0xFFFF:
+                runs[-1][0] += 1
+            else:
+                runs.append([1, *frame])
+        return runs
+
+    def save(self, path):
+        body = b"".join(_RUN.pack(*run) for run in self._runs())
+        meta = json.dumps({
+            'version': REPLAY_VERSION, 'seed': self.seed, 'engine': self.engine,
+            'clock_start': self.clock_start, 'frames': len(self.frames),
+            'digests': {str(k): v for k, v in self.digests.items()},
+        }).encode()
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, len(meta)))
+            f.write(meta)
+            f.write(zlib.compress(body, 9))
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, meta_len = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a replay")
+        meta = json.loads(data[_HEADER.size:_HEADER.size + meta_len])
+        if meta['version'] != REPLAY_VERSION:
+            raise ValueError(f"{path}: replay version {meta['version']}, expected {REPLAY_VERSION}")
+        rec = cls(meta['seed'], meta['engine'], meta['clock_start'])
+        body = zlib.decompress(data[_HEADER.size + meta_len:])
+        for count, dt, bits in _RUN.iter_unpack(body):
+            rec.frames.extend([(dt, bits)] * count)
+        rec.digests = {int(k): v for k, v in meta['digests'].items()}
+        return rec
+
+
+# -------- REPLAY ----------
+def replay(rec, engine=None, check=True, sim=None):
+    """Run ``rec`` as fast as possible.
+
+    Returns (sim, elapsed seconds, first diverging frame or None). ``sim`` may
+    be a fresh simulation to reuse (e.g. with a phase_timer attached).
+    """
+    if sim is None:
+        sim = make_simulation(engine or rec.engine, seed=rec.seed, clock=SimClock(rec.clock_start))
+    decoded = {}  # bits -> (Inputs, restart); only a handful of distinct values
+    digests = rec.digests if check else {}
+    diverged = None
+    start = time.perf_counter()
+    for index, (dt, bits) in enumerate(rec.frames):
+        frame = decoded.get(bits)
+        if frame is None:
+            frame = decoded[bits] = unpack_inputs(bits)
+        inputs, restart = frame
+        if restart:
+            sim.reset()
+        sim.step(dt, inputs)
+        expected = digests.get(index)
+        if expected is not None and diverged is None and state_digest(sim) != expected:
+            diverged = index
+    return sim, time.perf_counter() - start, diverged
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded session headless at full speed.")
+    parser.add_argument("path")
+    parser.add_argument("--engine", choices=simulation.ENGINES,
+                        help="override the recorded engine")
+    parser.add_argument("--no-check", action="store_true", help="skip digest verification")
+    parser.add_argument("--repeat", type=int, default=1, help="replay this many times (benchmarking)")
+    args = parser.parse_args(argv)
+
+    rec = Recording.load(args.path)
+    simulation.init_headless()
+    print(f"{args.path}: {len(rec)} frames, seed {rec.seed}, recorded on {rec.engine}")
+    for _ in range(args.repeat):
+        sim, elapsed, diverged = replay(rec, args.engine, check=not args.no_check)
+        status = "not checked" if args.no_check else (
+            "OK" if diverged is None else f"DIVERGED at frame {diverged}")
+        print(f"{len(rec) / elapsed:.0f} frames/s ({elapsed:.3f}s), "
+              f"level {sim.level}, lives {sim.lives}, {status}")
+    return 0 if diverged is None else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
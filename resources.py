@@ -0,0 +1,252 @@
+import os
+import threading
+
+import pygame
+
+import asset_bake
+from settings import WIDTH, HEIGHT
+
+# -------- LOAD ASSETS ----------
+ASSET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+MIXER_FORMAT = (44100, -16, 2, 512)  # frequency, size, channels, buffer
+
+ITEM_PREFIX = "item:"
+ITEM_SIZE = (32, 32)  # items are only ever drawn at this size
+# name -> (file, final size, smoothscale?, per-pixel alpha?)
+IMAGE_SPECS = {
+    'background': ("background.png", (WIDTH, HEIGHT), False, False),
+    # player image - keep size exactly as original code did (100x100)
+    'player': ("player.png", (100, 100), True, True),
+    'enemy': ("enemy.png", (50, 50), False, True),
+    'explosion': ("explosion.png", (50, 50), False, True),
+    # --- Item / Power-up images ---
+    'item:energy': ("a glowing blue energ.png", ITEM_SIZE, True, True),   # Power-up: tăng sát thương đạn
+    'item:shield': ("a glowing blue shiel.png", ITEM_SIZE, True, True),   # Power-up: khiên bảo vệ
+    'item:mystery': ("a mysterious purple .png", ITEM_SIZE, True, True),  # Power-up: hiệu ứng ngẫu nhiên
+    'item:speed': ("a yellow lightning b.png", ITEM_SIZE, True, True),    # Power-up: tăng tốc hoặc tốc độ bắn
+    'item:heart': ("heart.png", ITEM_SIZE, True, True),                   # Hồi máu / thêm mạng
+}
+MENU_IMAGES = ('background',)
+SOUND_FILES = ("shoot.wav", "explosion.wav", "fireworks.wav")
+
+# Filled in by load_images() / load_sounds(). Sprites read these at construction
+# time, so load_images() must run (after a display mode is set) before the first
+# sprite is created. The game itself loads the menu images first and the rest
+# on an AssetLoader thread.
+background = None
+player_img = None
+enemy_img = None
+explosion_img = None
+item_images = {}
+
+shoot_sound = None
+explosion_sound = None
+fireworks_sound = None
+pickup_sound = None
+
+bake = None  # asset_bake.AssetBake while a fresh bake is mapped
+bake_status = None  # 'hit', 'stale' or 'missing' once open_bake() has run
+_sounds = {}  # file -> loaded Sound
+
+
+def load_image_file(path):
+    """The file's pixels as decoded, not converted for the display; None if unreadable."""
+    try:
+        return pygame.image.load(path)
+    except Exception:
+        return None
+
+
+def safe_load_image(path, convert_alpha=True):
+    img = load_image_file(path)
+    if img is None:
+        return None
+    try:
+        return img.convert_alpha() if convert_alpha else img.convert()
+    except Exception:
+        return None
+
+
+class DummySound:
+    def play(self, *args, **kwargs): pass
+    def stop(self): pass
+    def set_volume(self, value): pass
+    def get_length(self): return 0.0
+
+
+# Sounds: use safe loader, fallback to dummy
+def safe_load_sound(path):
+    try:
+        return pygame.mixer.Sound(path)
+    except Exception:
+        return DummySound()
+
+
+def source_stamps():
+    files = [spec[0] for spec in IMAGE_SPECS.values()] + list(SOUND_FILES)
+    return {f: asset_bake.source_stamp(os.path.join(ASSET_DIR, f)) for f in files}
+
+
+def spec_signature():
+    return {name: [f, list(size), smooth, alpha] for name, (f, size, smooth, alpha) in IMAGE_SPECS.items()}
+
+
+def open_bake(path=asset_bake.BAKE_PATH):
+    """Map the asset bake if it matches the current sources; sets bake_status."""
+    global bake, bake_status
+    found = asset_bake.AssetBake.open(path)
+    if found is None:
+        bake, bake_status = None, 'missing'
+    elif not found.is_fresh(source_stamps(), spec_signature()):
+        found.close()
+        bake, bake_status = None, 'stale'
+    else:
+        bake, bake_status = found, 'hit'
+    return bake
+
+
+def decode_image(name):
+    """Scaled, not yet display-converted image for IMAGE_SPECS[name]; None if missing.
+
+    Safe off the main thread: install_images() does the one display conversion.
+    """
+    if bake is not None:
+        img = bake.image(name)
+        if img is not None:
+            return img
+    filename, size, smooth, _ = IMAGE_SPECS[name]
+    img = load_image_file(os.path.join(ASSET_DIR, filename))
+    if img is None:
+        return None
+    if img.get_bitsize() < 24:
+        smooth = False  # smoothscale only takes 24/32-bit pixels
+    try:
+        return (pygame.transform.smoothscale if smooth else pygame.transform.scale)(img, size)
+    except Exception:
+        return img
+
+
+def decode_images(names):
+    return {name: decode_image(name) for name in names}
+
+
+def install_images(images):
+    """Convert decoded images for the display and publish them (with fallbacks)."""
+    global background, player_img, enemy_img, explosion_img
+
+    for name, img in images.items():
+        if img is not None:
+            img = img.convert_alpha() if IMAGE_SPECS[name][3] else img.convert()
+
+        if name == 'background':
+            if img is None:
+                # create simple background
+                img = pygame.Surface((WIDTH, HEIGHT))
+                img.fill((12, 12, 30))
+            background = img
+        elif name == 'player':
+            if img is None:
+                # fallback: simple triangle ship
+                img = pygame.Surface((100,100), pygame.SRCALPHA)
+                pygame.draw.polygon(img, (200,200,255), [(50,0),(90,90),(10,90)])
+            player_img = img
+        elif name == 'enemy':
+            if img is None:
+                img = pygame.Surface((50,50), pygame.SRCALPHA)
+                pygame.draw.circle(img, (220,180,80), (25,25), 22)
+            enemy_img = img
+        elif name == 'explosion':
+            if img is None:
+                img = pygame.Surface((50,50), pygame.SRCALPHA)
+                pygame.draw.circle(img, (255,120,10), (25,25), 24)
+            explosion_img = img
+        else:
+            item_images[name[len(ITEM_PREFIX):]] = img
+
+
+def load_images():
+    """Load every image now (bake first, source files otherwise)."""
+    if bake_status is None:
+        open_bake()
+    install_images(decode_images(IMAGE_SPECS))
+
+
+def load_menu_images():
+    """Just what the menu draws; returns the decoded images (see save_bake)."""
+    if bake_status is None:
+        open_bake()
+    images = decode_images(MENU_IMAGES)
+    install_images(images)
+    return images
+
+
+def load_sound(filename):
+    path = os.path.join(ASSET_DIR, filename)
+    sound = None
+    if bake is not None:
+        sound = bake.sound(filename, pygame.mixer.get_init())
+    if sound is None:
+        sound = safe_load_sound(path)
+    _sounds[filename] = sound
+    return sound
+
+
+def load_sounds():
+    global shoot_sound, explosion_sound, fireworks_sound, pickup_sound
+
+    shoot_sound = load_sound("shoot.wav")
+    explosion_sound = load_sound("explosion.wav")
+    fireworks_sound = load_sound("fireworks.wav")
+    pickup_sound = load_sound("fireworks.wav")
+
+    # background music: use music channel for mp3 if present
+    bg_music_path = os.path.join(ASSET_DIR, "background_music.mp3")
+    if os.path.exists(bg_music_path):
+        try:
+            pygame.mixer.music.load(bg_music_path)
+            pygame.mixer.music.set_volume(0.5)
+        except Exception:
+            pass
+
+
+def baked_sounds():
+    """Raw samples of every loaded sound, for the bake."""
+    return {f: s.get_raw() for f, s in _sounds.items() if not isinstance(s, DummySound)}
+
+
+def save_bake(images, path=asset_bake.BAKE_PATH):
+    """Write the decoded ``images`` and the loaded sounds to the bake file."""
+    return asset_bake.write_bake(path, {n: img for n, img in images.items() if img is not None},
+                                 baked_sounds(), source_stamps(), spec_signature(),
+                                 pygame.mixer.get_init())
+
+
+class AssetLoader(threading.Thread):
+    """Decodes the images the menu doesn't need, and the sounds, off the main thread."""
+
+    def __init__(self, names):
+        super().__init__(name="asset-loader", daemon=True)
+        self.names = names
+        self.images = {}
+        self.error = None
+
+    def run(self):
+        try:
+            self.images = decode_images(self.names)
+            load_sounds()
+        except Exception as e:
+            self.error = e
+
+    def finish(self):
+        """Wait for the loader, then publish its images on this (main) thread."""
+        self.join()
+        if self.error is not None:
+            raise self.error
+        install_images(self.images)
+        return self.images
+
+
+def start_loading():
+    loader = AssetLoader([name for name in IMAGE_SPECS if name not in MENU_IMAGES])
+    loader.start()
+    return loader
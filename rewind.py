@@ -0,0 +1,381 @@
+"""Rewind buffer: the last few seconds of game state, restorable at any frame.
+
+RewindBuffer.push(sim) after every step encodes the whole simulation state -
+clock, level, lives, scroll, wave cursor, player (position, powers,
+invulnerability), enemy/bullet/item columns, enemy fire (patterns.FireControl:
+shots, volleys in progress, the boss) and the RNG - into a compact
+little-endian binary record. Every KEYFRAME_EVERY frames the record is
+stored as a zlib-compressed keyframe; the frames in between are stored as the
+XOR of their record with the keyframe's, compressed. Most of a record doesn't
+change between frames (the RNG words only change every 624 draws, positions
+only in their low bytes), so a delta is mostly zero bytes and compresses to
+one or two hundred bytes in normal play: 30 seconds take about 0.3 MB. With
+entities dying and spawning every frame the columns no longer line up with
+the keyframe's, and deltas grow to most of a record: about 6 MB for 30 s of
+the 80-enemy 'crowd' stress scenario, 3 MB for 'item_storm'.
+
+Restoring any frame decompresses one keyframe and one delta, so it costs the
+same however far back it is (about 0.3 ms in normal play, 0.5 ms under the
+crowd), rewrites the live sprites in place (the pools cover any difference in
+count) and reschedules the pending timers from the restored state. The last
+keyframe decoded is kept, so rewinding through a segment decompresses it once.
+Segments a restore cuts off are freed one per push afterwards rather than all
+in the restoring frame.
+Snapshots are held in whole keyframe segments; the oldest segment is dropped
+once the buffer holds more than ``seconds`` of frames or ``max_bytes``. Each
+segment also keeps the compiled wave timelines of the games it covers, so
+rewinding past a restart doesn't compile the earlier game's waves again.
+
+Timers due on the same ms may fire in a different order after a restore;
+nothing in the game depends on that order.
+Only player 1 is recorded, so co-op games (netplay.py) don't rewind.
+"""
+import math
+import struct
+import time
+import zlib
+from array import array
+from collections import deque
+
+from settings import FPS, REWIND_SECONDS, TRANSITION_DURATION
+from simulation import ITEM_TYPES
+from surface_cache import INVULNERABLE_ALPHA
+import surface_cache
+
+KEYFRAME_EVERY = 60  # frames per keyframe segment
+REWIND_SPEED = 2  # snapshots stepped back per frame while rewinding (2x speed)
+RETRY_SECONDS = 3  # how far before the end an instant retry restarts
+MAX_BYTES = 16 * 1024 * 1024
+POWERS = ('fast_fire', 'multi_shot')  # Player.powers keys, in record order
+RNG_WORDS = 625  # Mersenne Twister state plus its position
+
+_FLAGS = ('game_over', 'game_win', 'level_transition')
+_STATE = struct.Struct(
+    "<I I B i I I I B B I"  # frame, wave seed, level, lives, lives lost, destroyed, required,
+                            # flags, player flags, wave cursor index
+    " i i"  # player x, y
+    " 10d"  # _REALS
+    " H B"  # which reals / real columns held ints
+    " I I I"  # enemies, bullets, items
+)
+# now, bg_y, world_y, level_transition_start, last shot, invulnerable until,
+# power expiry per POWERS, wave cursor origin, gauss_next; nan = None.
+# Some of them are ints depending on the clock and balance (bg_y is while the
+# scroll speed is); they come back with the type they went in with.
+_REALS = 10
+_NONE = float('nan')
+# (array typecode) per column, in the order enemy_columns()/bullet_columns() return them
+_ENEMY_COLUMNS = 'iibdhd'  # x, y, kind, speed, hp, spawn time
+_BULLET_COLUMNS = 'ii'
+_ITEM_COLUMNS = 'iiBdd'  # x, y, type, vy, expiry due
+_REAL_COLUMNS = (('enemies', 3), ('enemies', 5), ('items', 3), ('items', 4))
+
+
+# -------- ENCODING ----------
+def _optional(value):
+    return _NONE if value is None else value
+
+
+def encode_state(sim):
+    """The simulation state between two steps, as bytes."""
+    player = sim.player
+    version, words, gauss = sim.rng.getstate()
+    items = sim.items.sprites()
+    columns = {
+        'enemies': sim.enemy_columns(),
+        'bullets': sim.bullet_columns(),
+        'items': ([it.rect.x for it in items], [it.rect.y for it in items],
+                  [ITEM_TYPES.index(it.type) for it in items], [it.vy for it in items],
+                  [it.expiry.due for it in items]),
+    }
+    cursor = sim.wave_cursor
+    reals = (sim.now, sim.bg_y, sim.world_y, sim.level_transition_start,
+             player.last_shot_time, player.invulnerable_until,
+             *(player.powers.get(name, _NONE) for name in POWERS),
+             cursor.origin, _optional(gauss))
+    int_reals = sum(1 << i for i, value in enumerate(reals) if type(value) is int)
+    int_columns = sum(1 << i for i, (layer, col) in enumerate(_REAL_COLUMNS)
+                      if columns[layer][col] and type(columns[layer][col][0]) is int)
+    head = _STATE.pack(
+        sim.frame, sim.wave_seed, sim.level, sim.lives, sim.lives_lost,
+        sim.enemies_destroyed, sim.enemies_required,
+        sum(1 << i for i, name in enumerate(_FLAGS) if getattr(sim, name)),
+        player.show_flame | player.invulnerable << 1, cursor.index,
+        player.rect.x, player.rect.y, *reals, int_reals, int_columns,
+        len(columns['enemies'][0]), len(columns['bullets'][0]), len(items),
+    )
+    parts = [head, array('I', words).tobytes()]
+    for layer, codes in (('enemies', _ENEMY_COLUMNS), ('bullets', _BULLET_COLUMNS), ('items', _ITEM_COLUMNS)):
+        parts += [array(code, column).tobytes() for code, column in zip(codes, columns[layer])]
+    if sim.fire is not None:
+        parts.append(sim.fire.encode())
+    return b"".join(parts)
+
+
+def _columns(data, offset, codes, count):
+    columns = []
+    for code in codes:
+        column = array(code)
+        end = offset + column.itemsize * count
+        column.frombytes(data[offset:end])
+        columns.append(column)
+        offset = end
+    return columns, offset
+
+
+def restore_state(sim, data, timelines=None):
+    """Put ``sim`` back in the state encode_state() captured.
+
+    ``timelines`` maps wave seeds to compiled timelines already at hand.
+    """
+    head = _STATE.unpack_from(data)
+    (frame, wave_seed, level, lives, lives_lost, destroyed, required,
+     flags, player_flags, index, px, py) = head[:12]
+    reals = head[12:12 + _REALS]
+    int_reals, int_columns, n_enemies, n_bullets, n_items = head[12 + _REALS:]
+    if int_reals:
+        reals = [int(v) if int_reals & (1 << i) else v for i, v in enumerate(reals)]
+    (now, bg_y, world_y, transition_start, last_shot, invulnerable_until,
+     *powers, origin, gauss) = reals
+    offset = _STATE.size
+    words = array('I')
+    words.frombytes(data[offset:offset + RNG_WORDS * words.itemsize])
+    offset += RNG_WORDS * words.itemsize
+    columns = {}
+    for layer, codes, count in (('enemies', _ENEMY_COLUMNS, n_enemies), ('bullets', _BULLET_COLUMNS, n_bullets),
+                                ('items', _ITEM_COLUMNS, n_items)):
+        columns[layer], offset = _columns(data, offset, codes, count)
+    for i, (layer, col) in enumerate(_REAL_COLUMNS):
+        if int_columns & (1 << i):
+            columns[layer][col] = list(map(int, columns[layer][col]))
+
+    sim.events = []
+    sim.effects = []
+    sim.step_grid = None
+    sim.timers.clear()
+    sim.clock.now = now
+    sim.rng.setstate((3, tuple(words), None if math.isnan(gauss) else gauss))
+    sim.frame, sim.level, sim.lives, sim.lives_lost = frame, level, lives, lives_lost
+    sim.enemies_destroyed, sim.enemies_required = destroyed, required
+    for i, name in enumerate(_FLAGS):
+        setattr(sim, name, bool(flags & (1 << i)))
+    sim.bg_y, sim.world_y, sim.level_transition_start = bg_y, world_y, transition_start
+    sim.transition_timer = None
+    if sim.level_transition:
+        sim.transition_timer = sim.timers.schedule(transition_start + TRANSITION_DURATION,
+                                                   sim.end_level_transition)
+
+    if wave_seed != sim.wave_seed:
+        # restored into an earlier game: its spawns were rolled from another seed
+        sim.wave_seed = wave_seed
+        timeline = timelines.get(wave_seed) if timelines else None
+        sim.wave_cursor.timeline = timeline if timeline is not None else sim.waves.compile(wave_seed)
+    cursor = sim.wave_cursor
+    cursor.start_level(level, origin, sim.balance.enemy_spawn_interval)
+    cursor.index = index
+
+    player = sim.player
+    player.rect.topleft = (px, py)
+    player.last_shot_time = last_shot
+    player.show_flame = bool(player_flags & 1)
+    player.invulnerable = bool(player_flags & 2)
+    player.invulnerable_until = invulnerable_until
+    player.powers = {}
+    player.power_timers = {}
+    for name, until in zip(POWERS, powers):
+        if not math.isnan(until):
+            player.grant_power(name, until)
+    if player.invulnerable:
+        sim.timers.schedule(invulnerable_until, player._end_invulnerable)
+        alpha = INVULNERABLE_ALPHA if (now // 100) % 2 == 0 else 255
+        player.image = surface_cache.player_image(alpha)
+    else:
+        player.image = surface_cache.player_image()
+
+    sim.load_entities(columns['enemies'], columns['bullets'])
+    live = sim.fit_layer('items', 'item', n_items, 0, 0, ITEM_TYPES[0])
+    for it, x, y, kind, vy, due in zip(live, *columns['items']):
+        it.type = ITEM_TYPES[kind]
+        it.image = surface_cache.item_image(it.type)
+        it.rect.topleft = (x, y)
+        it.vy = vy
+        it.expiry = sim.timers.schedule(due, it.kill)
+    if sim.fire is not None:
+        sim.fire.restore(sim, data, offset)
+    if sim.interpolation:
+        # drawn where it was restored to, not blended from before the jump
+        sim.mark_positions()
+
+
+def xor_bytes(data, key):
+    """``data`` XOR the same-length prefix of ``key`` (zero-padded)."""
+    n = len(data)
+    key = key[:n]
+    return (int.from_bytes(data, 'little') ^ int.from_bytes(key, 'little')).to_bytes(n, 'little')
+
+
+# -------- BUFFER ----------
+class _Segment:
+    """One keyframe and the deltas against it, compressed, back to back in one buffer."""
+    __slots__ = ('data', 'ends', 'seeds')
+
+    def __init__(self, key):
+        self.data = bytearray(key)
+        self.ends = array('I', [len(key)])  # where each snapshot ends; the keyframe is first
+        self.seeds = set()  # wave seeds of the games it covers
+
+    def __len__(self):
+        return len(self.ends)
+
+    def append(self, blob):
+        self.data += blob
+        self.ends.append(len(self.data))
+
+    def blob(self, index):
+        return self.data[self.ends[index - 1] if index else 0:self.ends[index]]
+
+    def truncate(self, count):
+        """Keep the first ``count`` snapshots; returns the bytes freed."""
+        size = len(self.data)
+        del self.data[self.ends[count - 1]:]
+        del self.ends[count:]
+        return size - len(self.data)
+
+
+class RewindBuffer:
+    def __init__(self, seconds=REWIND_SECONDS, keyframe_every=KEYFRAME_EVERY, max_bytes=MAX_BYTES,
+                 level=1):
+        self.capacity = int(seconds * FPS)  # snapshots kept, give or take a segment
+        self.keyframe_every = keyframe_every
+        self.max_bytes = max_bytes
+        self.level = level  # zlib level
+        self.segments = deque()
+        self.key = None  # the newest segment's raw keyframe
+        self.decoded = (None, None)  # (segment, raw keyframe) of the last older segment restored from
+        self.retired = []  # segments a restore cut off, freed one per push
+        self.timelines = {}  # wave seed -> compiled timeline, for the games held
+        self.count = 0
+        self.bytes = 0
+        self.pushed = 0
+        self.restored = 0
+        self.push_seconds = 0.0
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def seconds(self):
+        """How far back the buffer reaches."""
+        return self.count / FPS
+
+    def clear(self):
+        self.segments.clear()
+        self.key = None
+        self.decoded = (None, None)
+        self.retired = []
+        self.timelines = {}
+        self.count = 0
+        self.bytes = 0
+
+    def push(self, sim):
+        """Snapshot ``sim`` after a step; the newest snapshot is ``restore(sim, 0)``."""
+        start = time.perf_counter()
+        if self.retired:
+            self.retired.pop()
+        data = encode_state(sim)
+        segment = self.segments[-1] if self.segments else None
+        if segment is None or len(segment) >= self.keyframe_every:
+            blob = zlib.compress(data, self.level)
+            segment = _Segment(blob)
+            self.segments.append(segment)
+            self.key = data
+        else:
+            blob = zlib.compress(xor_bytes(data, self.key), self.level)
+            segment.append(blob)
+        if sim.wave_seed not in segment.seeds:
+            segment.seeds.add(sim.wave_seed)
+            self.timelines[sim.wave_seed] = sim.wave_cursor.timeline
+        self.count += 1
+        self.bytes += len(blob)
+        self.pushed += 1
+        evicted = False
+        while len(self.segments) > 1 and (
+                self.count - len(self.segments[0]) >= self.capacity or self.bytes > self.max_bytes):
+            self._drop(self.segments.popleft())
+            evicted = True
+        if evicted:
+            self._prune_timelines()
+        self.push_seconds += time.perf_counter() - start
+
+    def _drop(self, segment):
+        self.count -= len(segment)
+        self.bytes -= len(segment.data)
+        if self.decoded[0] is segment:
+            self.decoded = (None, None)
+
+    def _keyframe(self, segment):
+        """The raw keyframe of ``segment``; decompressed once while rewinding through it."""
+        cached, key = self.decoded
+        if cached is not segment:
+            key = zlib.decompress(segment.blob(0))
+            self.decoded = (segment, key)
+        return key
+
+    def _prune_timelines(self):
+        held = set().union(*(segment.seeds for segment in self.segments))
+        self.timelines = {seed: t for seed, t in self.timelines.items() if seed in held}
+
+    def snapshot(self, back=0):
+        """Raw state ``back`` snapshots before the newest (clamped to the oldest held)."""
+        if not self.count:
+            return None
+        index = self.count - 1 - min(back, self.count - 1)
+        for segment in self.segments:
+            if index < len(segment):
+                key = self.key if segment is self.segments[-1] else self._keyframe(segment)
+                if not index:
+                    return key
+                return xor_bytes(zlib.decompress(segment.blob(index)), key)
+            index -= len(segment)
+
+    def restore(self, sim, back=0):
+        """Rewind ``sim`` ``back`` snapshots and drop the newer ones; False if empty.
+
+        Asking for more than the buffer holds restores the oldest snapshot.
+        """
+        if not self.count:
+            return False
+        back = min(back, self.count - 1)
+        restore_state(sim, self.snapshot(back), self.timelines)
+        self._truncate(self.count - back)
+        self.restored += 1
+        return True
+
+    def _truncate(self, count):
+        """Keep the oldest ``count`` snapshots."""
+        popped = False
+        while self.count - len(self.segments[-1]) >= count:
+            segment = self.segments.pop()
+            self._drop(segment)
+            # freeing a segment's buffer costs ~20 us; not all of them in this frame
+            self.retired.append(segment)
+            popped = True
+        drop = self.count - count
+        if drop:
+            self.bytes -= self.segments[-1].truncate(len(self.segments[-1]) - drop)
+            self.count -= drop
+        if popped:
+            # newer seeds went with the dropped segments; older ones stay
+            self.key = self._keyframe(self.segments[-1])
+            self._prune_timelines()
+
+    def stats(self):
+        return {
+            'snapshots': self.count,
+            'seconds': round(self.seconds, 1),
+            'keyframes': len(self.segments),
+            'kb': round(self.bytes / 1024, 1),
+            'pushed': self.pushed,
+            'restored': self.restored,
+            'push_us': round(self.push_seconds / max(1, self.pushed) * 1e6, 1),
+        }
@@ -0,0 +1,45 @@
+# -------- CONFIG ----------
+WIDTH, HEIGHT = 640, 800
+FPS = 60
+FRAME_MS = 1000 / FPS  # one fixed simulation tick
+
+PLAYER_SPEED = 5
+BULLET_SPEED = -10
+SCROLL_SPEED = 2
+ENEMY_SPAWN_INTERVAL = 150  # using world_y units like original; wave timelines run 1x at 150
+
+MAX_LEVEL = 5
+MAX_LIVES = 5
+
+# Item/power config
+ITEM_DROP_CHANCE = 0.30  # 30% chance to drop an item on enemy death
+POWER_DURATION_MIN = 8000  # ms
+POWER_DURATION_MAX = 10000  # ms
+
+INVULNERABLE_MS = 1200  # after the player is hit
+ITEM_LIFETIME_MS = 10000
+TRANSITION_DURATION = 2000  # ms, level start fade
+
+# Max idle sprites each pool keeps for reuse
+POOL_CAPS = {
+    'bullet': 256,
+    'enemy': 64,
+    'item': 32,
+}
+
+# Max live enemy shots; a volley past it loses its newest shots
+MAX_SHOTS = 8192
+
+# Max live particles (explosions, flame trail, pickup bursts); the oldest go first.
+# Drawing costs about 1 us a particle, so this bounds the particle pass (~0.5 ms)
+PARTICLE_BUDGET = 512
+
+# Seconds of play the rewind buffer keeps (BACKSPACE rewinds, R retries after a game over)
+REWIND_SECONDS = 30
+
+ENEMIES_REQUIRED_BASE = 5
+ENEMIES_REQUIRED_PER_LEVEL = 3
+
+
+def enemies_required_for(level, base=ENEMIES_REQUIRED_BASE, per_level=ENEMIES_REQUIRED_PER_LEVEL):
+    return base + level * per_level
@@ -0,0 +1,575 @@
+"""Headless game core.
+
+GameSimulation owns all gameplay state (level, lives, scroll position, sprite
+groups, power timers) and advances it one fixed tick at a time through
+``step(dt, inputs)``. It never touches the window, the keyboard or the wall
+clock: time comes from an injected clock and randomness from an injected RNG,
+so the same session can be replayed or run as fast as the CPU allows.
+Enemy spawns come from a compiled wave timeline (waves.py) and enemy fire
+from a pattern file (patterns.py, needs numpy; without it nobody shoots back). The rewind
+buffer (rewind.py) snapshots and restores the whole state between steps.
+With ``players=2`` a second ship (netplay.py's co-op partner) shares the
+lives and takes its own Inputs through ``step(dt, inputs, partner_inputs)``.
+With ``interpolation`` on, each step first remembers where everything was,
+and ``layer_view(layer, alpha)`` draws it between the last two ticks
+(pacing.py runs the game at a fixed tick under any display rate).
+
+    python simulation.py --frames 20000
+"""
+import argparse
+import os
+import random
+import time
+from collections import namedtuple
+
+import pygame
+
+import resources
+import surface_cache
+import collision
+from pools import SpritePool
+from timers import TimerScheduler
+from waves import WaveCursor, WaveFile, default_waves
+from settings import (
+    WIDTH, HEIGHT, FRAME_MS, SCROLL_SPEED, ENEMY_SPAWN_INTERVAL, MAX_LEVEL, MAX_LIVES,
+    ITEM_DROP_CHANCE, POWER_DURATION_MIN, POWER_DURATION_MAX, INVULNERABLE_MS,
+    ITEM_LIFETIME_MS, TRANSITION_DURATION, POOL_CAPS,
+    ENEMIES_REQUIRED_BASE, ENEMIES_REQUIRED_PER_LEVEL, enemies_required_for,
+)
+from sprites import ENEMY_TYPES, Player, Enemy, Bullet, Item, lerp
+
+try:
+    from patterns import FireControl, default_patterns
+except ImportError:  # numpy missing: enemies don't fire
+    FireControl = None
+
+ITEM_TYPES = ["health", "fast_fire", "multi_shot"]
+SCREEN_RECT = pygame.Rect(0, 0, WIDTH, HEIGHT)
+
+
+class Inputs(namedtuple("Inputs", "left right up down fire fire_pressed")):
+    """Input snapshot for one step: held arrows/space plus a space KEYDOWN."""
+    __slots__ = ()
+
+    @classmethod
+    def from_keys(cls, keys, fire_pressed=False):
+        return cls(bool(keys[pygame.K_LEFT]), bool(keys[pygame.K_RIGHT]),
+                   bool(keys[pygame.K_UP]), bool(keys[pygame.K_DOWN]),
+                   bool(keys[pygame.K_SPACE]), fire_pressed)
+
+Inputs.__new__.__defaults__ = (False,) * len(Inputs._fields)
+NO_INPUT = Inputs()
+
+
+class Balance(namedtuple("Balance", (
+        "enemy_spawn_interval scroll_speed item_drop_chance power_duration_min "
+        "power_duration_max enemies_required_base enemies_required_per_level"))):
+    """Difficulty knobs one simulation runs with; defaults come from settings."""
+    __slots__ = ()
+
+    def enemies_required(self, level):
+        return enemies_required_for(level, self.enemies_required_base, self.enemies_required_per_level)
+
+    def problems(self):
+        """What makes these knobs unplayable (a game would crash or stall); [] if nothing."""
+        found = []
+        if self.enemy_spawn_interval <= 0:
+            found.append("enemy_spawn_interval must be positive")
+        if self.scroll_speed <= 0:
+            found.append("scroll_speed must be positive")
+        if not 0 <= self.item_drop_chance <= 1:
+            found.append("item_drop_chance must be between 0 and 1")
+        if not 0 <= self.power_duration_min <= self.power_duration_max:
+            found.append(f"need 0 <= power_duration_min ({self.power_duration_min}) "
+                         f"<= power_duration_max ({self.power_duration_max})")
+        return found
+
+DEFAULT_BALANCE = Balance(
+    ENEMY_SPAWN_INTERVAL, SCROLL_SPEED, ITEM_DROP_CHANCE, POWER_DURATION_MIN,
+    POWER_DURATION_MAX, ENEMIES_REQUIRED_BASE, ENEMIES_REQUIRED_PER_LEVEL,
+)
+
+
+class SimClock:
+    """Simulation time in ms, advanced explicitly by the caller."""
+
+    def __init__(self, start=0):
+        self.now = start
+
+    def advance(self, dt):
+        self.now += dt
+        return self.now
+
+
+def init_headless():
+    """Bring pygame up on the SDL dummy driver and load images, no window."""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    # keep Ctrl-C / SIGTERM as Python signals; SDL would turn them into quit
+    # events nobody polls (and pool workers could never be terminated)
+    os.environ.setdefault("SDL_NO_SIGNAL_HANDLERS", "1")
+    pygame.display.init()
+    if pygame.display.get_surface() is None:
+        # convert()/convert_alpha() need a display surface, even a dummy one
+        pygame.display.set_mode((1, 1))
+    resources.load_images()
+    surface_cache.prebake()
+
+
+class GameSimulation:
+    def __init__(self, seed=None, clock=None, rng=None, pool_caps=None, balance=None, waves=None,
+                 players=1, patterns=None):
+        self.clock = clock if clock is not None else SimClock()
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.events = []  # names emitted during the last step (sounds, state changes)
+        self.effects = []  # (name, x, y, variant) visual effects from the last step (particles.py)
+        self.timers = TimerScheduler()  # everything that expires in sim time
+
+        self.all_sprites = pygame.sprite.Group()
+        self.enemies = pygame.sprite.Group()
+        self.bullets = pygame.sprite.Group()
+        self.items = pygame.sprite.Group()
+
+        caps = dict(POOL_CAPS, **(pool_caps or {}))
+        self.pools = {
+            'bullet': SpritePool(Bullet, caps['bullet']),
+            'enemy': SpritePool(Enemy, caps['enemy']),
+            'item': SpritePool(Item, caps['item']),
+        }
+        self.grid = collision.SpatialHash()  # enemies, rebuilt each busy step
+        self.step_grid = None
+        self.pixel_collisions = True  # mask test after the rect test; False = rects only (benchmarks)
+        self.interpolation = False  # remember last tick's positions for layer_view(layer, alpha)
+        self.phase_timer = None  # profiling.PhaseTimer; step laps update/spawn/collision/pickups
+        self.balance = balance if balance is not None else DEFAULT_BALANCE
+        self.waves = waves if waves is not None else default_waves()  # waves.WaveFile
+        self.wave_cursor = None
+        self.fire = None  # patterns.FireControl: enemy shots and the boss
+        if FireControl is not None:
+            self.fire = FireControl(patterns if patterns is not None else default_patterns())
+        self.player_count = players
+        self.player = None  # player 1, the local ship
+        self.players = []  # every ship, player 1 first
+        self.reset()
+
+    # -------- STATE ----------
+    def reset(self):
+        self.lives = MAX_LIVES
+        self.lives_lost = 0
+        self.game_over = False
+        self.game_win = False
+        self.bg_y = 0
+        self.prev_bg_y = 0
+        self.world_y = 0
+        self.level_transition = False
+        self.level_transition_start = 0
+        self.transition_timer = None
+        self.frame = 0
+
+        self.timers.clear()
+        # kill() rather than empty() so pooled sprites go back to their pools
+        for sprite in self.all_sprites.sprites():
+            sprite.kill()
+
+        self.player = Player(self)
+        self.all_sprites.add(self.player)
+        # partners aren't in all_sprites: they update with their own inputs
+        self.players = [self.player] + [Player(self) for _ in range(self.player_count - 1)]
+        if self.player_count > 1:
+            for i, player in enumerate(self.players):
+                player.rect.centerx = WIDTH * (i + 1) // (self.player_count + 1)
+
+        # random ranges in the wave file are rolled once per game, from the sim's RNG
+        self.wave_seed = self.rng.getrandbits(32)
+        self.wave_cursor = WaveCursor(self.waves.compile(self.wave_seed))
+        if self.fire is not None:
+            self.fire.reset()
+        self.start_level(1)
+
+    def start_level(self, level):
+        self.level = level
+        self.enemies_destroyed = 0
+        self.wave_cursor.start_level(level, self.world_y, self.balance.enemy_spawn_interval)
+        required = self.wave_cursor.track.enemies_required
+        self.enemies_required = required if required is not None else self.balance.enemies_required(level)
+        if self.fire is not None:
+            self.fire.start_level(level, self.now)
+
+    @property
+    def now(self):
+        return self.clock.now
+
+    @property
+    def powers(self):
+        return self.player.powers
+
+    @property
+    def finished(self):
+        return self.game_over or self.game_win
+
+    def entity_counts(self):
+        return {
+            'enemies': len(self.enemies),
+            'bullets': len(self.bullets),
+            'items': len(self.items),
+            'shots': len(self.fire.shots) if self.fire is not None else 0,
+        }
+
+    def pool_stats(self):
+        return {name: pool.stats() for name, pool in self.pools.items()}
+
+    def emit(self, name):
+        self.events.append(name)
+
+    # -------- ENTITIES ----------
+    def spawn_bullet(self, x, y):
+        bullet = self.pools['bullet'].acquire(x, y)
+        self.all_sprites.add(bullet); self.bullets.add(bullet)
+        return bullet
+
+    def spawn_enemy(self, x, y, typ=None):
+        if typ is None:
+            typ = self.rng.choice(ENEMY_TYPES)
+        enemy = self.pools['enemy'].acquire(self, x, y, typ, self.now)
+        self.all_sprites.add(enemy); self.enemies.add(enemy)
+        return enemy
+
+    def spawn_item(self, x, y, typ):
+        it = self.pools['item'].acquire(x, y, typ)
+        it.expire_after(self.timers, ITEM_LIFETIME_MS, self.now)
+        self.items.add(it); self.all_sprites.add(it)
+        return it
+
+    def lose_life(self, count=1):
+        lost = min(count, self.lives)  # what hits the last life takes nothing more
+        self.lives -= lost
+        self.lives_lost += lost
+        if self.lives <= 0:
+            self.lives = 0
+            if not self.game_over:
+                self.game_over = True
+                self.emit('game_over')
+
+    # -------- STEP ----------
+    def step(self, dt=FRAME_MS, inputs=NO_INPUT, partner_inputs=()):
+        """Advance the clock by ``dt`` ms and the world by one tick.
+
+        ``partner_inputs`` holds one Inputs per ship after player 1 (missing = idle).
+        """
+        self.events = []
+        self.effects = []
+        now = self.clock.advance(dt)
+        if self.finished:
+            return self.events
+        self.frame += 1
+        if self.interpolation:
+            self.mark_positions()
+        # powers, invulnerability, lifetimes and the level fade expire here
+        self.timers.run(now)
+
+        partners = self.players[1:]
+        if partners:
+            partner_inputs = tuple(partner_inputs) + (NO_INPUT,) * (len(partners) - len(partner_inputs))
+        if inputs.fire_pressed:
+            # For compatibility: still allow single-shot on press
+            self.player.shoot()
+        for partner, their_inputs in zip(partners, partner_inputs):
+            if their_inputs.fire_pressed:
+                partner.shoot()
+
+        timer = self.phase_timer
+        # --- UPDATE & SPAWN ---
+        self.update_entities(now, inputs)
+        for partner, their_inputs in zip(partners, partner_inputs):
+            partner.update(now, their_inputs)
+
+        scroll = self.balance.scroll_speed
+        self.bg_y += scroll
+        self.world_y += scroll
+        if timer is not None:
+            timer.lap('update')
+
+        for x, y, kind in self.wave_cursor.due(self.world_y):
+            self.spawn_enemy(x, y, ENEMY_TYPES[kind])
+        if self.fire is not None:
+            # enemy fire: patterns start, volleys go out, every shot moves
+            self.fire.update(self, now)
+        if timer is not None:
+            timer.lap('spawn')
+
+        self.collide_bullets()
+        if timer is not None:
+            timer.lap('collision')
+        self.collide_player()
+        if timer is not None:
+            timer.lap('pickups')
+        return self.events
+
+    def update_entities(self, now, inputs):
+        # items, bullets and enemies are also in all_sprites, so they advance
+        # twice per tick; the speed constants were tuned against that.
+        self.all_sprites.update(now, inputs)
+        self.items.update(now, inputs)
+        self.bullets.update(now, inputs)
+        self.enemies.update(now, inputs)
+
+    def collide_bullets(self):
+        # --- COLLISIONS & LEVEL UP ---
+        for center in self.bullet_hits():
+            self.enemy_destroyed(center)
+        boss = self.fire.boss if self.fire is not None else None
+        if boss is not None:
+            hits = self.boss_hits(boss)
+            if hits:
+                self.fire.boss_hit(self, hits)
+
+    def bullet_hits(self):
+        """Kill colliding enemies/bullets; return hit enemy centers in enemy order."""
+        grid = None
+        if len(self.enemies) * len(self.bullets) >= collision.GRID_MIN_PAIRS:
+            grid = self.grid
+            grid.rebuild(self.enemies)
+        self.step_grid = grid
+        hits = collision.groupcollide(self.enemies, self.bullets, True, True, grid, self.narrow_phase())
+        return [hit.rect.center for hit in hits]
+
+    def enemy_destroyed(self, center):
+        self.emit('explosion')
+        self.effects.append(('explosion', center[0], center[1], None))
+        self.enemies_destroyed += 1
+
+        # item drop chance
+        if self.rng.random() < self.balance.item_drop_chance:
+            typ = self.rng.choice(ITEM_TYPES)
+            self.spawn_item(center[0], center[1], typ)
+
+        if self.enemies_destroyed >= self.enemies_required:
+            # a boss level waits for its boss
+            if self.fire is None or not self.fire.holds_level(self):
+                self.finish_level()
+
+    def finish_level(self):
+        if self.level < MAX_LEVEL:
+            self.start_level(self.level + 1)
+            self.start_level_transition()
+            self.emit('level_up')
+        elif not self.game_win:
+            self.game_win = True
+            self.emit('win')
+
+    def start_level_transition(self):
+        # --- LEVEL TRANSITION (non-blocking) ---
+        self.level_transition = True
+        self.level_transition_start = self.now
+        due = self.now + TRANSITION_DURATION
+        if self.transition_timer is None or not self.timers.reschedule(self.transition_timer, due):
+            self.transition_timer = self.timers.schedule(due, self.end_level_transition)
+
+    def end_level_transition(self):
+        self.level_transition = False
+        self.transition_timer = None
+        self.emit('level_start')
+
+    def collide_player(self):
+        for player in self.players:
+            # --- PLAYER HIT ---
+            if not player.invulnerable:
+                hit_count = self.player_enemy_hits(player)
+                if hit_count:
+                    player.make_invulnerable(INVULNERABLE_MS)
+                    self.lose_life(hit_count)
+            # enemy shots: any number of them in one tick cost one life
+            if not player.invulnerable and self.fire is not None and self.fire.hit_ship(player):
+                player.make_invulnerable(INVULNERABLE_MS)
+                self.lose_life()
+
+            # --- PLAYER PICKUPS ---
+            # only a handful of items are ever alive; a plain scan beats indexing them
+            pickups = collision.spritecollide(player, self.items, True, collided=self.narrow_phase())
+            for it in pickups:
+                self.emit('pickup')
+                self.effects.append(('pickup', it.rect.centerx, it.rect.centery, it.type))
+                self.apply_item(it.type, player)
+
+    def player_enemy_hits(self, player):
+        """Kill enemies touching ``player`` and return how many there were."""
+        return len(collision.spritecollide(player, self.enemies, True, self.step_grid, self.narrow_phase()))
+
+    def narrow_phase(self):
+        return collision.collide_mask if self.pixel_collisions else None
+
+    def boss_hits(self, boss):
+        """Kill player bullets touching ``boss`` and return how many there were."""
+        return len(collision.spritecollide(boss, self.bullets, True, collided=self.narrow_phase()))
+
+    def shooters(self):
+        """Muzzles (centerx, bottom) of the enemies allowed to fire: on screen, top half."""
+        return [e.rect.midbottom for e in self.enemies if e.rect.top >= 0 and e.rect.bottom <= HEIGHT // 2]
+
+    def lowest_enemy(self):
+        """(centerx, bottom) of the enemy closest to the player, or None."""
+        target = max(self.enemies, key=lambda e: e.rect.bottom, default=None)
+        if target is None:
+            return None
+        return target.rect.centerx, target.rect.bottom
+
+    def layer_view(self, layer, alpha=1.0):
+        """On-screen (image, rect) pairs for one draw layer: enemies, items, bullets,
+        shots (enemy fire) or boss. ``alpha`` < 1 places them that far between
+        the last two ticks (with interpolation on)."""
+        if layer == 'shots':
+            if self.fire is None:
+                return []
+            image = surface_cache.shot_image()
+            xs, ys = self.fire.shots.topleft(alpha)
+            return [(image, pos) for pos in zip(xs.tolist(), ys.tolist())]
+        if layer == 'boss':
+            boss = self.fire.boss if self.fire is not None else None
+            if boss is None:
+                return []
+            return [(boss.image, boss.rect if alpha >= 1.0 else lerp(boss.prev, boss.rect.topleft, alpha))]
+        visible = SCREEN_RECT.colliderect
+        if alpha >= 1.0:
+            return [(s.image, s.rect) for s in getattr(self, layer) if visible(s.rect)]
+        return [(s.image, lerp(s.prev, s.rect.topleft, alpha)) for s in getattr(self, layer) if visible(s.rect)]
+
+    def layer_blits(self, layer, alpha=1.0, image=None, offset=(0, 0), flags=0):
+        """layer_view() as a sequence for Surface.blits. With ``image`` (moved by
+        ``offset``, blended with ``flags``) that is drawn in each entity's place
+        instead, e.g. the bullet glow. The array engine streams it."""
+        view = self.layer_view(layer, alpha)
+        if image is None:
+            return view
+        dx, dy = offset
+        return [(image, (pos[0] + dx, pos[1] + dy), None, flags) for _, pos in view]
+
+    def mark_positions(self):
+        """Remember where everything is now: layer_view(layer, alpha) blends from here."""
+        self.prev_bg_y = self.bg_y
+        for sprite in self.all_sprites:
+            sprite.prev = sprite.rect.topleft
+        for player in self.players[1:]:
+            player.prev = player.rect.topleft
+        if self.fire is not None and self.fire.boss is not None:
+            self.fire.boss.prev = self.fire.boss.rect.topleft
+
+    def scroll_at(self, alpha=1.0):
+        """bg_y ``alpha`` of the way through the last tick."""
+        if alpha >= 1.0:
+            return self.bg_y
+        return self.prev_bg_y + (self.bg_y - self.prev_bg_y) * alpha
+
+    def boss_hp(self):
+        """(hp, max hp) of the boss on screen, or None."""
+        boss = self.fire.boss if self.fire is not None else None
+        return (boss.hp, boss.max_hp) if boss is not None else None
+
+    # -------- SNAPSHOTS ----------
+    # rewind.py stores enemies and bullets as columns, in spawn order
+    def enemy_columns(self):
+        """(x, y, kind index, speed, hp, spawn time) lists, rect topleft."""
+        enemies = self.enemies.sprites()
+        return ([e.rect.x for e in enemies], [e.rect.y for e in enemies],
+                [ENEMY_TYPES.index(e.type) for e in enemies], [e.speed for e in enemies],
+                [e.hp for e in enemies], [e.spawn_time for e in enemies])
+
+    def bullet_columns(self):
+        """(x, y) lists of bullet rect topleft corners."""
+        bullets = self.bullets.sprites()
+        return [b.rect.x for b in bullets], [b.rect.y for b in bullets]
+
+    def load_entities(self, enemies, bullets):
+        """Make enemies and bullets match the rows of enemy_columns()/bullet_columns()."""
+        # the live sprites are rewritten in place (group order is spawn order);
+        # only the difference in count goes through the pools
+        live = self.fit_layer('enemies', 'enemy', len(enemies[0]), self, 0, 0, ENEMY_TYPES[0], 0)
+        for enemy, x, y, kind, speed, hp, spawn_time in zip(live, *enemies):
+            enemy.rect.topleft = (x, y)
+            enemy.type = ENEMY_TYPES[kind]
+            enemy.speed = speed
+            enemy.hp = hp
+            enemy.spawn_time = spawn_time
+        live = self.fit_layer('bullets', 'bullet', len(bullets[0]), 0, 0)
+        for bullet, x, y in zip(live, *bullets):
+            bullet.rect.topleft = (x, y)
+
+    def fit_layer(self, layer, pool, count, *args):
+        """The first ``count`` sprites of ``layer``, killing the rest or acquiring
+        more from ``pool`` (with placeholder ``args``) as needed."""
+        group = getattr(self, layer)
+        live = group.sprites()
+        for sprite in live[count:]:
+            sprite.kill()
+        if len(live) < count:
+            acquire = self.pools[pool].acquire
+            for _ in range(count - len(live)):
+                sprite = acquire(*args)
+                self.all_sprites.add(sprite); group.add(sprite)
+                live.append(sprite)
+        return live[:count]
+
+    def apply_item(self, typ, player=None):
+        if typ == "health":
+            if self.lives < MAX_LIVES:
+                self.lives += 1
+        elif typ in ("fast_fire", "multi_shot"):
+            dur = self.rng.randint(self.balance.power_duration_min, self.balance.power_duration_max)
+            (player or self.player).grant_power(typ, self.now + dur)
+
+
+ENGINES = ('sprites', 'numpy')
+
+
+def make_simulation(engine='sprites', **kwargs):
+    """GameSimulation for ``engine``; 'numpy' needs numpy (entity_engine)."""
+    if engine == 'numpy':
+        from entity_engine import ArraySimulation
+        return ArraySimulation(**kwargs)
+    if engine != 'sprites':
+        raise ValueError(f"unknown engine {engine!r}, expected one of {ENGINES}")
+    return GameSimulation(**kwargs)
+
+
+# -------- HEADLESS RUN ----------
+def autopilot(sim, player=None):
+    """Tiny scripted bot: hold fire and drift toward the lowest enemy."""
+    target = sim.lowest_enemy()
+    px = (player or sim.player).rect.centerx
+    left = right = False
+    if target is not None:
+        left = target[0] < px - 4
+        right = target[0] > px + 4
+    return Inputs(left=left, right=right, fire=True)
+
+
+def run(sim, frames, policy=autopilot, dt=FRAME_MS, restart=True):
+    """Step ``sim`` for ``frames`` ticks with no frame cap; returns elapsed seconds."""
+    start = time.perf_counter()
+    for _ in range(frames):
+        if sim.finished and restart:
+            sim.reset()
+        sim.step(dt, policy(sim))
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the game headless at full speed.")
+    parser.add_argument("--frames", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engine", choices=ENGINES, default='sprites')
+    parser.add_argument("--waves", metavar="PATH", help="wave file (default: assets/waves.json)")
+    args = parser.parse_args(argv)
+
+    init_headless()
+    waves = WaveFile.load(args.waves) if args.waves else None
+    sim = make_simulation(args.engine, seed=args.seed, waves=waves)
+    elapsed = run(sim, args.frames)
+    print(f"{args.frames} frames in {elapsed:.3f}s "
+          f"({args.frames / elapsed:.0f} frames/s), "
+          f"level {sim.level}, lives {sim.lives}")
+    print("surface cache:", surface_cache.cache.stats())
+    for name, stats in sim.pool_stats().items():
+        print(f"pool {name}:", stats)
+
+
+if __name__ == "__main__":
+    main()
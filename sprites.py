@@ -0,0 +1,228 @@
+import math
+
+import pygame
+
+import resources
+import surface_cache
+from pools import PooledSprite
+from surface_cache import INVULNERABLE_ALPHA
+from settings import WIDTH, HEIGHT, PLAYER_SPEED, BULLET_SPEED
+
+ENEMY_TYPES = ['straight', 'zigzag', 'fast']
+
+# Every sprite's update takes (now, inputs): `now` is the simulation clock in ms
+# and `inputs` the Inputs snapshot for this step. Nothing in here reads the
+# keyboard or pygame.time directly, so the same classes run headless.
+# Anything that expires (powers, invulnerability, item lifetime)
+# does so through a timer on sim.timers rather than by polling here.
+
+# -------- FUNCTIONS ----------
+def move_ship(rect, inputs):
+    """One tick of ship movement (netplay's client prediction replays it too)."""
+    if inputs.left and rect.left > 0:
+        rect.x -= PLAYER_SPEED
+    if inputs.right and rect.right < WIDTH:
+        rect.x += PLAYER_SPEED
+    if inputs.up and rect.top > HEIGHT//2:
+        rect.y -= PLAYER_SPEED
+    if inputs.down and rect.bottom < HEIGHT:
+        rect.y += PLAYER_SPEED
+
+def lerp(prev, pos, alpha):
+    """The point ``alpha`` of the way from ``prev`` to ``pos``, whole pixels."""
+    return (round(prev[0] + (pos[0] - prev[0]) * alpha), round(prev[1] + (pos[1] - prev[1]) * alpha))
+
+# -------- CLASSES ----------
+class Player(pygame.sprite.Sprite):
+    def __init__(self, sim):
+        super().__init__()
+        self.sim = sim
+        self.image = resources.player_img
+        self.rect = self.image.get_rect(midbottom=(WIDTH // 2, HEIGHT - 50))
+        self.prev = self.rect.topleft  # where it was a tick ago (GameSimulation.mark_positions)
+        self.show_flame = False
+        self.last_shot_time = 0
+        self.shoot_cooldown = 180  # ms default
+        self.powers = {}  # name -> expire_time_ms
+        self.power_timers = {}  # name -> timers.Timer
+        self.invulnerable = False
+        self.invulnerable_until = 0
+
+    def update(self, now, inputs):
+        move_ship(self.rect, inputs)
+        self.show_flame = bool(inputs.up)
+
+        # Shooting while holding space (continuous shooting)
+        cooldown = self.shoot_cooldown
+        if 'fast_fire' in self.powers:
+            cooldown = max(20, int(self.shoot_cooldown * 0.6))
+
+        if inputs.fire:
+            if now - self.last_shot_time >= cooldown:
+                self.shoot()
+                self.last_shot_time = now
+
+        # invul flicker
+        if self.invulnerable:
+            alpha = INVULNERABLE_ALPHA if (now // 100) % 2 == 0 else 255
+            self.image = surface_cache.player_image(alpha)
+
+    def grant_power(self, name, until):
+        """Power ``name`` until sim time ``until``; picking it up again moves the expiry."""
+        self.powers[name] = until
+        timer = self.power_timers.get(name)
+        if timer is None or not self.sim.timers.reschedule(timer, until):
+            self.power_timers[name] = self.sim.timers.schedule(until, self._expire_power, name)
+
+    def _expire_power(self, name):
+        del self.powers[name]
+        del self.power_timers[name]
+
+    def make_invulnerable(self, duration):
+        self.invulnerable = True
+        self.invulnerable_until = self.sim.now + duration
+        self.sim.timers.schedule(self.invulnerable_until, self._end_invulnerable)
+
+    def _end_invulnerable(self):
+        if self.sim.now < self.invulnerable_until:
+            return  # hit again meanwhile; a later timer ends it
+        self.invulnerable = False
+        self.image = surface_cache.player_image()
+
+    def shoot(self):
+        # shoot method: respects multi_shot
+        if 'multi_shot' in self.powers:
+            offsets = [-28, 0, 28]
+            for off in offsets:
+                self.sim.spawn_bullet(self.rect.centerx + off, self.rect.top)
+        else:
+            self.sim.spawn_bullet(self.rect.centerx, self.rect.top)
+        self.sim.emit('shoot')
+
+    def draw_pairs(self, alpha=1.0):
+        """(image, position) pairs the player is drawn with, ship first;
+        ``alpha`` < 1 draws it that far between the last two ticks."""
+        rect = self.rect
+        if alpha < 1.0:
+            rect = rect.copy()
+            rect.topleft = lerp(self.prev, self.rect.topleft, alpha)
+        pairs = [(self.image, rect)]
+        if self.show_flame:
+            pairs.append((surface_cache.flame_image(), (rect.centerx - 10, rect.bottom)))
+        return pairs
+
+    def draw(self, surface):
+        return surface.blits(self.draw_pairs())
+
+class Enemy(PooledSprite):
+    __slots__ = ('sim', 'hp', 'type', 'spawn_time', 'speed')
+
+    def __init__(self, sim, x, y, typ, now, pool=None):
+        super().__init__()
+        self.pool = pool
+        self.rect = pygame.Rect(0, 0, 0, 0)  # reused across recycles
+        self.reset(sim, x, y, typ, now)
+
+    def reset(self, sim, x, y, typ, now):
+        self.sim = sim
+        self.image = resources.enemy_img
+        self.rect.size = self.image.get_size()
+        self.rect.topleft = (x, y)
+        self.hp = 1
+        # give variety
+        self.type = typ
+        self.spawn_time = now
+        scroll = sim.balance.scroll_speed
+        if self.type == 'fast':
+            self.speed = scroll + 2
+        else:
+            self.speed = scroll
+
+    def update(self, now, inputs):
+        # pattern
+        if self.type == 'zigzag':
+            t = (now - self.spawn_time) / 200.0
+            self.rect.x += int(math.sin(t) * 2)
+        self.rect.y += self.speed
+        if self.rect.top > HEIGHT:
+            self.kill()
+            self.sim.lose_life()
+
+class Bullet(PooledSprite):
+    __slots__ = ()
+
+    def __init__(self, x, y, pool=None):
+        super().__init__()
+        self.pool = pool
+        self.rect = pygame.Rect(0, 0, 0, 0)  # reused across recycles
+        self.reset(x, y)
+
+    def reset(self, x, y):
+        self.image = surface_cache.bullet_image()
+        self.rect.size = self.image.get_size()
+        self.rect.midbottom = (x, y)
+
+    def update(self, now, inputs):
+        self.rect.y += BULLET_SPEED
+        if self.rect.bottom < 0:
+            self.kill()
+
+class Boss(pygame.sprite.Sprite):
+    """Level boss: drops in from the top, then sways side to side (patterns.py fires for it)."""
+    TOP = 40  # rect.top once it has entered
+    SWAY = 200  # px either side of centre
+    SWAY_MS = 1500.0  # ms per radian of sway
+
+    def __init__(self, hp, now):
+        super().__init__()
+        self.image = surface_cache.boss_image()
+        self.rect = self.image.get_rect(midbottom=(WIDTH // 2, 0))
+        self.prev = self.rect.topleft
+        self.hp = self.max_hp = hp
+        self.spawn_time = now
+
+    @property
+    def entered(self):
+        return self.rect.top >= self.TOP
+
+    def update(self, now, inputs):
+        if not self.entered:
+            self.rect.y = min(self.TOP, self.rect.y + 2)
+        self.rect.centerx = WIDTH // 2 + int(math.sin((now - self.spawn_time) / self.SWAY_MS) * self.SWAY)
+
+class TimedSprite(PooledSprite):
+    """Pooled sprite with a lifetime timer; dying early cancels the timer so it
+    can't fire on whatever the pool recycles this sprite into."""
+    __slots__ = ('expiry',)
+
+    def expire_after(self, timers, duration, now):
+        self.expiry = timers.schedule(now + duration, self.kill)
+
+    def kill(self):
+        if self.expiry is not None:
+            self.expiry.cancel()
+            self.expiry = None
+        super().kill()
+
+class Item(TimedSprite):
+    # types: health, fast_fire, multi_shot
+    __slots__ = ('type', 'vy')
+
+    def __init__(self, x, y, typ, pool=None):
+        super().__init__()
+        self.pool = pool
+        self.rect = pygame.Rect(0, 0, 0, 0)  # reused across recycles
+        self.reset(x, y, typ)
+
+    def reset(self, x, y, typ):
+        self.type = typ
+        self.image = surface_cache.item_image(typ)
+        self.rect.size = self.image.get_size()
+        self.rect.center = (x,y)
+        self.vy = 2.4
+        self.expiry = None
+
+    def update(self, now, inputs):
+        self.rect.y += self.vy
+        if self.rect.top > HEIGHT + 20:
+            self.kill()
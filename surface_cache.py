@@ -0,0 +1,207 @@
+"""Shared, pre-baked sprite surfaces.
+
+Bullets, items, the engine flame and the player's invulnerability flicker all
+used to build a fresh Surface per instance (or per frame). Every variant is
+now built once, on first use or via ``prebake()``, and handed out to every
+sprite that needs it. Cached surfaces are shared: never draw on or set_alpha a
+surface returned from here, build a new variant instead.
+
+Collision masks (collision.collide_mask) are cached the same way, one per
+image, in ``masks``.
+"""
+import os
+
+import pygame
+
+import resources
+
+ITEM_KEY_MAP = {
+    'health': 'heart',
+    'fast_fire': 'speed',
+    'multi_shot': 'energy',
+}
+ITEM_TINTS = {
+    'health': (220,40,60),
+    'fast_fire': (60,200,220),
+}
+DEFAULT_ITEM_TINT = (220,200,60)
+INVULNERABLE_ALPHA = 120
+SHOT_SIZE = 12  # enemy shot image, px square
+BOSS_SIZE = (150, 120)
+
+
+class SurfaceCache:
+    def __init__(self):
+        self.surfaces = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build, *args):
+        surf = self.surfaces.get(key)
+        if surf is None:
+            self.misses += 1
+            surf = self.surfaces[key] = build(*args)
+        else:
+            self.hits += 1
+        return surf
+
+    def clear(self):
+        # needed whenever resources.load_images() swaps the source images
+        self.surfaces.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.surfaces),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+cache = SurfaceCache()
+masks = SurfaceCache()  # image -> pygame.mask.Mask
+
+
+# -------- BUILDERS ----------
+def _build_bullet():
+    image = pygame.Surface((12, 28), pygame.SRCALPHA)
+    # Vẽ viên đạn hình elip với gradient
+    for i in range(28):
+        g = max(0, 200 - i * 6)
+        color = (255, g, 0)
+        pygame.draw.ellipse(image, color, (1, i, 10, 10))
+    # Glow effect
+    glow = pygame.Surface((24, 48), pygame.SRCALPHA)
+    pygame.draw.ellipse(glow, (255, 255, 0, 60), glow.get_rect())
+    image.blit(glow, (-6, -10))
+    return image
+
+
+def _build_item(typ):
+    # Prefer specific asset images for items (from item_images dict).
+    # Fall back to tinted bullet-shaped sprite when asset missing.
+    asset_img = resources.item_images.get(ITEM_KEY_MAP.get(typ, 'mystery'))
+    if asset_img:
+        try:
+            return pygame.transform.smoothscale(asset_img, (32, 32))
+        except Exception:
+            return asset_img.copy()
+
+    # fallback: use bullet image tinted by type
+    img_b = cache.get('bullet_png', _load_bullet_png)
+    if img_b is not False:
+        try:
+            img = pygame.transform.smoothscale(img_b, (28, 28))
+        except Exception:
+            img = img_b.copy()
+    else:
+        img = pygame.Surface((28,28), pygame.SRCALPHA)
+        pygame.draw.circle(img, (200,200,200), (14,14), 12)
+
+    tint = ITEM_TINTS.get(typ, DEFAULT_ITEM_TINT)
+    tint_surf = pygame.Surface(img.get_size(), pygame.SRCALPHA)
+    tint_surf.fill(tint + (0,))
+    img.blit(tint_surf, (0,0), special_flags=pygame.BLEND_RGB_ADD)
+    return img
+
+
+def _build_shot():
+    # enemy shot: magenta rim, white core; small enough that thousands stay readable.
+    # No soft edges, so a colorkey does instead of per-pixel alpha and RLE
+    # blits it about a quarter faster - thousands of them go out per frame
+    shot = pygame.Surface((SHOT_SIZE, SHOT_SIZE))
+    r = SHOT_SIZE // 2
+    pygame.draw.circle(shot, (255, 60, 170), (r, r), r)
+    pygame.draw.circle(shot, (255, 230, 250), (r, r), r // 2)
+    shot.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+    return shot
+
+
+def _build_boss():
+    boss = pygame.transform.smoothscale(resources.enemy_img, BOSS_SIZE)
+    boss.fill((255, 120, 120, 255), special_flags=pygame.BLEND_RGBA_MULT)
+    return boss
+
+
+def _load_bullet_png():
+    # False (not None) so a missing file is cached as a miss too
+    img = resources.safe_load_image(os.path.join(resources.ASSET_DIR, "bullet.png"))
+    return img if img is not None else False
+
+
+def _build_bullet_glow():
+    # plain RGB for BLEND_ADD: black adds nothing, so no alpha channel needed
+    glow = pygame.Surface((28, 48))
+    # nested ellipses, dim outer rim to a bright core
+    for i in range(6):
+        level = 12 + i * 10
+        pygame.draw.ellipse(glow, (level * 2, level, level // 4), glow.get_rect().inflate(-i * 4, -i * 7))
+    return glow
+
+
+def _build_flame():
+    flame = pygame.Surface((20, 30), pygame.SRCALPHA)
+    pygame.draw.polygon(flame, (255, 100, 0), [(10, 0), (0, 30), (20, 30)])
+    return flame
+
+
+def _build_player(alpha):
+    if alpha >= 255:
+        return resources.player_img
+    img = resources.player_img.copy()
+    img.set_alpha(alpha)
+    return img
+
+
+# -------- ACCESSORS ----------
+def bullet_image():
+    return cache.get('bullet', _build_bullet)
+
+
+def bullet_glow_image():
+    return cache.get('bullet_glow', _build_bullet_glow)
+
+
+def item_image(typ):
+    return cache.get(('item', typ), _build_item, typ)
+
+
+def shot_image():
+    return cache.get('shot', _build_shot)
+
+
+def boss_image():
+    return cache.get('boss', _build_boss)
+
+
+def flame_image():
+    return cache.get('flame', _build_flame)
+
+
+def player_image(alpha=255):
+    return cache.get(('player', alpha), _build_player, alpha)
+
+
+def mask(image):
+    """Collision mask of ``image`` (opaque pixels), built on first use."""
+    return masks.get(image, pygame.mask.from_surface, image)
+
+
+def prebake(item_types=('health', 'fast_fire', 'multi_shot')):
+    """(Re)build every variant from the currently loaded images.
+
+    Call after resources.load_images() so the first shot/drop doesn't pay for
+    the build, and so no variant of an older image set survives.
+    """
+    cache.clear()
+    masks.clear()
+    bullet_image()
+    bullet_glow_image()
+    flame_image()
+    shot_image()
+    boss_image()
+    player_image()
+    player_image(INVULNERABLE_ALPHA)
+    for typ in item_types:
+        item_image(typ)
@@ -0,0 +1,237 @@
+"""Difficulty sweeps: many seeded headless sessions across a process pool.
+
+Every combination of the ``--grid`` values is a configuration (a Balance);
+each configuration plays ``--sessions`` seeded games with a scripted bot, up
+to ``--max-minutes`` of game time each. Sessions are independent, so they are
+spread over a process pool in chunks and throughput scales with the cores.
+Outcomes are aggregated per configuration into a table (and optionally CSV).
+
+    python sweep.py --grid enemy_spawn_interval=100,150,200 \\
+                    --grid item_drop_chance=0.1,0.3 --sessions 200
+"""
+import argparse
+import csv
+import itertools
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+
+import simulation
+from settings import FRAME_MS, MAX_LIVES
+from simulation import DEFAULT_BALANCE, Balance
+
+SESSION_FIELDS = ('config', 'seed', 'outcome', 'level', 'lives_lost', 'pickups',
+                  'win_seconds', 'frames')
+
+
+# -------- BOTS ----------
+def collector(sim):
+    """autopilot, but steers under a falling item when one is on screen."""
+    inputs = simulation.autopilot(sim)
+    item = max(sim.items, key=lambda it: it.rect.bottom, default=None)
+    if item is None:
+        return inputs
+    px = sim.player.rect.centerx
+    return inputs._replace(left=item.rect.centerx < px - 4, right=item.rect.centerx > px + 4)
+
+
+BOTS = {
+    'autopilot': simulation.autopilot,
+    'collector': collector,
+}
+
+
+# -------- SESSIONS ----------
+def play_session(engine, balance, seed, bot, max_frames):
+    """One game from reset to win/game over (or the frame cap)."""
+    sim = simulation.make_simulation(engine, seed=seed, balance=balance)
+    policy = BOTS[bot]
+    pickups = 0
+    start = sim.now
+    for _ in range(max_frames):
+        events = sim.step(FRAME_MS, policy(sim))
+        pickups += events.count('pickup')
+        if sim.finished:
+            break
+    if sim.game_win:
+        outcome = 'win'
+    elif sim.game_over:
+        outcome = 'game_over'
+    else:
+        outcome = 'timeout'
+    return {
+        'outcome': outcome,
+        'level': sim.level,
+        'lives_lost': sim.lives_lost,
+        'pickups': pickups,
+        'win_seconds': (sim.now - start) / 1000 if sim.game_win else None,
+        'frames': sim.frame,
+    }
+
+
+def _worker_init():
+    simulation.init_headless()
+
+
+def _run_chunk(task):
+    engine, bot, max_frames, jobs = task
+    rows = []
+    for config, balance, seed in jobs:
+        row = play_session(engine, Balance(*balance), seed, bot, max_frames)
+        row['config'] = config
+        row['seed'] = seed
+        rows.append(row)
+    return rows
+
+
+# -------- GRID ----------
+def parse_grid(specs):
+    """['name=v1,v2', ...] -> {name: [values]} typed like the Balance defaults."""
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition('=')
+        name = name.strip()
+        if name not in Balance._fields or not values:
+            raise ValueError(f"bad --grid {spec!r}; knobs: {', '.join(Balance._fields)}")
+        cast = type(getattr(DEFAULT_BALANCE, name))
+        grid[name] = [cast(v) for v in values.split(',')]
+    return grid
+
+
+def configurations(grid):
+    """Every combination of the grid as a Balance; ValueError names the first
+    one a game can't run with, before anything is dispatched."""
+    names = list(grid)
+    configs = []
+    for combo in itertools.product(*(grid[n] for n in names)):
+        balance = DEFAULT_BALANCE._replace(**dict(zip(names, combo)))
+        problems = balance.problems()
+        if problems:
+            knobs = ", ".join(f"{n}={v}" for n, v in zip(names, combo))
+            raise ValueError(f"bad combination {knobs}: {'; '.join(problems)}")
+        configs.append(balance)
+    return configs
+
+
+def sweep(configs, sessions, engine='sprites', bot='autopilot', max_frames=36000,
+          seed=0, processes=None, chunk=None):
+    """Play ``sessions`` games per configuration; returns the per-session rows.
+
+    Seeds are shared across configurations (seed, seed+1, ...), so every
+    configuration faces the same sequence of games.
+    """
+    jobs = [(i, tuple(balance), seed + s) for i, balance in enumerate(configs) for s in range(sessions)]
+    processes = processes or os.cpu_count() or 1
+    if chunk is None:
+        # a few chunks per process keeps every core busy to the end
+        chunk = max(1, len(jobs) // (processes * 4))
+    tasks = [(engine, bot, max_frames, jobs[i:i + chunk]) for i in range(0, len(jobs), chunk)]
+    rows = []
+    if processes == 1:
+        _worker_init()
+        for task in tasks:
+            rows += _run_chunk(task)
+    else:
+        with multiprocessing.Pool(processes, initializer=_worker_init) as pool:
+            for chunk_rows in pool.imap_unordered(_run_chunk, tasks):
+                rows += chunk_rows
+    rows.sort(key=lambda r: (r['config'], r['seed']))
+    return rows
+
+
+def aggregate(configs, rows):
+    """One summary dict per configuration."""
+    by_config = {}
+    for row in rows:
+        by_config.setdefault(row['config'], []).append(row)
+    table = []
+    for i, balance in enumerate(configs):
+        runs = by_config.get(i, [])
+        if not runs:
+            continue
+        wins = [r['win_seconds'] for r in runs if r['outcome'] == 'win']
+        table.append({
+            'config': i,
+            **balance._asdict(),
+            'sessions': len(runs),
+            'win_rate': len(wins) / len(runs),
+            'mean_level': statistics.fmean(r['level'] for r in runs),
+            'mean_lives_lost': statistics.fmean(r['lives_lost'] for r in runs),
+            'median_win_s': statistics.median(wins) if wins else None,
+            'mean_pickups': statistics.fmean(r['pickups'] for r in runs),
+            'timeouts': sum(r['outcome'] == 'timeout' for r in runs),
+        })
+    return table
+
+
+def print_table(table, knobs):
+    cols = list(knobs) + ['sessions', 'win_rate', 'mean_level', 'mean_lives_lost',
+                          'median_win_s', 'mean_pickups', 'timeouts']
+    widths = [max(len(c), 8) for c in cols]
+    print("  ".join(c.rjust(w) for c, w in zip(cols, widths)))
+    for row in table:
+        cells = []
+        for c, w in zip(cols, widths):
+            v = row[c]
+            if v is None:
+                text = "-"
+            elif isinstance(v, float):
+                text = f"{v:.2f}"
+            else:
+                text = str(v)
+            cells.append(text.rjust(w))
+        print("  ".join(cells))
+
+
+def write_csv(path, rows, fields):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--grid", action="append", default=[], metavar="KNOB=V1,V2,...",
+                        help=f"values to sweep; knobs: {', '.join(Balance._fields)}")
+    parser.add_argument("--sessions", type=int, default=100, help="games per configuration")
+    parser.add_argument("--seed", type=int, default=0, help="first session seed")
+    parser.add_argument("--engine", choices=simulation.ENGINES, default='sprites')
+    parser.add_argument("--bot", choices=sorted(BOTS), default='autopilot')
+    parser.add_argument("--max-minutes", type=float, default=10.0, help="game time cap per session")
+    parser.add_argument("--processes", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--csv", help="write the per-configuration table here")
+    parser.add_argument("--sessions-csv", help="write every session's outcome here")
+    args = parser.parse_args(argv)
+
+    try:
+        grid = parse_grid(args.grid)
+        configs = configurations(grid)
+    except ValueError as e:
+        parser.error(str(e))
+    max_frames = int(args.max_minutes * 60000 / FRAME_MS)
+    processes = args.processes or os.cpu_count() or 1
+    total = len(configs) * args.sessions
+    print(f"{len(configs)} configurations x {args.sessions} sessions = {total} games "
+          f"on {processes} processes", file=sys.stderr)
+
+    start = time.perf_counter()
+    rows = sweep(configs, args.sessions, args.engine, args.bot, max_frames, args.seed, processes)
+    elapsed = time.perf_counter() - start
+    frames = sum(r['frames'] for r in rows)
+    print(f"{total} games, {frames} frames in {elapsed:.1f}s "
+          f"({total / elapsed:.1f} games/s, {frames / elapsed:.0f} frames/s; "
+          f"lives start at {MAX_LIVES})", file=sys.stderr)
+
+    table = aggregate(configs, rows)
+    print_table(table, grid or ['enemy_spawn_interval'])
+    if args.csv:
+        write_csv(args.csv, table, list(table[0]))
+    if args.sessions_csv:
+        write_csv(args.sessions_csv, rows, SESSION_FIELDS)
+
+
+if __name__ == "__main__":
+    main()
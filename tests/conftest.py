@@ -0,0 +1,41 @@
+import argparse
+import os
+import sys
+
+# headless: no window, no audio device, before pygame is imported anywhere
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+import simulation  # noqa: E402
+from benchmarks import stress  # noqa: E402
+from settings import FRAME_MS  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def headless():
+    simulation.init_headless()
+
+
+def stress_frames(sim, frames, scenario='crowd', enemies=80, hook_frames=None, lives=None):
+    """Step ``sim`` ``frames`` ticks under a benchmarks.stress scenario (None:
+    plain play), the autopilot flying every ship and finished games reset;
+    yields ``sim`` after each step. The scenario's hook runs for the first
+    ``hook_frames`` ticks (all of them by default); ``lives`` overrides what
+    its setup gave."""
+    hook = None
+    if scenario is not None:
+        hook = stress.SCENARIOS[scenario](sim, argparse.Namespace(enemies=enemies, seed=0, shots=0))
+    if lives is not None:
+        sim.lives = lives
+    for frame in range(frames):
+        if sim.finished:
+            sim.reset()
+        if hook is not None and (hook_frames is None or frame < hook_frames):
+            hook(sim)
+        inputs = simulation.autopilot(sim)
+        sim.step(FRAME_MS, inputs, (inputs,) * (len(sim.players) - 1))
+        yield sim
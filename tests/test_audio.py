@@ -0,0 +1,127 @@
+import pytest
+
+import audio
+import quality
+import resources
+
+
+class Tone:
+    """A stand-in Sound: only its length matters to the manager."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def get_length(self):
+        return self.seconds
+
+
+@pytest.fixture(autouse=True)
+def tone(monkeypatch):
+    monkeypatch.setattr(resources, 'tone', Tone(1.0), raising=False)
+
+
+def spec(category='fx', priority=1, merge_ms=0, min_interval_ms=0, one_shot=False):
+    return audio.SoundSpec('tone', category, priority, merge_ms, min_interval_ms, one_shot, 0.5)
+
+
+def manager(channels=None, **sounds):
+    return audio.VoiceManager(channels or {'fx': 2}, sounds)
+
+
+def playing(voices, now):
+    return sorted(v.name for v in voices.voices['fx'] if v.busy(now))
+
+
+def test_full_category_steals_lowest_priority_then_oldest():
+    voices = manager(low=spec(priority=1), mid=spec(priority=2), high=spec(priority=3))
+    assert voices.play('low', 0) and voices.play('mid', 10)
+    assert voices.play('high', 20)  # the low one goes first
+    assert playing(voices, 20) == ['high', 'mid']
+    assert not voices.play('low', 30)  # outranked by everything playing: dropped
+    assert voices.play('mid', 40)  # equal priority: the older mid goes
+    assert playing(voices, 40) == ['high', 'mid']
+    assert [v.start for v in voices.voices['fx'] if v.name == 'mid'] == [40]
+    assert voices.stats()['sounds']['low'] == {'played': 1, 'merged': 0, 'dropped': 1, 'stolen': 1}
+    assert (voices.stolen, voices.dropped) == (2, 1)
+
+
+def test_categories_do_not_steal_from_each_other():
+    voices = manager({'fx': 1, 'ui': 1}, boom=spec(priority=9), click=spec('ui'))
+    assert voices.play('click', 0)
+    assert voices.play('boom', 1) and voices.play('boom', 2)  # the second steals the first
+    assert voices.stolen == 1
+    assert [v.name for v in voices.voices['ui']] == ['click']
+
+
+def test_triggers_inside_the_merge_window_fold_into_the_voice():
+    voices = manager(boom=spec(merge_ms=40))
+    assert voices.play('boom', 0)
+    assert not voices.play('boom', 20)
+    assert not voices.play('boom', 39)
+    voice = voices.last['boom'][1]
+    assert voice.volume == pytest.approx(0.5 + 2 * audio.MERGE_GAIN)
+    assert playing(voices, 39) == ['boom']
+    assert voices.play('boom', 40)  # the window is measured from the voice's start
+    assert playing(voices, 40) == ['boom', 'boom']
+    assert (voices.played, voices.merged) == (2, 2)
+
+
+def test_merge_needs_the_voice_still_playing(monkeypatch):
+    monkeypatch.setattr(resources, 'tone', Tone(0.01))  # 10 ms long
+    voices = manager(blip=spec(merge_ms=40))
+    voices.play('blip', 0)
+    assert voices.play('blip', 20)
+
+
+def test_min_interval_drops_after_the_merge_window():
+    voices = manager(shot=spec(merge_ms=20, min_interval_ms=60))
+    assert voices.play('shot', 0)
+    assert not voices.play('shot', 10)  # merged
+    assert not voices.play('shot', 30)  # dropped
+    assert voices.play('shot', 60)
+    assert voices.stats()['sounds']['shot'] == {'played': 2, 'merged': 1, 'dropped': 1, 'stolen': 0}
+
+
+def test_one_shots_play_once_per_occasion_until_reset():
+    voices = manager(fanfare=spec(one_shot=True))
+    assert voices.play('fanfare', 0, occasion=1)
+    assert not voices.play('fanfare', 5000, occasion=1)
+    assert voices.play('fanfare', 5000, occasion=2)
+    voices.reset()
+    assert playing(voices, 5001) == []
+    assert voices.play('fanfare', 6000, occasion=1)
+
+
+def test_limit_caps_the_voices_in_use():
+    voices = manager({'fx': 4}, boom=spec())
+    voices.set_limit(2)
+    for t in range(4):
+        assert voices.play('boom', t)  # the third and fourth steal
+    assert [v.name for v in voices.voices['fx']] == ['boom', 'boom', None, None]
+    assert voices.stolen == 2
+    voices.set_limit(None)
+    assert voices.play('boom', 10) and voices.play('boom', 11)
+    assert voices.stolen == 2 and len(playing(voices, 11)) == 4
+
+
+def test_limit_left_voices_finish_but_are_not_reused():
+    voices = manager({'fx': 3}, boom=spec())
+    for t in range(3):
+        voices.play('boom', t)
+    voices.set_limit(1)
+    assert len(playing(voices, 3)) == 3
+    assert voices.play('boom', 3)
+    assert voices.voices['fx'][0].start == 3
+    assert [v.start for v in voices.voices['fx'][1:]] == [1, 2]
+
+
+def test_quality_tiers_set_the_voice_limit():
+    class Renderer:
+        def set_quality(self, tier):
+            self.tier = tier
+
+    voices = audio.VoiceManager(sounds={})
+    for tier in quality.TIERS:
+        quality.apply_tier(tier, Renderer(), voices)
+        assert voices.limit == tier.voice_limit
+    assert voices.limit == 2
@@ -0,0 +1,92 @@
+import random
+
+import pygame
+import pytest
+
+import collision
+from collision import SpatialHash
+
+
+class Box(pygame.sprite.Sprite):
+    def __init__(self, ident, rect):
+        super().__init__()
+        self.ident = ident
+        self.rect = pygame.Rect(rect)
+
+
+def boxes(rng, count, first_id, size):
+    # some partly off-screen, some straddling cells, some zero-size
+    return [Box(first_id + i, (rng.randint(-40, 520), rng.randint(-40, 720),
+                               rng.randint(0, size), rng.randint(0, size)))
+            for i in range(count)]
+
+
+def worlds(seed, enemies=120, bullets=200):
+    """Two identical (enemies, bullets) group pairs, one per implementation."""
+    rng = random.Random(seed)
+    a, b = boxes(rng, enemies, 0, 60), boxes(rng, bullets, 1000, 12)
+    twins = []
+    for _ in range(2):
+        enemy_copy = [Box(s.ident, s.rect) for s in a]
+        bullet_copy = [Box(s.ident, s.rect) for s in b]
+        twins.append((pygame.sprite.Group(enemy_copy), pygame.sprite.Group(bullet_copy)))
+    return twins
+
+
+def ids(crashed):
+    return [(a.ident, [b.ident for b in hits]) for a, hits in crashed.items()]
+
+
+def every_third(a, b):
+    return (a.ident + b.ident) % 3 != 0
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("dokilla, dokillb", [(False, False), (True, False), (False, True), (True, True)])
+@pytest.mark.parametrize("collided", [None, every_third])
+def test_groupcollide_matches_pygame(seed, dokilla, dokillb, collided):
+    (ref_a, ref_b), (grid_a, grid_b) = worlds(seed)
+    # pygame calls ``collided`` on every pair; the grid only on overlapping rects
+    reference = None if collided is None else (lambda a, b: a.rect.colliderect(b.rect) and collided(a, b))
+    expected = pygame.sprite.groupcollide(ref_a, ref_b, dokilla, dokillb, reference)
+    grid = SpatialHash()
+    grid.rebuild(grid_a)
+    got = collision.groupcollide(grid_a, grid_b, dokilla, dokillb, grid=grid, collided=collided)
+    assert ids(got) == ids(expected)
+    assert expected  # the scenario does collide
+    assert sorted(s.ident for s in grid_a) == sorted(s.ident for s in ref_a)
+    assert sorted(s.ident for s in grid_b) == sorted(s.ident for s in ref_b)
+
+
+@pytest.mark.parametrize("dokillb", [False, True])
+def test_fallthrough_with_collided_matches_pygame(dokillb):
+    (ref_a, ref_b), (plain_a, plain_b) = worlds(9)
+    expected = pygame.sprite.groupcollide(
+        ref_a, ref_b, False, dokillb, lambda a, b: a.rect.colliderect(b.rect) and every_third(a, b))
+    got = collision.groupcollide(plain_a, plain_b, False, dokillb, grid=None, collided=every_third)
+    assert ids(got) == ids(expected)
+
+
+def test_grid_skips_sprites_killed_after_rebuild():
+    (_, _), (enemies, bullets) = worlds(3)
+    grid = SpatialHash()
+    grid.rebuild(enemies)
+    first = collision.groupcollide(enemies, bullets, True, True, grid=grid)
+    assert first
+    # the same grid serves a second query in the step; the dead are filtered out
+    assert all(a.ident not in {k.ident for k in first}
+               for a in collision.groupcollide(enemies, bullets, False, False, grid=grid))
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("dokill", [False, True])
+def test_spritecollide_matches_pygame(seed, dokill):
+    rng = random.Random(seed)
+    ship = Box(-1, (rng.randint(0, 400), rng.randint(0, 600), 90, 90))
+    (ref, _), (grouped, _) = worlds(seed, enemies=300)
+    expected = pygame.sprite.spritecollide(ship, ref, dokill)
+    grid = SpatialHash()
+    grid.rebuild(grouped)
+    got = collision.spritecollide(ship, grouped, dokill, grid=grid)
+    assert [s.ident for s in got] == [s.ident for s in expected]
+    assert len(grouped) == len(ref)
@@ -0,0 +1,49 @@
+import pytest
+
+import simulation
+from conftest import stress_frames
+from entity_engine import ARRAY_MIN
+from replay import state_digest
+
+
+def lockstep(frames, hook_frames=0, seed=3, **numpy_kwargs):
+    """Run both engines on the same inputs; the frame they first differ on, or None.
+
+    For the first ``hook_frames`` frames the 'crowd' scenario keeps 200
+    enemies on screen, then they are left to the autopilot."""
+    sims = [simulation.make_simulation('sprites', seed=seed),
+            simulation.make_simulation('numpy', seed=seed, **numpy_kwargs)]
+    scenario = 'crowd' if hook_frames else None
+    runs = [stress_frames(sim, frames, scenario, enemies=200, hook_frames=hook_frames) for sim in sims]
+    for frame, _ in enumerate(zip(*runs)):
+        if state_digest(sims[0]) != state_digest(sims[1]):
+            return frame, sims[1]
+    return None, sims[1]
+
+
+@pytest.mark.parametrize("array_min", [0, ARRAY_MIN])
+def test_normal_play_matches_sprites(array_min):
+    diverged, _ = lockstep(1500, array_min=array_min)
+    assert diverged is None
+
+
+def test_arrays_at_any_count_stay_in_the_arrays():
+    _, arrays = lockstep(300, hook_frames=150, array_min=0)
+    assert arrays.vectorized and arrays.switches == 0
+
+
+def test_crowd_switches_both_ways_in_lockstep():
+    diverged, arrays = lockstep(1200, hook_frames=300)
+    assert diverged is None
+    # up to the arrays under the crowd, back to sprites once it thins out
+    assert arrays.switches >= 2
+    assert not arrays.vectorized
+
+
+def test_small_counts_stay_on_sprites():
+    sim = simulation.make_simulation('numpy', seed=3)
+    for _ in range(ARRAY_MIN // 2):
+        sim.spawn_bullet(300, 700)
+    sim.step(inputs=simulation.NO_INPUT)
+    assert not sim.vectorized
+    assert len(sim.bullets) == ARRAY_MIN // 2
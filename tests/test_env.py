@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+import env
+
+STEPS = 120
+
+
+def actions(rng, num_envs):
+    return rng.integers(0, env.N_ACTIONS, num_envs)
+
+
+def run(vec, steps=STEPS):
+    rng = np.random.default_rng(0)
+    frames = [vec.reset().copy()]
+    for _ in range(steps):
+        obs, rewards, terminated, truncated, infos = vec.step(actions(rng, vec.num_envs))
+        frames.append((obs.copy(), rewards.copy(), terminated.copy(), truncated.copy(), list(infos)))
+    vec.close()
+    return frames
+
+
+def test_one_worker_matches_sync():
+    """Same seeds in the same order: rows, rewards, flags and final infos agree,
+    across the auto-resets that max_steps forces."""
+    sync = run(env.SyncVecEnv(4, seed=5, max_steps=50))
+    sub = run(env.SubprocVecEnv(4, workers=1, seed=5, max_steps=50))
+    assert np.array_equal(sync[0], sub[0])
+    ended = 0
+    for a, b in zip(sync[1:], sub[1:]):
+        for x, y in zip(a[:4], b[:4]):
+            assert np.array_equal(x, y)
+        assert a[4] == b[4]
+        ended += sum(1 for info in a[4] if info)
+    assert ended == 8  # every env truncated at steps 50 and 100
+    info = sub[50][4][0]
+    assert set(info) == set(env.INFO_FIELDS) and info['frames'] == 50 and info['win'] is False
+
+
+@pytest.mark.parametrize("workers", [2, 3])
+def test_every_row_steps_once_per_step(workers):
+    """Each worker steps its own rows exactly once: every row matches a lone
+    GameEnv reset with the seed that worker hands it."""
+    num_envs = 6
+    frames = run(env.SubprocVecEnv(num_envs, workers=workers, seed=0), steps=40)
+    rng = np.random.default_rng(0)
+    steps = [actions(rng, num_envs) for _ in range(40)]
+    for w in range(workers):
+        rows = range(w * num_envs // workers, (w + 1) * num_envs // workers)
+        for k, row in enumerate(rows):
+            lone = env.GameEnv()
+            obs, _ = lone.reset(seed=w + k * workers)
+            assert np.array_equal(frames[0][row], obs)
+            for t, acts in enumerate(steps, 1):
+                obs, reward, *_ = lone.step(acts[row])
+                assert np.array_equal(frames[t][0][row], obs), (row, t)
+                assert frames[t][1][row] == np.float32(reward)
+
+
+def test_close_twice_is_harmless():
+    vec = env.SubprocVecEnv(2, workers=2)
+    vec.reset()
+    vec.close()
+    vec.close()
+    assert all(not proc.is_alive() for proc in vec.procs)
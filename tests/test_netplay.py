@@ -0,0 +1,124 @@
+import threading
+import time
+import zlib
+
+import pytest
+
+import netplay
+import simulation
+from conftest import stress_frames
+from rewind import xor_bytes
+from settings import FRAME_MS, MAX_LIVES
+from simulation import ITEM_TYPES
+
+
+class ListChannel:
+    """A channel that keeps what is sent to it."""
+
+    closed = False
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, msg):
+        self.sent.append(msg)
+
+
+def crowded(engine, frames, scenario='crowd'):
+    """A seeded two-player stress scenario, with lives the snapshot can carry."""
+    sim = simulation.make_simulation(engine, seed=0, players=2)
+    return stress_frames(sim, frames, scenario, lives=MAX_LIVES)
+
+
+def columns(view):
+    return [[int(pos[0]) for _, pos in view], [int(pos[1]) for _, pos in view]]
+
+
+@pytest.mark.parametrize("engine", simulation.ENGINES)
+@pytest.mark.parametrize("scenario", ['crowd', 'boss'])
+def test_snapshot_decodes_to_what_the_sim_shows(engine, scenario):
+    seen = set()
+    for sim in crowded(engine, 300, scenario):
+        view = netplay.SnapshotView(netplay.encode_snapshot(sim), len(sim.players))
+        for name in ('frame', 'now', 'level', 'lives', 'enemies_destroyed', 'enemies_required',
+                     'game_over', 'game_win', 'level_transition', 'level_transition_start'):
+            assert getattr(view, name) == getattr(sim, name), name
+        assert view.bg_y == int(sim.bg_y)
+        for (x, y, flags, left), player in zip(view.ships, sim.players):
+            assert (x, y) == player.rect.topleft
+            assert bool(flags & netplay._FLAME) == bool(player.show_flame)
+            assert bool(flags & netplay._INVULNERABLE) == bool(player.invulnerable)
+            assert set(left) <= set(player.powers)
+        assert [list(c) for c in view.enemies] == columns(sim.layer_view('enemies'))
+        assert [list(c) for c in view.bullets] == columns(sim.layer_view('bullets'))
+        assert [list(c) for c in view.shots] == columns(sim.layer_view('shots'))
+        items = [it for it in sim.items if simulation.SCREEN_RECT.colliderect(it.rect)]
+        assert list(zip(*view.items)) == [(it.rect.x, it.rect.y, ITEM_TYPES.index(it.type)) for it in items]
+        assert view.effects == [(name, int(x), int(y), variant) for name, x, y, variant in sim.effects]
+        assert view.events == [name for name in sim.events if name in netplay.EVENTS]
+        boss = sim.layer_view('boss')
+        assert view.boss == ((boss[0][1].x, boss[0][1].y) + sim.boss_hp() if boss else None)
+        seen.update(name for name in ('enemies', 'bullets', 'shots') if getattr(view, name)[0])
+        seen.update(name for name in ('effects', 'boss') if getattr(view, name))
+    assert seen >= ({'enemies', 'bullets', 'effects'} if scenario == 'crowd' else {'shots', 'boss'})
+
+
+def test_deltas_rebuild_every_snapshot():
+    """Acks arrive late and some snapshots are lost: each datagram still
+    decodes, against the baseline it names, to exactly what was encoded."""
+    session = netplay.Session(ListChannel(), None)
+    received = {}  # tick -> body, what the client holds
+    deltas = 0
+    for t, sim in enumerate(crowded('sprites', 200), 1):
+        session.sim = sim
+        expected = netplay.encode_snapshot(sim)
+        session.send_snapshot()
+        msg = session.channel.sent[-1]
+        if t % 5 == 0:
+            continue  # lost on the way
+        _, tick, baseline, _ = netplay._SNAPSHOT.unpack_from(msg)
+        body = zlib.decompress(msg[netplay._SNAPSHOT.size:])
+        if baseline:
+            body = xor_bytes(body, received[baseline])
+            deltas += 1
+        assert tick == t and body == expected
+        received[tick] = body
+        if t % 3 == 0:
+            # the client acks what it holds; the ack lands a couple of ticks late
+            session.acked = max(k for k in received if k <= t - 2)
+    assert deltas > 100
+    assert session.full_snapshots < 5
+
+
+@pytest.mark.parametrize("transport", netplay.TRANSPORTS)
+def test_client_follows_the_host(transport):
+    sim = simulation.make_simulation('sprites', seed=0, players=2)
+    host = netplay.Host(0, transport, sim=sim)
+    box = {}
+    joining = threading.Thread(target=lambda: box.setdefault(
+        'client', netplay.Client(('127.0.0.1', host.port), transport, timeout=5)))
+    joining.start()
+    while joining.is_alive():
+        host.poll()
+        time.sleep(0.005)
+    client = box['client']
+    try:
+        sent = {}
+        for tick in range(1, 121):
+            host.poll()
+            partners, _ = host.partner_inputs()
+            sim.step(FRAME_MS, simulation.autopilot(sim), partners)
+            host.send_snapshots()
+            sent[tick] = netplay.encode_snapshot(sim)
+            deadline = time.monotonic() + 1
+            while client.tick < tick and time.monotonic() < deadline:
+                client.step(FRAME_MS, simulation.NO_INPUT)
+            assert client.tick == tick
+            assert client.history[tick] == sent[tick]
+            assert (client.frame, client.level, client.lives) == (sim.frame, sim.level, sim.lives)
+            assert client.players[0].rect.topleft == sim.players[0].rect.topleft
+            assert len(client.layer_view('enemies')) == len(sim.layer_view('enemies'))
+        assert host.stats()['full_snapshots'] < 10  # the rest went out as deltas
+    finally:
+        client.close()
+        host.close()
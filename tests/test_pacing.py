@@ -0,0 +1,60 @@
+import pytest
+
+from pacing import FramePacer
+from settings import FPS, FRAME_MS
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def frames(pacer, clock, count, work_s=0.002, jitter_s=0.0):
+    """``count`` frames one display period apart (give or take ``jitter_s``,
+    alternating), each busy for ``work_s``; (ticks, alpha) per frame."""
+    out = []
+    start = clock.now
+    for i in range(count):
+        clock.now = start + i * pacer.period + (jitter_s if i % 2 else -jitter_s)
+        pacer.wait()
+        out.append((pacer.ticks(), pacer.alpha))
+        clock.now += work_s
+        pacer.presented()
+    clock.now = start + count * pacer.period
+    return out
+
+
+def test_tick_rate_display_runs_in_lockstep():
+    clock = Clock()
+    pacer = FramePacer(FPS, clock=clock, limit=False)
+    assert pacer.lockstep
+    run = frames(pacer, clock, 600, jitter_s=0.0004)
+    assert run == [(1, 1.0)] * 600  # jitter neither skips nor doubles a tick
+    stats = pacer.stats()
+    assert stats['interp_delay_ms'] == 0
+    assert stats['input_ms'] == pytest.approx(2.0)
+
+
+def test_lockstep_still_catches_up_after_a_stall():
+    clock = Clock()
+    pacer = FramePacer(FPS, clock=clock, limit=False)
+    frames(pacer, clock, 10)
+    clock.now += 3 * FRAME_MS / 1000  # a hitch: three ticks late
+    run = frames(pacer, clock, 60)
+    assert sum(ticks for ticks, _ in run) == 63
+    assert all(alpha == 1.0 for _, alpha in run)
+
+
+def test_faster_display_interpolates_and_counts_the_delay():
+    clock = Clock()
+    pacer = FramePacer(144, clock=clock, limit=False)
+    assert not pacer.lockstep
+    run = frames(pacer, clock, 1440)
+    assert sum(ticks for ticks, _ in run) == pytest.approx(600, abs=1)
+    assert len({round(alpha, 3) for _, alpha in run}) > 5
+    stats = pacer.stats()
+    assert stats['interp_delay_ms'] > 0
+    assert stats['input_ms'] == pytest.approx(2.0 + stats['interp_delay_ms'], abs=0.01)
@@ -0,0 +1,19 @@
+import particles
+from settings import PARTICLE_BUDGET
+
+
+def test_explosion_bursts_scale_with_density():
+    for density, expected in ((1.0, 16), (0.5, 8), (0.25, 4)):
+        system = particles.ParticleSystem(density=density, seed=0)
+        system.emit_effects([('explosion', 100, 100, None)])
+        assert len(system) == expected
+
+
+def test_budget_bounds_the_live_particles():
+    system = particles.ParticleSystem(seed=0)
+    for _ in range(120):  # four kills and a pickup every frame, for two seconds
+        system.emit_effects([('explosion', 100, 100, None)] * 4 + [('pickup', 50, 50, 'health')])
+        system.update(16)
+        assert len(system) <= PARTICLE_BUDGET
+    assert len(system) == PARTICLE_BUDGET
+    assert system.evicted > 0
@@ -0,0 +1,70 @@
+import pygame
+
+from pools import SpritePool
+from settings import FRAME_MS, ITEM_LIFETIME_MS
+from simulation import NO_INPUT, GameSimulation, autopilot
+from sprites import Bullet
+
+
+def test_killed_sprite_is_handed_back_rearmed():
+    pool = SpritePool(Bullet, cap=4)
+    group = pygame.sprite.Group()
+    first = pool.acquire(100, 200)
+    group.add(first)
+    first.kill()
+    second = pool.acquire(30, 40)
+    assert second is first
+    assert second.rect.midbottom == (30, 40)
+    assert second.prev == second.rect.topleft
+    assert pool.stats()['created'] == 1 and pool.stats()['reused'] == 1
+
+
+def test_double_kill_releases_once():
+    pool = SpritePool(Bullet)
+    bullet = pool.acquire(0, 0)
+    pygame.sprite.Group(bullet)
+    bullet.kill()
+    bullet.kill()
+    assert pool.stats()['released'] == 1
+    assert len(pool.free) == 1
+
+
+def test_free_list_stops_at_cap():
+    pool = SpritePool(Bullet, cap=2)
+    group = pygame.sprite.Group(pool.acquire(0, 0) for _ in range(5))
+    for bullet in group.sprites():
+        bullet.kill()
+    stats = pool.stats()
+    assert stats['free'] == 2 and stats['discarded'] == 3 and stats['in_use'] == 0
+
+
+def test_in_use_matches_live_sprites_during_play():
+    sim = GameSimulation(seed=1)
+    for _ in range(3000):
+        if sim.finished:
+            sim.reset()
+        sim.step(FRAME_MS, autopilot(sim))
+        stats = sim.pool_stats()
+        assert stats['bullet']['in_use'] == len(sim.bullets)
+        assert stats['enemy']['in_use'] == len(sim.enemies)
+        assert stats['item']['in_use'] == len(sim.items)
+    assert stats['bullet']['reused'] > stats['bullet']['created']
+
+
+def test_recycled_item_outlives_the_old_timer():
+    sim = GameSimulation(seed=1)
+    sim.lives = 10**6  # an idle ship gets hit; a finished game stops the clock's timers
+    killed_at = sim.now
+    item = sim.spawn_item(20, 20, 'health')
+    item.kill()  # picked up early: its expiry must not kill what it becomes
+    sim.step(FRAME_MS, NO_INPUT)
+    again = sim.spawn_item(20, 20, 'health')
+    assert again is item
+    again.vy = 0  # stay on screen, out of the ship's way
+    respawned_at = sim.now
+    while sim.now < killed_at + ITEM_LIFETIME_MS:
+        sim.step(FRAME_MS, NO_INPUT)
+    assert again.alive()
+    while sim.now < respawned_at + ITEM_LIFETIME_MS:
+        sim.step(FRAME_MS, NO_INPUT)
+    assert not again.alive()
@@ -0,0 +1,74 @@
+import quality
+from settings import FRAME_MS
+
+# render ms per tier on a made-up machine: each tier saves a little
+COSTS = {tier.name: 6.0 - 0.5 * i for i, tier in enumerate(quality.TIERS)}
+
+
+def drive(governor, work_ms, frames, costs=COSTS, clock=None):
+    """Feed ``frames`` frames of ``work_ms`` plus the current tier's cost."""
+    for _ in range(frames):
+        if clock is not None:
+            clock[0] += FRAME_MS / 1000
+        governor.observe(work_ms + costs[governor.tier.name])
+
+
+def governor(**kwargs):
+    clock = [0.0]
+    return quality.QualityGovernor(clock=lambda: clock[0], log=None, **kwargs), clock
+
+
+def test_recovers_to_full_when_it_fits_under_the_degrade_bar():
+    """Full at 70% of the budget: over RECOVER_AT, but the step costs measured
+    on the way down say it fits, so the spike doesn't cost it for good."""
+    gov, clock = governor()
+    drive(gov, FRAME_MS * 0.75 - COSTS['full'], 600, clock=clock)
+    assert gov.tier.name == 'full'
+    drive(gov, FRAME_MS - COSTS['full'], 600, clock=clock)
+    low = gov.index
+    assert low >= 2
+    assert all(cost == 0.5 for cost in gov.step_cost[:low])
+    drive(gov, FRAME_MS * 0.7 - COSTS['full'], 3000, clock=clock)
+    assert gov.tier.name == 'full'
+    assert [c[3] for c in gov.changes[-low:]] == list(range(low - 1, -1, -1))
+
+
+def test_stays_down_while_the_tier_above_would_overload():
+    gov, clock = governor()
+    drive(gov, FRAME_MS - COSTS['full'], 600, clock=clock)
+    low = gov.index
+    # the tier above would land at 92% of the budget: over DEGRADE_AT
+    drive(gov, FRAME_MS * 0.92 - COSTS[quality.TIERS[low - 1].name], 3000, clock=clock)
+    assert gov.index == low
+
+
+def test_unmeasured_tier_waits_for_recover_at():
+    gov, clock = governor(start=3)
+    assert gov.step_cost[2] is None
+    drive(gov, FRAME_MS * 0.65 - COSTS['no-flame'], 2000, clock=clock)
+    assert gov.index == 3
+    drive(gov, FRAME_MS * 0.5 - COSTS['no-flame'], quality.COOLDOWN + quality.RECOVER_FRAMES, clock=clock)
+    assert gov.index == 2
+    drive(gov, FRAME_MS * 0.5 - COSTS['no-flame'], quality.COOLDOWN, clock=clock)
+    # the step was measured on the way up: the next one can use it too
+    assert gov.step_cost[2] == 0.5
+
+
+def test_relapse_doubles_the_wait():
+    gov, clock = governor()
+    edge = FRAME_MS * 0.92 - COSTS['full']  # full just over the bar, no-glow just under
+    drive(gov, edge, 2 * quality.COOLDOWN, clock=clock)
+    assert gov.index == 1 and gov.step_cost[0] == 0.5
+    drive(gov, FRAME_MS * 0.7 - COSTS['full'], 600, clock=clock)
+    assert gov.index == 0
+    drive(gov, edge, quality.COOLDOWN, clock=clock)  # right back over
+    assert gov.index == 1
+    assert gov.recover_frames[0] == 2 * quality.RECOVER_FRAMES
+
+
+def test_a_step_that_costs_more_is_undone():
+    costs = dict(COSTS, **{'no-glow': COSTS['full'] + 2})
+    gov, clock = governor()
+    drive(gov, FRAME_MS - costs['full'], 3 * quality.COOLDOWN, costs=costs, clock=clock)
+    assert gov.index == 0 and gov.ceiling == 0
+    assert [(c[2], c[3]) for c in gov.changes] == [(0, 1), (1, 0)]
@@ -0,0 +1,55 @@
+import pygame
+import pytest
+
+import render
+import simulation
+from settings import WIDTH, HEIGHT
+
+
+@pytest.fixture
+def screens():
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    return [pygame.Surface((WIDTH, HEIGHT)).convert() for _ in range(3)]
+
+
+def pixels(surface):
+    return pygame.image.tobytes(surface, 'RGB')
+
+
+@pytest.mark.parametrize("engine", simulation.ENGINES)
+def test_dirty_updates_show_the_full_repaint(screens, engine):
+    """What the dirty renderer pushes to the window matches a full repaint at
+    the same background step, frame after frame."""
+    sim = simulation.make_simulation(engine, seed=0)
+    full_screen, dirty_screen, shown = screens
+    full, dirty = render.FullRenderer(full_screen), render.DirtyRenderer(dirty_screen)
+    full.scroll_step = dirty.scroll_step
+    for renderer in (full, dirty):
+        renderer.particles = None  # their random spread isn't the point here
+    partial = 0
+    for frame in range(400):
+        if sim.finished:
+            sim.reset()
+        sim.step(inputs=simulation.autopilot(sim))
+        full.game(sim)
+        dirty.game(sim)
+        if dirty.updated is None:
+            shown.blit(dirty_screen, (0, 0))
+        else:
+            partial += 1
+            for r in dirty.updated:
+                shown.blit(dirty_screen, r, r)
+        assert pixels(shown) == pixels(full_screen), f"frame {frame}"
+    assert partial > 0
+
+
+def test_only_background_steps_push_the_screen(screens):
+    sim = simulation.make_simulation('sprites', seed=0)
+    dirty = render.DirtyRenderer(screens[0])
+    frames, full = 240, 0
+    for _ in range(frames):
+        sim.step(inputs=simulation.autopilot(sim))
+        dirty.game(sim)
+        full += dirty.updated_area == WIDTH * HEIGHT
+    # one step every DIRTY_SCROLL_STEP / SCROLL_SPEED frames, plus the first
+    assert full <= frames // 4 + 1
@@ -0,0 +1,12 @@
+import simulation
+
+
+def test_lives_lost_counts_only_lives_taken():
+    sim = simulation.make_simulation('sprites', seed=0)
+    sim.lives = 2
+    sim.lose_life(5)
+    assert (sim.lives, sim.lives_lost, sim.game_over) == (0, 2, True)
+    assert sim.events.count('game_over') == 1
+    sim.lose_life()
+    assert (sim.lives, sim.lives_lost) == (0, 2)
+    assert sim.events.count('game_over') == 1
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from benchmarks import stress
+
+QUICK = ['--scenarios', 'crowd', '--frames', '5', '--warmup', '0', '--enemies', '10']
+
+
+@pytest.fixture
+def baseline(tmp_path):
+    path = tmp_path / "baseline.json"
+    stress.main(QUICK + ['--out', str(path)])
+    return path
+
+
+def test_mismatched_baseline_is_refused_before_running(baseline, capsys, monkeypatch):
+    ran = []
+    monkeypatch.setattr(stress, 'run_scenario', lambda *args: ran.append(args))
+    with pytest.raises(SystemExit) as exit_info:
+        stress.main(QUICK + ['--engine', 'numpy', '--compare', str(baseline)])
+    assert exit_info.value.code == 2
+    assert "engine 'sprites' vs 'numpy'" in capsys.readouterr().out
+    assert not ran
+
+
+def test_mismatch_can_be_allowed(baseline, capsys):
+    stress.main(QUICK + ['--seed', '1', '--compare', str(baseline), '--allow-mismatch',
+                         '--threshold', '1000'])
+    out = capsys.readouterr().out
+    assert "warning: comparing across different run parameters: seed 0 vs 1" in out
+    assert "no regressions" in out
+
+
+def test_host_differences_only_warn(baseline, capsys):
+    data = json.loads(baseline.read_text())
+    data['meta']['machine'] = 'pdp11'
+    del data['meta']['shots']  # an older baseline
+    baseline.write_text(json.dumps(data))
+    stress.main(QUICK + ['--compare', str(baseline), '--threshold', '1000'])
+    out = capsys.readouterr().out
+    assert "baseline has no shots" in out
+    assert "baseline ran on machine 'pdp11'" in out
+    assert "no regressions" in out
@@ -0,0 +1,26 @@
+import re
+
+import pytest
+
+import sweep
+
+
+@pytest.mark.parametrize("grid, message", [
+    (['power_duration_max=1000'], r"power_duration_max=1000: need 0 <= power_duration_min \(8000\)"),
+    (['enemy_spawn_interval=150,0'], "enemy_spawn_interval=0: enemy_spawn_interval must be positive"),
+    (['scroll_speed=2,-1', 'item_drop_chance=0.1'], "scroll_speed=-1, item_drop_chance=0.1"),
+    (['item_drop_chance=1.5'], "between 0 and 1"),
+])
+def test_bad_combinations_are_refused_before_dispatch(grid, message, capsys, monkeypatch):
+    monkeypatch.setattr(sweep, 'sweep', lambda *args: pytest.fail("dispatched"))
+    with pytest.raises(SystemExit) as exit_info:
+        sweep.main(sum((['--grid', g] for g in grid), []) + ['--sessions', '1'])
+    assert exit_info.value.code == 2
+    assert re.search(message, capsys.readouterr().err)
+
+
+def test_good_grid_expands_every_combination():
+    configs = sweep.configurations(sweep.parse_grid(['power_duration_min=1000,2000', 'scroll_speed=1,2,3']))
+    assert len(configs) == 6
+    assert {(c.power_duration_min, c.scroll_speed) for c in configs} == {(m, s) for m in (1000, 2000) for s in (1, 2, 3)}
+    assert all(not c.problems() for c in configs)
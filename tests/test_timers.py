@@ -0,0 +1,130 @@
+from timers import TimerScheduler
+
+
+def recorder():
+    fired = []
+    return fired, fired.append
+
+
+def test_fires_in_due_order_ties_in_scheduling_order():
+    timers = TimerScheduler()
+    fired, note = recorder()
+    for due, name in ((30, 'c'), (10, 'a'), (30, 'd'), (20, 'b')):
+        timers.schedule(due, note, name)
+    timers.run(5)
+    assert fired == []
+    timers.run(30)
+    assert fired == ['a', 'b', 'c', 'd']
+    assert len(timers) == 0 and timers.fired == 4
+
+
+def test_cancel_is_lazy_and_idempotent():
+    timers = TimerScheduler()
+    fired, note = recorder()
+    keep = timers.schedule(10, note, 'keep')
+    gone = timers.schedule(5, note, 'gone')
+    gone.cancel()
+    gone.cancel()
+    timers.cancel(gone)
+    assert len(timers) == 1 and len(timers.heap) == 2  # the entry stays until it surfaces
+    assert timers.stats()['cancelled'] == 1
+    timers.run(10)
+    assert fired == ['keep']
+    assert not keep.active and not gone.active
+    keep.cancel()  # after firing: nothing to do
+    assert len(timers) == 0 and timers.stats()['cancelled'] == 1
+
+
+def test_reschedule_moves_the_timer_and_skips_the_old_entry():
+    timers = TimerScheduler()
+    fired, note = recorder()
+    later = timers.schedule(10, note, 'extended')
+    sooner = timers.schedule(50, note, 'shortened')
+    assert timers.reschedule(later, 40)
+    assert timers.reschedule(sooner, 20)
+    timers.run(15)
+    assert fired == []  # the entry at 10 is stale
+    timers.run(20)
+    assert fired == ['shortened']
+    timers.run(100)
+    assert fired == ['shortened', 'extended']
+    assert not timers.reschedule(later, 200)  # already fired
+    timers.run(1000)
+    assert fired == ['shortened', 'extended'] and len(timers) == 0
+
+
+def test_cancelled_entry_never_fires_after_its_slot_is_reused():
+    """Compaction rebuilds the heap, so new timers land in the slots stale
+    entries held; none of the cancelled ones may come back."""
+    timers = TimerScheduler()
+    fired, note = recorder()
+    first = timers.schedule(10, note, 'first')
+    first.cancel()
+    timers.run(10)  # pops the stale entry; the next timer takes its slot
+    timers.schedule(10, note, 'second')
+    assert timers.heap[0][2] is not first
+    assert not timers.reschedule(first, 10)
+    timers.run(10)
+    assert fired == ['second']
+    fired.clear()
+
+    cancelled = [timers.schedule(100 + i, note, ('old', i)) for i in range(100)]
+    for timer in cancelled:
+        timer.cancel()
+    assert len(timers.heap) <= 64  # compacted once stale entries outnumbered live ones
+    fresh = [timers.schedule(100 + i, note, ('new', i)) for i in range(100)]
+    for timer in cancelled:
+        assert not timers.reschedule(timer, 150)
+    timers.run(1000)
+    assert fired == [('new', i) for i in range(100)]
+    assert all(not t.active for t in fresh)
+
+
+def test_reschedules_keep_the_heap_bounded():
+    timers = TimerScheduler()
+    fired, note = recorder()
+    power = timers.schedule(100, note, 'power')
+    for due in range(101, 2000):
+        timers.reschedule(power, due)  # a power picked up again every frame
+        assert len(timers.heap) <= 65
+    timers.run(1998)
+    assert fired == []
+    timers.run(1999)
+    assert fired == ['power']
+
+
+def test_a_callback_may_cancel_and_compact_mid_run():
+    timers = TimerScheduler()
+    fired, note = recorder()
+    victims = [timers.schedule(10, note, ('victim', i)) for i in range(80)]
+
+    def cull():
+        fired.append('cull')
+        for timer in victims:
+            timer.cancel()
+
+    timers.schedule(5, cull)
+    timers.schedule(10, note, 'survivor')
+    timers.schedule(5, timers.schedule, 10, note, 'scheduled by a callback')
+    timers.run(10)
+    assert fired == ['cull', 'survivor', 'scheduled by a callback']
+    assert len(timers) == 0
+
+
+def test_clear_disarms_everything_and_the_scheduler_carries_on():
+    timers = TimerScheduler()
+    fired, note = recorder()
+    old = [timers.schedule(10 * i, note, ('old', i)) for i in range(100)]
+    for timer in old[::2]:
+        timer.cancel()
+    timers.clear()
+    assert timers.heap == [] and len(timers) == 0
+    assert all(not t.active for t in old)
+    for timer in old:
+        timer.cancel()  # a stale handle (a sprite killed after the reset) is harmless
+        assert not timers.reschedule(timer, 5)
+    assert len(timers) == 0
+    new = timers.schedule(5, note, 'new')
+    timers.run(10_000)
+    assert fired == ['new'] and not new.active
+    assert timers.stats() == {'live': 0, 'heap': 0, 'fired': 1, 'cancelled': 50}
@@ -0,0 +1,79 @@
+import pytest
+
+import waves
+from settings import ENEMY_SPAWN_INTERVAL, SCROLL_SPEED
+from sprites import ENEMY_TYPES
+
+
+def level(spec_waves, **level):
+    return waves.WaveFile([dict(level, waves=spec_waves)])
+
+
+def test_shipped_cadence_matches_the_old_spawner():
+    """The old spawner: world_y moves SCROLL_SPEED a tick, spawn once it is
+    strictly more than ENEMY_SPAWN_INTERVAL past the last spawn."""
+    cursor = waves.WaveCursor(waves.WaveFile.load().compile(0))
+    cursor.start_level(1, 0)
+    last = 0
+    expected, got = [], []
+    # past two loops of the level's timeline
+    for tick in range(1, 2 * int(cursor.track.length) // SCROLL_SPEED + 500):
+        world_y = tick * SCROLL_SPEED
+        if world_y - last > ENEMY_SPAWN_INTERVAL:
+            last = world_y
+            expected.append(tick)
+        got += [tick] * len(cursor.due(world_y))
+    assert got == expected
+
+
+def test_count_doubles_from_level_three():
+    timeline = waves.WaveFile.load().compile(0)
+    for number, count in ((1, 1), (2, 1), (3, 2), (9, 2)):
+        track = timeline.level(number)
+        assert list(track.at[:2 * count]) == [152.0] * count + [304.0] * count
+
+
+def test_compile_rolls_ranges_from_the_seed():
+    spec = [{'at': 10, 'every': 10, 'count': 3, 'x': [0, 600], 'y': [-300, -30]}]
+    a = level(spec, length=1000, loop=True).compile(1).level(1)
+    b = level(spec, length=1000, loop=True).compile(1).level(1)
+    assert len(a) == 300
+    assert (a.x, a.y, a.kind) == (b.x, b.y, b.kind)
+    assert all(0 <= x <= 600 for x in a.x) and all(-300 <= y <= -30 for y in a.y)
+    assert level(spec, length=1000, loop=True).compile(2).level(1).x != a.x
+
+
+def test_formations_expand_around_one_anchor():
+    track = level([
+        {'at': 100, 'formation': 'v', 'count': 5, 'spacing': 40, 'x': 300, 'y': -60, 'type': 'fast'},
+        {'at': 50, 'formation': 'line', 'count': 3, 'spacing': 20, 'x': 100, 'y': -10},
+    ]).compile(0).level(1)
+    assert list(track.at) == [50.0] * 3 + [100.0] * 5
+    assert list(zip(track.x, track.y))[:3] == [(80, -10), (100, -10), (120, -10)]
+    assert list(zip(track.x, track.y))[3:] == [(300, -60), (260, -100), (340, -100), (220, -140), (380, -140)]
+    assert set(track.kind[3:]) == {ENEMY_TYPES.index('fast')}
+    assert len(set(track.kind[:3])) == 1  # one roll for the whole formation
+
+
+def test_tempo_and_balance_scale_the_cursor():
+    wave_file = level([{'at': 100}], length=1000, tempo=2.0)
+    cursor = waves.WaveCursor(wave_file.compile(0))
+    cursor.start_level(1, 0, spawn_interval=ENEMY_SPAWN_INTERVAL * 2)
+    assert cursor.due(99) == []
+    assert len(cursor.due(100)) == 1
+    assert cursor.due(10_000) == []  # not a loop level: nothing after the end
+
+
+@pytest.mark.parametrize("spec, message", [
+    ({'length': 100, 'waves': [{'formation': 'blob'}]}, "unknown formation"),
+    ({'length': 100, 'waves': [{'type': 'dragon'}]}, "unknown enemy type"),
+    ({'length': 100, 'waves': [{'every': 0}]}, "every must be positive"),
+    ({'length': 100, 'waves': [{'x': [5, 1]}]}, "x must be"),
+    ({'loop': True, 'waves': []}, "needs a length"),
+    ({'length': 100, 'tempo': 0, 'waves': []}, "tempo must be positive"),
+])
+def test_bad_files_are_refused(spec, message):
+    with pytest.raises(ValueError, match=message):
+        waves.WaveFile([spec])
+    with pytest.raises(ValueError, match="version"):
+        waves.WaveFile.from_dict({'version': 0, 'levels': [spec]})
@@ -0,0 +1,101 @@
+"""Font and rendered-text caching.
+
+``get_font`` loads each (name, size) once instead of a SysFont lookup per
+frame. ``render_text`` memoises rendered strings keyed on (font, text, color)
+in a bounded LRU, so ticking countdowns can't grow it without limit, and
+``HudText`` re-renders only when the value it shows actually changes.
+
+Surfaces from the cache are shared; use ``blit_alpha`` rather than leaving a
+set_alpha() on one.
+"""
+from collections import OrderedDict
+
+import pygame
+
+TEXT_CACHE_SIZE = 256
+
+_fonts = {}
+
+
+def get_font(size, name=None):
+    font = _fonts.get((name, size))
+    if font is None:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        font = _fonts[(name, size)] = pygame.font.SysFont(name, size)
+    return font
+
+
+class TextCache:
+    def __init__(self, maxsize=TEXT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def render(self, text, size, color, name=None):
+        key = (name, size, text, color)
+        entries = self.entries
+        surf = entries.get(key)
+        if surf is not None:
+            self.hits += 1
+            entries.move_to_end(key)
+            return surf
+        self.misses += 1
+        surf = entries[key] = get_font(size, name).render(text, True, color)
+        if len(entries) > self.maxsize:
+            entries.popitem(last=False)
+            self.evictions += 1
+        return surf
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        return {
+            'entries': len(self.entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+text_cache = TextCache()
+
+
+def render_text(text, size, color, name=None):
+    return text_cache.render(text, size, color, name)
+
+
+def blit_alpha(surface, text_surf, pos, alpha):
+    text_surf.set_alpha(alpha)
+    surface.blit(text_surf, pos)
+    text_surf.set_alpha(None)
+
+
+class HudText:
+    """One line of HUD text that only re-renders when its value changes."""
+
+    def __init__(self, size, color, name=None):
+        self.size = size
+        self.color = color
+        self.name = name
+        self.text = None
+        self.surface = None
+        self.renders = 0
+
+    def set(self, text):
+        if text != self.text:
+            self.text = text
+            self.surface = render_text(text, self.size, self.color, self.name)
+            self.renders += 1
+        return self.surface
+
+    def draw(self, surface, text, **anchor):
+        """Blit ``text`` with its rect placed by ``anchor`` (e.g. topleft=(10, 10))."""
+        surf = self.set(text)
+        rect = surf.get_rect(**anchor)
+        surface.blit(surf, rect)
+        return rect
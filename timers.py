@@ -0,0 +1,109 @@
+"""One min-heap of timers for everything that expires in game time.
+
+Powers, invulnerability, item lifetimes and the level-start fade
+used to be polled every frame from their own update() methods. They now
+schedule a Timer here and TimerScheduler.run(now) - once per step, on the
+step's clock snapshot - fires the callbacks that are due, in due order
+(ties in scheduling order). A frame with nothing due costs one peek at the
+heap top, however many timers are pending.
+
+Cancelling or rescheduling leaves the old heap entry behind; it is skipped
+when it surfaces and the heap is rebuilt once stale entries outnumber live
+ones.
+"""
+import heapq
+import itertools
+
+
+class Timer:
+    __slots__ = ('due', 'seq', 'callback', 'args', 'scheduler')
+
+    def __init__(self, scheduler, due, seq, callback, args):
+        self.scheduler = scheduler
+        self.due = due
+        self.seq = seq  # matches the live heap entry; older entries are stale
+        self.callback = callback
+        self.args = args
+
+    @property
+    def active(self):
+        return self.callback is not None
+
+    def cancel(self):
+        """Stop the timer if it hasn't fired; safe to call any number of times."""
+        if self.callback is not None:
+            self.scheduler._cancelled(self)
+
+    def _disarm(self):
+        self.callback = None
+        self.args = ()
+
+
+class TimerScheduler:
+    def __init__(self):
+        self.heap = []  # (due, seq, timer)
+        self._seq = itertools.count()
+        self.live = 0
+        self.fired = 0
+        self.cancelled = 0
+
+    def __len__(self):
+        return self.live
+
+    def schedule(self, due, callback, *args):
+        """Call ``callback(*args)`` on the first run() with now >= ``due`` (ms)."""
+        timer = Timer(self, due, next(self._seq), callback, args)
+        heapq.heappush(self.heap, (due, timer.seq, timer))
+        self.live += 1
+        return timer
+
+    def reschedule(self, timer, due):
+        """Move an active timer to ``due`` (extend or shorten); False if it already fired."""
+        if not timer.active:
+            return False
+        timer.due = due
+        timer.seq = next(self._seq)
+        heapq.heappush(self.heap, (due, timer.seq, timer))
+        self._maybe_compact()
+        return True
+
+    def cancel(self, timer):
+        timer.cancel()
+
+    def _cancelled(self, timer):
+        timer._disarm()
+        self.live -= 1
+        self.cancelled += 1
+        self._maybe_compact()
+
+    def clear(self):
+        for _, _, timer in self.heap:
+            timer._disarm()
+        self.heap = []
+        self.live = 0
+
+    def run(self, now):
+        """Fire every timer due at ``now``; callbacks may schedule more."""
+        # self.heap, not a local: a callback's cancel() may compact it
+        while self.heap and self.heap[0][0] <= now:
+            _, seq, timer = heapq.heappop(self.heap)
+            if timer.seq != seq or timer.callback is None:
+                continue  # rescheduled or cancelled
+            callback, args = timer.callback, timer.args
+            timer._disarm()
+            self.live -= 1
+            self.fired += 1
+            callback(*args)
+
+    def _maybe_compact(self):
+        if len(self.heap) > 64 and len(self.heap) > 2 * self.live:
+            self.heap = [e for e in self.heap if e[2].seq == e[1] and e[2].callback is not None]
+            heapq.heapify(self.heap)
+
+    def stats(self):
+        return {
+            'live': self.live,
+            'heap': len(self.heap),
+            'fired': self.fired,
+            'cancelled': self.cancelled,
+        }
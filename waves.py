@@ -0,0 +1,264 @@
+"""Wave timelines: enemy spawns read from a data file, compiled ahead of time.
+
+Levels are described in a JSON wave file (assets/waves.json by default):
+
+    {"version": 1, "levels": [
+        {"length": 36480, "loop": true, "tempo": 1.0, "waves": [
+            {"at": 152, "every": 152, "count": 1,
+             "x": [20, 570], "y": [-300, -30], "type": "random"},
+            {"at": 3000, "formation": "v", "count": 5, "spacing": 40,
+             "x": 300, "y": -60, "type": "fast"}]},
+        ...]}
+
+Positions on a level's timeline (``at``, ``every``, ``until``, ``length``)
+are in scroll distance since the level started, the same world_y units the
+old ENEMY_SPAWN_INTERVAL used (120 per second at the default scroll speed).
+``x``/``y`` are a number or an inclusive [lo, hi] range, ``type`` a name, a
+list to choose from or "random". A formation (single, line, column, v) puts
+``count`` enemies around one anchor; "single" places each independently.
+The shipped file keeps the old spawner's cadence: it waited for world_y to
+move strictly more than 150 in steps of 2, i.e. a spawn every 152, and the
+looping length is a multiple of that so the cadence runs on across loops.
+
+Per-level difficulty: ``tempo`` multiplies how fast the timeline runs and an
+optional ``enemies_required`` overrides the Balance curve for that level.
+Balance.enemy_spawn_interval still scales every level's tempo (150 = 1x), so
+difficulty sweeps keep working. Levels past the end of the file reuse the
+last entry; a ``loop`` level starts over after ``length``.
+
+WaveFile.load() parses and validates once. compile(seed) rolls every random
+range and expands repeats and formations into one sorted set of arrays per
+level, so a level can hold tens of thousands of spawns. During play
+WaveCursor.due() bisects the position it has reached; a frame with nothing
+due costs one bisect.
+"""
+import bisect
+import json
+import os
+import random
+from array import array
+
+from settings import ENEMY_SPAWN_INTERVAL
+from sprites import ENEMY_TYPES
+
+WAVE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "waves.json")
+WAVES_VERSION = 1
+
+
+# -------- FORMATIONS ----------
+# offsets of ``count`` members from the anchor; y grows downward, so trailing
+# members sit at negative y offsets (above the leader, scrolling in later)
+def _line(count, spacing):
+    left = -(count - 1) * spacing / 2
+    return [(round(left + i * spacing), 0) for i in range(count)]
+
+
+def _column(count, spacing):
+    return [(0, -i * spacing) for i in range(count)]
+
+
+def _v(count, spacing):
+    offsets = [(0, 0)]
+    for i in range(1, count):
+        rank = (i + 1) // 2
+        side = -1 if i % 2 else 1
+        offsets.append((side * rank * spacing, -rank * spacing))
+    return offsets
+
+
+FORMATIONS = {
+    'single': None,  # every member rolls its own x/y
+    'line': _line,
+    'column': _column,
+    'v': _v,
+}
+
+
+class LevelTimeline:
+    """One level's spawns as parallel arrays sorted by position."""
+    __slots__ = ('at', 'x', 'y', 'kind', 'length', 'loop', 'tempo', 'enemies_required')
+
+    def __init__(self, rows, length, loop, tempo, enemies_required):
+        rows.sort(key=lambda row: row[0])  # stable: ties keep file order
+        self.at = array('d', [r[0] for r in rows])
+        self.x = array('i', [r[1] for r in rows])
+        self.y = array('i', [r[2] for r in rows])
+        self.kind = array('B', [r[3] for r in rows])  # index into ENEMY_TYPES
+        self.length = length
+        self.loop = loop
+        self.tempo = tempo
+        self.enemies_required = enemies_required
+
+    def __len__(self):
+        return len(self.at)
+
+
+class Timeline:
+    """Compiled wave file: LevelTimeline per level, last one repeated."""
+
+    def __init__(self, levels):
+        self.levels = levels
+
+    def level(self, level):
+        return self.levels[min(level, len(self.levels)) - 1]
+
+    def __len__(self):
+        return sum(len(track) for track in self.levels)
+
+
+# -------- LOADING ----------
+class WaveFile:
+    def __init__(self, levels, path="<data>"):
+        self.path = path
+        self.levels = [self._check_level(i, spec) for i, spec in enumerate(levels, 1)]
+        if not self.levels:
+            raise ValueError(f"{path}: no levels")
+        self._compiled = None  # (seed, Timeline) of the last compile
+
+    @classmethod
+    def load(cls, path=WAVE_FILE):
+        with open(path) as f:
+            data = json.load(f)
+        return cls.from_dict(data, path)
+
+    @classmethod
+    def from_dict(cls, data, path="<data>"):
+        if data.get('version') != WAVES_VERSION:
+            raise ValueError(f"{path}: wave file version {data.get('version')}, expected {WAVES_VERSION}")
+        return cls(data['levels'], path)
+
+    def _fail(self, where, message):
+        raise ValueError(f"{self.path}: {where}: {message}")
+
+    def _check_level(self, number, spec):
+        where = f"level {number}"
+        waves = [self._check_wave(f"{where} wave {i}", w) for i, w in enumerate(spec.get('waves', []))]
+        loop = bool(spec.get('loop', False))
+        length = spec.get('length')
+        if length is None:
+            if loop:
+                self._fail(where, "a looping level needs a length")
+            length = max((w['until'] or w['at'] for w in waves), default=0)
+        if length <= 0 and loop:
+            self._fail(where, "length must be positive")
+        tempo = float(spec.get('tempo', 1.0))
+        if tempo <= 0:
+            self._fail(where, "tempo must be positive")
+        required = spec.get('enemies_required')
+        return {'waves': waves, 'length': float(length), 'loop': loop, 'tempo': tempo,
+                'enemies_required': required}
+
+    def _check_wave(self, where, spec):
+        formation = spec.get('formation', 'single')
+        if formation not in FORMATIONS:
+            self._fail(where, f"unknown formation {formation!r}; known: {', '.join(FORMATIONS)}")
+        typ = spec.get('type', 'random')
+        kinds = ENEMY_TYPES if typ == 'random' else ([typ] if isinstance(typ, str) else typ)
+        for kind in kinds:
+            if kind not in ENEMY_TYPES:
+                self._fail(where, f"unknown enemy type {kind!r}")
+        every = spec.get('every')
+        if every is not None and every <= 0:
+            self._fail(where, "every must be positive")
+        return {
+            'at': float(spec.get('at', 0)),
+            'every': every,
+            'until': spec.get('until'),
+            'count': int(spec.get('count', 1)),
+            'spacing': spec.get('spacing', 48),
+            'formation': FORMATIONS[formation],
+            'x': self._check_range(where, 'x', spec.get('x', 0)),
+            'y': self._check_range(where, 'y', spec.get('y', -60)),
+            'kinds': [ENEMY_TYPES.index(k) for k in kinds],
+        }
+
+    def _check_range(self, where, name, value):
+        if isinstance(value, (int, float)):
+            return (int(value), int(value))
+        if isinstance(value, list) and len(value) == 2 and value[0] <= value[1]:
+            return (int(value[0]), int(value[1]))
+        self._fail(where, f"{name} must be a number or [lo, hi], got {value!r}")
+
+    # -------- COMPILING ----------
+    def compile(self, seed=0):
+        """Timeline with every random range rolled from ``seed``."""
+        if self._compiled is not None and self._compiled[0] == seed:
+            return self._compiled[1]
+        rng = random.Random(seed)
+        levels = []
+        for spec in self.levels:
+            rows = []
+            for wave in spec['waves']:
+                self._expand(wave, spec['length'], rng, rows)
+            levels.append(LevelTimeline(rows, spec['length'], spec['loop'], spec['tempo'],
+                                        spec['enemies_required']))
+        timeline = Timeline(levels)
+        self._compiled = (seed, timeline)
+        return timeline
+
+    def _expand(self, wave, length, rng, rows):
+        at = wave['at']
+        every = wave['every']
+        if every is None:
+            stops = [at]
+        else:
+            until = wave['until'] if wave['until'] is not None else length
+            stops = [at + i * every for i in range(int((until - at) // every) + 1)]
+        (x_lo, x_hi), (y_lo, y_hi) = wave['x'], wave['y']
+        kinds, count, offsets = wave['kinds'], wave['count'], wave['formation']
+        randint, choice = rng.randint, rng.choice
+        for pos in stops:
+            if offsets is None:
+                for _ in range(count):
+                    rows.append((pos, randint(x_lo, x_hi), randint(y_lo, y_hi), choice(kinds)))
+                continue
+            ax, ay, kind = randint(x_lo, x_hi), randint(y_lo, y_hi), choice(kinds)
+            for dx, dy in offsets(count, wave['spacing']):
+                rows.append((pos, ax + dx, ay + dy, kind))
+
+
+_default = None
+
+
+def default_waves():
+    """The shipped wave file, parsed once per process."""
+    global _default
+    if _default is None:
+        _default = WaveFile.load()
+    return _default
+
+
+# -------- PLAYBACK ----------
+class WaveCursor:
+    """Where a simulation is on the current level's timeline."""
+
+    def __init__(self, timeline):
+        self.timeline = timeline
+        self.track = None
+        self.origin = 0  # world_y the current pass of the level started at
+        self.rate = 1.0  # timeline units per world_y unit
+        self.index = 0
+
+    def start_level(self, level, world_y, spawn_interval=ENEMY_SPAWN_INTERVAL):
+        self.track = self.timeline.level(level)
+        self.origin = world_y
+        self.rate = self.track.tempo * ENEMY_SPAWN_INTERVAL / spawn_interval
+        self.index = 0
+
+    def due(self, world_y):
+        """(x, y, kind index) of every spawn reached by ``world_y``, in order."""
+        track = self.track
+        pos = (world_y - self.origin) * self.rate
+        spawns = []
+        while True:
+            end = bisect.bisect_right(track.at, pos, self.index)
+            if end > self.index:
+                xs, ys, kinds = track.x, track.y, track.kind
+                spawns += [(xs[i], ys[i], kinds[i]) for i in range(self.index, end)]
+                self.index = end
+            if not track.loop or pos < track.length:
+                return spawns
+            # start the level's timeline over, carrying the overshoot
+            self.origin += track.length / self.rate
+            pos -= track.length
+            self.index = 0